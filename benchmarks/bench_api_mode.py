@@ -0,0 +1,38 @@
+"""Throughput at high concurrency with sync handlers (threadpool) versus async handlers (async engine).
+
+In sync mode a finished handler still holds its pooled connection while its response waits for a threadpool
+token to be serialized, so with hundreds of concurrent clients expect pool timeouts (errors) there.
+
+    python -m benchmarks.bench_api_mode [--concurrency 500] [--duration 10]
+"""
+import argparse
+import asyncio
+
+from .common import print_table, run_load, run_server
+
+
+async def make_request(client, i):
+    if i % 2:
+        return await client.get("/api/menu/friday")
+    return await client.get(f"/api/customers/{i % 10 + 1}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    rows = []
+    for mode in ("sync", "async"):
+        # Enough pooled connections that the pool is not the bottleneck being measured
+        env = {"API_MODE": mode, "DB_PROFILE": "performance", "DB_POOL_SIZE": "20", "DB_MAX_OVERFLOW": "20"}
+        with run_server(env) as base_url:
+            result = asyncio.run(run_load(base_url, make_request, args.concurrency, args.duration))
+        rows.append({"mode": mode, "concurrency": args.concurrency, **result})
+
+    print_table(rows, ["mode", "concurrency", "requests", "errors", "throughput", "p50_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
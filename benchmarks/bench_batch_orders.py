@@ -0,0 +1,57 @@
+"""Ingest orders through POST /api/orders/batch and compare with one POST /api/orders per order.
+
+    python -m benchmarks.bench_batch_orders [--orders 10000] [--batch-size 1000]
+"""
+import argparse
+import time
+
+import httpx
+
+from .common import print_table, run_server
+
+
+def make_orders(count: int) -> list:
+    return [
+        {"customer_id": n % 10 + 1, "items": [{"menu_item_id": n % 20 + 1, "quantity": 1},
+                                             {"menu_item_id": (n + 7) % 20 + 1, "quantity": 2}]}
+        for n in range(count)
+    ]
+
+
+def ingest_batches(client: httpx.Client, orders: list, batch_size: int) -> int:
+    created = 0
+    for start in range(0, len(orders), batch_size):
+        response = client.post("/api/orders/batch", json=orders[start:start + batch_size])
+        response.raise_for_status()
+        created += sum(result["status_code"] == 200 for result in response.json())
+    return created
+
+
+def ingest_one_by_one(client: httpx.Client, orders: list) -> int:
+    return sum(client.post("/api/orders", json=order).status_code == 200 for order in orders)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--single-orders", type=int, default=1000, help="orders to post one by one for comparison")
+    args = parser.parse_args()
+
+    rows = []
+    with run_server() as base_url, httpx.Client(base_url=base_url, timeout=300) as client:
+        for method, orders, ingest in (
+            (f"batch of {args.batch_size}", make_orders(args.orders),
+             lambda orders: ingest_batches(client, orders, args.batch_size)),
+            ("one by one", make_orders(args.single_orders), lambda orders: ingest_one_by_one(client, orders)),
+        ):
+            start = time.perf_counter()
+            created = ingest(orders)
+            elapsed = time.perf_counter() - start
+            rows.append({"method": method, "orders": created, "seconds": elapsed, "orders_per_s": created / elapsed})
+
+    print_table(rows, ["method", "orders", "seconds", "orders_per_s"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""POST /api/orders latency as the number of line items grows.
+
+    python -m benchmarks.bench_create_order [--duration 3] [--line-items 1 5 10 20 50]
+"""
+import argparse
+import asyncio
+
+from .common import print_table, run_load, run_server
+
+
+def make_request_factory(line_items: int):
+    async def make_request(client, i):
+        items = [{"menu_item_id": n % 20 + 1, "quantity": 1} for n in range(line_items)]
+        return await client.post("/api/orders", json={"customer_id": i % 10 + 1, "items": items})
+
+    return make_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=3)
+    parser.add_argument("--line-items", type=int, nargs="+", default=[1, 5, 10, 20, 50])
+    args = parser.parse_args()
+
+    rows = []
+    with run_server() as base_url:
+        for line_items in args.line_items:
+            # One client at a time: this measures the latency of a single order, not contention
+            result = asyncio.run(run_load(base_url, make_request_factory(line_items), 1, args.duration))
+            rows.append({"line_items": line_items, **result})
+
+    print_table(rows, ["line_items", "requests", "errors", "p50_ms", "p99_ms", "mean_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""POST /api/orders throughput by number of concurrent clients, with and without group commit.
+
+Without it every order is its own transaction, and with SQLite's default settings its own fsync; with
+ORDER_GROUP_COMMIT=true the orders arriving together are committed together (see src/app/db/group_commit.py).
+
+    python -m benchmarks.bench_group_commit [--concurrency 1 4 16 64] [--duration 5] [--profile default] [--wait 0.002]
+"""
+import argparse
+import asyncio
+
+import httpx
+
+from .common import print_table, run_load, run_server
+
+
+async def make_request(client, i):
+    items = [{"menu_item_id": i % 20 + 1, "quantity": 1}, {"menu_item_id": (i + 7) % 20 + 1, "quantity": 2}]
+    return await client.post("/api/orders", json={"customer_id": i % 10 + 1, "items": items})
+
+
+def writer_statistics(base_url: str) -> dict:
+    return {"batches": 0, "writes": 0, **httpx.get(f"{base_url}/api/diagnostics/group-commit").json()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--profile", default="default", help="DB_PROFILE of the server")
+    parser.add_argument("--wait", default="0.002", help="ORDER_GROUP_COMMIT_WAIT, seconds")
+    args = parser.parse_args()
+
+    rows = []
+    for group_commit in ("false", "true"):
+        env = {"ORDER_GROUP_COMMIT": group_commit, "ORDER_GROUP_COMMIT_WAIT": args.wait, "DB_PROFILE": args.profile}
+        with run_server(env) as base_url:
+            for concurrency in args.concurrency:
+                before = writer_statistics(base_url)
+                result = asyncio.run(run_load(base_url, make_request, concurrency, args.duration))
+                after = writer_statistics(base_url)
+                batches = after["batches"] - before["batches"]
+                average_batch = (after["writes"] - before["writes"]) / batches if batches else 1.0
+                rows.append({"group_commit": group_commit, "concurrency": concurrency, **result,
+                             "average_batch": average_batch})
+
+    print_table(rows, ["group_commit", "concurrency", "requests", "errors", "throughput", "p50_ms", "p99_ms",
+                       "average_batch"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Latency of the menu handlers with the cache warm versus disabled, measured in-process (no HTTP).
+
+    python -m benchmarks.bench_menu_cache [--calls 20000]
+"""
+import argparse
+import tempfile
+import time
+
+from fastapi import Request
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.database import Base
+from src.app.db.initial_data_loader import load_regular_menus, load_specials
+from src.app.routers.menu_items import get_menu_by_day, get_menu_item_by_id, menu_cache
+
+from .common import print_table, summarize
+
+
+def time_calls(call, calls: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(calls):
+        call_start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - call_start)
+    result = summarize(latencies, time.perf_counter() - start)
+    return {**result, "p50_us": result["p50_ms"] * 1000, "p99_us": result["p99_ms"] * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".db") as db_file:
+        engine = create_engine(f"sqlite:///{db_file.name}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        load_regular_menus(Session())
+        load_specials(Session())
+
+        request = Request({"type": "http", "headers": []})  # no If-None-Match: every call returns a body
+
+        def with_session(handler, **kwargs):
+            def call():
+                db = Session()
+                try:
+                    handler(request=request, db=db, **kwargs)
+                finally:
+                    db.close()
+            return call
+
+        rows = []
+        for name, handler, kwargs in (("menu/{day}", get_menu_by_day, {"day": "friday"}),
+                                      ("menu-items/{id}", get_menu_item_by_id, {"item_id": 1})):
+            call = with_session(handler, **kwargs)
+            for cache, ttl in (("disabled", 0), ("hit", 300)):
+                menu_cache.clear()
+                menu_cache.ttl = ttl
+                call()  # warm up
+                rows.append({"endpoint": name, "cache": cache, **time_calls(call, args.calls)})
+
+    print_table(rows, ["endpoint", "cache", "p50_us", "p99_us"])
+
+
+if __name__ == "__main__":
+    main()
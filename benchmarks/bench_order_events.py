@@ -0,0 +1,73 @@
+"""Fan-out of order status events to many Server-Sent Events subscribers, in process (no HTTP).
+
+"one customer": every subscriber follows the same customer, so each event goes to all of them (eg. dashboards);
+"one order each": every subscriber tracks its own order and each order changes once (delivery tracking).
+Events are published from a separate thread, like the API handlers do; latency is from publish to receipt.
+
+    python -m benchmarks.bench_order_events [--subscribers 10000] [--events 20]
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from src.app.order_events import OrderEventBroker
+
+from .common import percentile, print_table
+
+
+async def fan_out(subscribers: int, events: int, per_order: bool) -> dict:
+    broker = OrderEventBroker(queue_size=events)
+    subscriptions = [broker.subscribe(order_id=n) if per_order else broker.subscribe(customer_id=1)
+                     for n in range(subscribers)]
+    expected = 1 if per_order else events
+    published_at = {}
+    latencies = []
+
+    async def consume(subscription):
+        for _ in range(expected):
+            event = await subscription.get()
+            latencies.append(time.perf_counter() - published_at[event["order_id"]])
+        subscription.close()
+
+    def publish():
+        for n in range(subscribers if per_order else events):
+            published_at[n] = time.perf_counter()
+            broker.publish(n, 1, "in_progress", previous_status="pending")
+
+    consumers = [asyncio.create_task(consume(subscription)) for subscription in subscriptions]
+    await asyncio.sleep(0)  # consumers waiting before the first event
+    start = time.perf_counter()
+    publisher = threading.Thread(target=publish)
+    publisher.start()
+    await asyncio.gather(*consumers)
+    elapsed = time.perf_counter() - start
+    publisher.join()
+
+    latencies.sort()
+    return {
+        "deliveries": len(latencies),
+        "seconds": elapsed,
+        "deliveries_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "dropped": broker.stats()["dropped"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--events", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = []
+    for scenario, per_order in (("one customer", False), ("one order each", True)):
+        result = asyncio.run(fan_out(args.subscribers, args.events, per_order))
+        rows.append({"scenario": scenario, "subscribers": args.subscribers, **result})
+    print_table(rows, ["scenario", "subscribers", "deliveries", "seconds", "deliveries_per_s", "p50_ms", "p99_ms",
+                       "dropped"])
+
+
+if __name__ == "__main__":
+    main()
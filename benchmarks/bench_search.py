@@ -0,0 +1,85 @@
+"""Customer search latency as the table grows: `q=` (FTS5 index) versus the `lastname=` filter (ILIKE '%term%').
+
+Measured in-process (no HTTP) on generated customers, each with a unique last name.
+
+    python -m benchmarks.bench_search [--sizes 10000,100000,1000000] [--calls 200]
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from fastapi import Response
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.database import Base
+from src.app.db.models import Customer
+from src.app.routers.customers import get_customers
+
+from .common import print_table, summarize
+
+FIRSTNAMES = ["Anna", "Bruno", "Carla", "Dario", "Elena", "Fabio", "Giulia", "Luca", "Marta", "Nico"]
+
+
+def lastname(number: int) -> str:
+    """A unique, pronounceable last name for every number, eg. 123 -> "Bacodi"."""
+    syllables = ["ba", "co", "di", "fe", "gu", "la", "mo", "ni", "po", "ru"]
+    return "".join(syllables[int(digit)] for digit in str(number)).title()
+
+
+def add_customers(engine, start: int, stop: int, batch_size: int = 10_000):
+    with engine.begin() as connection:
+        for batch_start in range(start, stop, batch_size):
+            connection.execute(insert(Customer), [
+                {
+                    "firstname": FIRSTNAMES[number % len(FIRSTNAMES)], "lastname": lastname(number),
+                    "email": f"customer{number}@example.com", "external_id": f"#{number}", "card_digits": "0000",
+                    "street": "Via Roma 1", "city": "Milano", "state": "MI", "zip": "20100", "country": "IT",
+                    "phone": f"555-{number:07d}",
+                }
+                for number in range(batch_start, min(batch_start + batch_size, stop))
+            ])
+
+
+def time_search(Session, calls: int, size: int, parameter: str) -> dict:
+    """Look up random customers by last name, passed as the `parameter` query parameter."""
+    numbers = random.Random(0).choices(range(size), k=calls)
+    latencies = []
+    start = time.perf_counter()
+    for number in numbers:
+        filters = dict.fromkeys(["firstname", "lastname", "email", "external_id", "phone", "q"])
+        filters[parameter] = lastname(number)
+        db = Session()
+        try:
+            call_start = time.perf_counter()
+            get_customers(response=Response(), db=db, limit=20, cursor=None, **filters)
+            latencies.append(time.perf_counter() - call_start)
+        finally:
+            db.close()
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated customer counts")
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".db") as db_file:
+        engine = create_engine(f"sqlite:///{db_file.name}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        rows, loaded = [], 0
+        for size in sorted(int(size) for size in args.sizes.split(",")):
+            add_customers(engine, loaded, size)
+            loaded = size
+            for parameter, method in (("q", "fts5"), ("lastname", "ilike")):
+                rows.append({"customers": size, "search": f"{parameter}= ({method})",
+                             **time_search(Session, args.calls, size, parameter)})
+        print_table(rows, ["customers", "search", "p50_ms", "p99_ms", "mean_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Seeding time for a large generated customers.json: the bulk loader versus one ORM object per customer.
+
+    python -m benchmarks.bench_seed [--customers 200000]
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db import initial_data_loader
+from src.app.db.database import Base
+from src.app.db.models import Customer
+
+from .common import print_table
+
+
+def write_customers(path: Path, count: int):
+    with open(path, "w") as f:
+        f.write("[\n")
+        for number in range(count):
+            customer = {
+                "id": f"#{number}", "firstname": "Anna", "lastname": f"Rossi{number}", "card_digits": "0000",
+                "email": f"customer{number}@example.com", "phone": f"555-{number:07d}", "special": "false",
+                "address": {"street": "Via Roma 1", "city": "Milano", "state": "MI", "zip": "20100", "country": "IT"},
+            }
+            f.write(("," if number else "") + json.dumps(customer) + "\n")
+        f.write("]\n")
+
+
+def orm_per_row(db, path: Path):
+    """The previous loader: the whole file parsed at once and one ORM object added per customer."""
+    with open(path) as f:
+        for customer in json.load(f):
+            address = customer["address"]
+            db.add(Customer(
+                firstname=customer["firstname"], lastname=customer["lastname"], email=customer["email"],
+                external_id=customer["id"], card_digits=customer["card_digits"], street=address["street"],
+                city=address["city"], state=address["state"], zip=address["zip"], country=address["country"],
+                special=customer["special"].lower() == "true", phone=customer["phone"],
+            ))
+    db.commit()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "customers.json"
+        write_customers(path, args.customers)
+        initial_data_loader.INIT_DATA_DIR = Path(tmp_dir)
+
+        rows = []
+        for name, load in (("orm per row", lambda db: orm_per_row(db, path)),
+                           ("bulk", initial_data_loader.load_customers)):
+            engine = create_engine(f"sqlite:///{tmp_dir}/{name.replace(' ', '_')}.db")
+            Base.metadata.create_all(bind=engine)
+            Session = sessionmaker(bind=engine, autoflush=False)
+            start = time.perf_counter()
+            load(Session())
+            elapsed = time.perf_counter() - start
+            rows.append({"loader": name, "customers": args.customers, "seconds": elapsed,
+                         "rows_per_s": args.customers / elapsed})
+        print_table(rows, ["loader", "customers", "seconds", "rows_per_s"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Mixed read/write throughput and p99 latency with the default and performance SQLite profiles.
+
+Readers list menu items and customers while writers place orders, which is the workload where
+the default rollback journal makes every commit block all readers.
+
+    python -m benchmarks.bench_sqlite_profile [--concurrency 32] [--duration 10] [--write-ratio 0.2]
+"""
+import argparse
+import asyncio
+
+from .common import print_table, run_load, run_server
+
+ORDER = {"customer_id": 1, "items": [{"menu_item_id": 1, "quantity": 1}, {"menu_item_id": 2, "quantity": 2}]}
+
+
+def make_request_factory(write_ratio: float):
+    write_every = max(1, round(1 / write_ratio)) if write_ratio else 0
+
+    async def make_request(client, i):
+        if write_every and i % write_every == 0:
+            return await client.post("/api/orders", json=ORDER)
+        if i % 2:
+            return await client.get("/api/menu-items")
+        return await client.get("/api/customers")
+
+    return make_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rows = []
+    for profile in ("default", "performance"):
+        with run_server({"DB_PROFILE": profile}) as base_url:
+            result = asyncio.run(run_load(base_url, make_request_factory(args.write_ratio),
+                                          args.concurrency, args.duration))
+        rows.append({"profile": profile, **result})
+
+    print_table(rows, ["profile", "requests", "errors", "throughput", "p50_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
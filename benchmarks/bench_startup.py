@@ -0,0 +1,45 @@
+"""Time from starting the API to its first answer, per DB_SEED_MODE, restarting on the same database file.
+
+"reset" drops and reloads everything on each start; "checksum" loads a new database once, then skips the datasets
+whose init_data files are unchanged; "snapshot" copies a database prebuilt with `python -m src.app.db.snapshot`
+(built once, before the first start) over its own.
+
+    python -m benchmarks.bench_startup [--restarts 5]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from src.app.db.snapshot import build_snapshot
+
+from .common import print_table, run_server
+
+
+def time_start(env: dict) -> float:
+    start = time.perf_counter()
+    with run_server(env=env):
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restarts", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = []
+    for mode in ("reset", "checksum", "snapshot"):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env = {"DB_SEED_MODE": mode, "DATABASE_URL": f"sqlite:///{tmp_dir}/startup.db",
+                   "DB_SNAPSHOT_PATH": f"{tmp_dir}/snapshot.db"}
+            if mode == "snapshot":
+                build_snapshot(Path(env["DB_SNAPSHOT_PATH"]))
+            first = time_start(env)
+            restarts = [time_start(env) for _ in range(args.restarts)]
+            rows.append({"mode": mode, "first_start_s": first, "restart_median_s": statistics.median(restarts)})
+    print_table(rows, ["mode", "first_start_s", "restart_median_s"])
+
+
+if __name__ == "__main__":
+    main()
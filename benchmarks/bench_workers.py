@@ -0,0 +1,43 @@
+"""Read throughput with 1, 2, 4, ... uvicorn worker processes on the same database, and the startup checks.
+
+Every worker is started in "reset" mode; the first one loads the database while the others wait (see
+src/app/db/worker_lock.py), so a launch must come up with no errors and the data loaded exactly once. Scaling is
+bounded by the CPU cores available to the benchmark and the server together.
+
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--concurrency 64] [--duration 10]
+"""
+import argparse
+import asyncio
+import os
+
+import httpx
+
+from .common import print_table, run_load, run_server
+
+
+async def make_request(client, i):
+    if i % 2:
+        return await client.get("/api/menu-items")
+    return await client.get("/api/customers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    rows = []
+    for workers in (int(count) for count in args.workers.split(",")):
+        with run_server({"DB_SEED_MODE": "reset", "DB_PROFILE": "performance"}, workers=workers) as base_url:
+            orders = len(httpx.get(f"{base_url}/api/orders").json())
+            result = asyncio.run(run_load(base_url, make_request, args.concurrency, args.duration))
+        rows.append({"workers": workers, "seeded_orders": orders, **result})
+
+    print(f"{os.cpu_count()} CPU cores")
+    print_table(rows, ["workers", "seeded_orders", "requests", "errors", "throughput", "p50_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Shared helpers for the benchmark scripts: run the API in a subprocess and drive it with concurrent clients.
+
+Benchmarks are run from the repo root, eg. `python -m benchmarks.bench_sqlite_profile`.
+"""
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_server(env: dict | None = None, workers: int = 1, startup_timeout: float = 60):
+    """Start uvicorn on a temporary database and yield its base URL once it answers requests."""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        server_env = {
+            **os.environ,
+            "PYTHONPATH": str(Path(__file__).parent.parent),
+            "DATABASE_URL": f"sqlite:///{tmp_dir}/bench.db",
+            **(env or {}),
+        }
+        command = [sys.executable, "-m", "uvicorn", "src.app.main:app", "--port", str(port),
+                   "--workers", str(workers), "--log-level", "warning"]
+        process = subprocess.Popen(command, env=server_env)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            wait_until_serving(base_url, startup_timeout)
+            yield base_url
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+def wait_until_serving(base_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health/ready", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"Server at {base_url} did not start within {timeout}s")
+
+
+async def run_load(base_url: str, make_request, concurrency: int, duration: float) -> dict:
+    """Call `make_request(client, i)` from `concurrency` tasks for `duration` seconds.
+
+    `make_request` returns an awaitable httpx response; latencies are recorded per call.
+    """
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+
+        async def worker(worker_id: int):
+            nonlocal errors
+            i = worker_id
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await make_request(client, i)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+                i += concurrency
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return summarize(latencies, elapsed, errors)
+
+
+def summarize(latencies: list, elapsed: float, errors: int = 0) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+    }
+
+
+def percentile(ordered: list, pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def print_table(rows: list[dict], columns: list[str]):
+    widths = {column: max(len(column), *(len(format_cell(row[column])) for row in rows)) for column in columns}
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(format_cell(row[column]).ljust(widths[column]) for column in columns))
+
+
+def format_cell(value) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
@@ -0,0 +1,19 @@
+"""Async engine and session, used when the API runs with API_MODE=async.
+
+Kept separate from `database.py` so the sync mode does not require the async driver (aiosqlite).
+"""
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from .database import DATABASE_URL, DB_PROFILE, InstrumentedAsyncQueuePool, configure_engine, engine_options
+
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(poolclass=InstrumentedAsyncQueuePool))
+configure_engine(async_engine.sync_engine, DB_PROFILE)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autocommit=False, autoflush=False)
+
+
+async def get_async_db():
+    """Yield an async session for one request and always close it afterwards."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,24 +1,212 @@
+import os
+import threading
+import time
 from pathlib import Path
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 path = Path(__file__).parent / "pos.db"
-DATABASE_URL = f"sqlite:///{path}"
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{path}")
 
-# Note that `connect_args={"check_same_thread": False}` is needed for SQLite
-# https://fastapi.tiangolo.com/tutorial/sql-databases/
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Connection pool settings, overridable through environment variables.
+# Defaults match SQLAlchemy's own QueuePool defaults.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))  # seconds, -1 disables recycling
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+
+# SQLite tuning applied to every new connection, selected with DB_PROFILE.
+# "default" leaves SQLite's settings untouched (rollback journal, synchronous=FULL).
+# "performance" switches to WAL so readers are not blocked by a writer's commit.
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+SQLITE_PROFILES = {
+    "default": {},
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # safe with WAL: only the last transactions can be lost on power failure
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,  # negative values are KiB, i.e. 64MB
+        "busy_timeout": 5000,  # ms to wait on a locked database instead of failing immediately
+        "temp_store": "MEMORY",
+    },
+}
+
+# A checkout taking longer than this is counted as a wait on the pool
+POOL_WAIT_THRESHOLD = 0.001  # seconds
+
+
+class PoolStats:
+    """Counters describing how a connection pool is being used."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_checkin(self):
+        with self._lock:
+            self.checkins += 1
+
+    def record_checkout(self, elapsed: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += elapsed
+            self.max_wait = max(self.max_wait, elapsed)
+            if elapsed > POOL_WAIT_THRESHOLD:
+                self.waits += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "total_wait_ms": round(self.total_wait * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Records how long callers wait to check out a connection from the pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.stats.record_timeout()
+            raise
+        self.stats.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # Keep the counters when the pool is disposed and rebuilt
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(**kwargs) -> dict:
+    """Keyword arguments for `create_engine` using the pool settings above."""
+    # Note that `connect_args={"check_same_thread": False}` is needed for SQLite
+    # https://fastapi.tiangolo.com/tutorial/sql-databases/
+    options = {
+        "connect_args": {"check_same_thread": False},
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+    options.update(kwargs)
+    return options
+
+
+def configure_engine(db_engine, profile: str = DB_PROFILE):
+    """Attach the pool statistics listeners and the SQLite profile PRAGMAs to a (sync) engine."""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {sorted(SQLITE_PROFILES)}")
+
+    @event.listens_for(db_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        _stats_for(db_engine).record_connect()
+
+    pragmas = SQLITE_PROFILES[profile]
+    if pragmas and db_engine.dialect.name == "sqlite":
+
+        @event.listens_for(db_engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    @event.listens_for(db_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        _stats_for(db_engine).record_checkin()
+
+    return db_engine
+
+
+def create_db_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE, **kwargs):
+    """Create an engine using the pool settings above and the given SQLite profile."""
+    return configure_engine(create_engine(url, **engine_options(**kwargs)), profile)
+
+
+def _stats_for(db_engine) -> PoolStats:
+    stats = getattr(db_engine.pool, "stats", None)
+    return stats if stats is not None else PoolStats()
+
+
+def pool_statistics(db_engine) -> dict:
+    """Current state of an engine's connection pool plus its usage counters."""
+    pool = db_engine.pool
+    statistics = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        statistics.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        statistics.update(stats.as_dict())
+    return statistics
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
 
 def get_db():
-    return SessionLocal()
+    """Yield a session for one request and always close it afterwards, returning its connection to the pool."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
 
 def init_db():
+    from .migrations import run_migrations  # imported here: migrations need the models, which need this module
+
     Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        run_migrations(db)
 
 
 def drop_db():
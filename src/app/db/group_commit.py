@@ -0,0 +1,128 @@
+"""Group commit: the writes of concurrent requests are run together, one transaction (and one fsync) per batch.
+
+Request threads `submit` their write and wait for its result; a single writer thread takes whatever has been submitted
+meanwhile, up to `max_batch` writes, and runs them with one `write_batch(db, items, before_commit=...)` call and
+commit. The requests arriving while a batch commits make up the next one, so batches grow with concurrency. Once
+writes come in concurrently, the writer also waits up to `max_wait` seconds for more before committing; a lone
+request (the previous batch had a single write and nothing else is queued) is written at once.
+
+A batch that fails is rolled back and its writes are retried one at a time, so an error only fails its own request.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Runs submitted writes in shared transactions from one thread; see the module docstring."""
+
+    def __init__(
+            self, session_factory, write_batch: Callable, max_batch: int = 100, max_wait: float = 0.002,
+            timeout: float = 30
+    ):
+        self.session_factory = session_factory
+        self.write_batch = write_batch  # (db, items, before_commit) -> one result per item, committed
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout  # seconds callers wait for their result before giving up
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._last_batch = 0
+        self.batches = 0
+        self.writes = 0
+        self.largest_batch = 0
+
+    def submit(self, item, before_commit: Optional[Callable] = None) -> Future:
+        """Queue a write; the future resolves to its result once committed.
+
+        Callers must not hold a connection from the writer's pool while they wait, or the writer may find none left.
+
+        `before_commit(db, result)` is called with the writer's session before the commit, to write more in the same
+        transaction (it is also called for results that were rejected rather than written).
+        """
+        future = Future()
+        self._start()
+        self._queue.put((item, before_commit, future))
+        return future
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Write what has been submitted so far, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+            batch = [entry]
+            # No waiting for more writes while requests come one at a time
+            deadline = time.monotonic() + (self.max_wait if self._last_batch > 1 or not self._queue.empty() else 0)
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self._last_batch = len(batch)
+            self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch: list):
+        with self._lock:
+            self.batches += 1
+            self.writes += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+        def before_commit(results):
+            for (_, hook, _), result in zip(batch, results):
+                if hook is not None:
+                    hook(db, result)
+
+        with self.session_factory() as db:
+            try:
+                results = self.write_batch(db, [item for item, _, _ in batch], before_commit=before_commit)
+            except Exception as e:
+                db.rollback()
+                if len(batch) == 1:
+                    batch[0][2].set_exception(e)
+                    return
+                failed = True
+            else:
+                failed = False
+        if failed:
+            for entry in batch:
+                self._write([entry])
+            return
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "queued": self._queue.qsize(),
+                "batches": self.batches,
+                "writes": self.writes,
+                "largest_batch": self.largest_batch,
+                "average_batch": self.writes / self.batches if self.batches else 0.0,
+            }
@@ -0,0 +1,145 @@
+"""Normalized ingredients of menu items and the allergens they contain.
+
+`MenuItem.ingredients` stays the comma-separated text the API shows; `link_ingredients` mirrors it into the
+`ingredients` / `menu_item_ingredients` tables whenever it is written, and the words of every ingredient name into
+`ingredient_words`. Filters match whole words of ingredient names, singular or plural, through indexed lookups:
+"cheese" finds "parmesan cheese", "tomato" finds "cherry tomatoes", and "egg" finds "eggs" but not "eggplant".
+"""
+import re
+
+from sqlalchemy import delete, func, insert, intersect, select, union
+from sqlalchemy.orm import Session
+
+from .models import Ingredient, IngredientAllergen, MenuItem, ingredient_words, menu_item_ingredients
+
+# Allergen -> words which, found in an ingredient's name, mean it contains the allergen
+ALLERGENS = {
+    "dairy": {"butter", "cheese", "cream", "gelato", "mascarpone", "milk", "mozzarella", "parmesan", "ricotta",
+              "yogurt"},
+    "eggs": {"egg", "eggs", "ladyfingers", "mayonnaise"},
+    "fish": {"anchovies", "anchovy", "salmon", "tuna"},
+    "gluten": {"bread", "dough", "flour", "ladyfingers", "lasagna", "noodles", "pasta", "penne", "ravioli",
+               "spaghetti"},
+    "nuts": {"almond", "almonds", "hazelnut", "hazelnuts", "nut", "nuts", "pecan", "pesto", "pistachio",
+             "pistachios", "walnut", "walnuts"},
+    "shellfish": {"clams", "mussels", "prawns", "shrimp", "shrimps"},
+    "soy": {"soy", "tofu"},
+}
+
+
+def parse_ingredients(text: str) -> list:
+    """Distinct lowercase ingredient names of a comma-separated list, in their original order."""
+    names = (re.sub(r"\s+", " ", name).strip().lower() for name in (text or "").split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def singular(word: str) -> str:
+    """Naive English singular, enough to match ingredient names: "tomatoes" -> "tomato", "anchovies" -> "anchovy"."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def words_of(name: str) -> list:
+    """The distinct singular words of an ingredient name or filter term."""
+    return list(dict.fromkeys(singular(word) for word in re.findall(r"[a-z]+", name.lower())))
+
+
+def allergens_of(ingredient: str) -> set:
+    words = set(re.findall(r"[a-z]+", ingredient.lower()))
+    return {allergen for allergen, markers in ALLERGENS.items() if words & markers}
+
+
+def link_ingredients(db: Session, menu_item: MenuItem):
+    """Point `menu_item.ingredient_set` at the ingredients listed in `menu_item.ingredients`, adding new ones."""
+    names = parse_ingredients(menu_item.ingredients)
+    db.flush()  # ingredients added by earlier calls in this transaction must be found below, even without autoflush
+    known = {ingredient.name: ingredient for ingredient in db.query(Ingredient).filter(Ingredient.name.in_(names))}
+    for name in names:
+        if name not in known:
+            known[name] = Ingredient(
+                name=name, allergens=[IngredientAllergen(allergen=allergen) for allergen in allergens_of(name)]
+            )
+            db.add(known[name])
+    new = [ingredient for name, ingredient in known.items() if ingredient.id is None]
+    if new:
+        db.flush()
+        add_ingredient_words(db, {ingredient.name: ingredient.id for ingredient in new})
+    menu_item.ingredient_set = [known[name] for name in names]
+
+
+def add_ingredient_words(db: Session, ids: dict):
+    """Index the words of new ingredients, given as {name: id}."""
+    rows = [{"word": word, "ingredient_id": ingredient_id} for name, ingredient_id in ids.items()
+            for word in words_of(name)]
+    if rows:
+        db.execute(insert(ingredient_words), rows)
+
+
+def link_ingredients_bulk(db: Session, ingredients_by_item: dict):
+    """`link_ingredients` for many menu items at once, given as {menu item id: comma-separated ingredients}.
+
+    Works on the tables directly with a few set-based statements, for loaders and migrations.
+    """
+    names_by_item = {item_id: parse_ingredients(text) for item_id, text in ingredients_by_item.items()}
+    names = list(dict.fromkeys(name for item_names in names_by_item.values() for name in item_names))
+
+    ids = dict(db.execute(select(Ingredient.name, Ingredient.id).where(Ingredient.name.in_(names))).all())
+    missing = [name for name in names if name not in ids]
+    if missing:
+        db.execute(insert(Ingredient), [{"name": name} for name in missing])
+        ids.update(db.execute(select(Ingredient.name, Ingredient.id).where(Ingredient.name.in_(missing))).all())
+        allergen_rows = [
+            {"ingredient_id": ids[name], "allergen": allergen} for name in missing for allergen in allergens_of(name)
+        ]
+        if allergen_rows:
+            db.execute(insert(IngredientAllergen), allergen_rows)
+        add_ingredient_words(db, {name: ids[name] for name in missing})
+
+    db.execute(delete(menu_item_ingredients).where(menu_item_ingredients.c.menu_item_id.in_(list(names_by_item))))
+    links = [
+        {"menu_item_id": item_id, "ingredient_id": ids[name]}
+        for item_id, item_names in names_by_item.items() for name in item_names
+    ]
+    if links:
+        db.execute(insert(menu_item_ingredients), links)
+
+
+def ingredients_matching(term: str):
+    """Ids of the ingredients whose name contains every word of `term`, eg. "cheese" or "parmesan cheese"."""
+    words = words_of(term)
+    return (
+        select(ingredient_words.c.ingredient_id)
+        .where(ingredient_words.c.word.in_(words))
+        .group_by(ingredient_words.c.ingredient_id)
+        .having(func.count() == len(words))
+    )
+
+
+def _items_with_ingredient(term: str):
+    return select(menu_item_ingredients.c.menu_item_id).where(
+        menu_item_ingredients.c.ingredient_id.in_(ingredients_matching(term))
+    )
+
+
+def items_with_all_ingredients(names: list):
+    """Ids of the menu items that have, for every term in `names`, an ingredient matching it."""
+    return intersect(*(_items_with_ingredient(name) for name in names))
+
+
+def items_with_any_ingredient(names: list):
+    """Ids of the menu items with an ingredient matching at least one term in `names`."""
+    return union(*(_items_with_ingredient(name) for name in names))
+
+
+def items_with_any_allergen(allergens: list):
+    """Ids of the menu items with an ingredient that contains one of `allergens`."""
+    return (
+        select(menu_item_ingredients.c.menu_item_id)
+        .join(IngredientAllergen, IngredientAllergen.ingredient_id == menu_item_ingredients.c.ingredient_id)
+        .where(IngredientAllergen.allergen.in_(allergens))
+    )
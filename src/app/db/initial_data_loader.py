@@ -1,61 +1,203 @@
+import hashlib
 import json
+import os
+import time
+from contextlib import nullcontext
 from datetime import datetime, timedelta
+from itertools import islice
 from pathlib import Path
 
+from sqlalchemy import delete, insert, select, tuple_, update
 from sqlalchemy.orm import Session
 
-from .database import drop_db, get_db, init_db
-from .models import Customer, MenuItem, OpeningHours, Order, OrderItem, OrderStatus
+from .database import SessionLocal, drop_db, init_db
+from .ingredients import link_ingredients_bulk
+from .rollups import apply_orders, counts_in_rollups
+from .search import search_index_rebuilt_after
+from .snapshot import DB_SNAPSHOT_PATH, is_seeded, restore_snapshot
+from .worker_lock import worker_lock
+from .models import DAYS, Customer, MenuItem, OpeningHours, Order, OrderItem, OrderStatus, SeedState, day_mask
 
+# "reset" drops the database and loads everything on each start; "checksum" keeps the database and reloads only the
+# datasets whose init_data files changed since they were last loaded (see seed_datasets); "snapshot" replaces an
+# unseeded database with a copy of the prebuilt snapshot (see snapshot.py), then continues as "checksum"
+DB_SEED_MODE = os.getenv("DB_SEED_MODE", "reset")
+SEED_MODES = ("reset", "checksum", "snapshot")
 
-async def load_initial_data():
-    # Remove any existing database tables
-    drop_db()
+INIT_DATA_DIR = Path(os.getenv("INIT_DATA_DIR", Path(__file__).parent / "init_data"))
+BATCH_SIZE = 5000  # rows per executemany when streaming large files
+
+
+def load_initial_data(mode: str = DB_SEED_MODE):
+    if mode not in SEED_MODES:
+        raise ValueError(f"Unknown DB_SEED_MODE {mode!r}, expected one of {', '.join(SEED_MODES)}")
+
+    # With several worker processes, the first one loads the data while the others wait, then use it as it is
+    with worker_lock.startup() as first_worker:
+        if first_worker:
+            _load_initial_data(mode)
+        else:
+            print("Database loaded by another worker, which is still running")
+
+
+def _load_initial_data(mode: str):
+    start = time.perf_counter()
+
+    if mode == "snapshot" and not DB_SNAPSHOT_PATH.exists():
+        print(f"Snapshot {DB_SNAPSHOT_PATH} not found, loading the initial data instead")
+        mode = "reset"
+
+    if mode == "snapshot" and is_seeded():
+        # A restart: the database holds orders and everything else written since it was restored
+        print("Database already seeded, keeping it")
+        mode = "checksum"
+
+    if mode == "snapshot":
+        restore_snapshot(DB_SNAPSHOT_PATH)
+        print(f"Database restored from snapshot {DB_SNAPSHOT_PATH}")
+    elif mode == "reset":
+        # Remove any existing database tables
+        drop_db()
 
     init_db()
     print("Database tables created")
 
     # Get a db session and load data
-    db = get_db()
-    load_regular_menus(db)
-    load_specials(db)
-    load_customers(db)
-    load_opening_hours(db)
-    create_orders(db)
+    loaded = seed_datasets(SessionLocal())
+    elapsed = time.perf_counter() - start
+    print(f"Initial data ready in {elapsed:.2f}s ({mode} mode, loaded: {', '.join(loaded) or 'nothing'})")
+
+
+def dataset_checksum(files: list) -> str:
+    digest = hashlib.sha256()
+    for name in files:
+        digest.update(name.encode())
+        with open(INIT_DATA_DIR / name, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def seed_datasets(db: Session) -> list:
+    """Load the datasets that are new or whose files changed since they were loaded into this database.
+
+    Loaders update rows that already exist (matched by name, external id, ...) instead of duplicating them, and a
+    dataset's checksum is only recorded once all its loaders succeeded. Returns the names of the datasets loaded.
+    """
+    checksums = {state.name: state.checksum for state in db.query(SeedState)}
+    loaded, timings = [], []
+    for name, files, loaders in SEED_DATASETS:
+        checksum = dataset_checksum(files)
+        if checksums.get(name) == checksum:
+            continue
+        succeeded = True
+        for loader in loaders:
+            start = time.perf_counter()
+            succeeded = loader(db) and succeeded
+            timings.append((loader.__name__, time.perf_counter() - start))
+        if succeeded:
+            db.merge(SeedState(name=name, checksum=checksum, loaded_at=datetime.utcnow()))
+            db.commit()
+            loaded.append(name)
+    db.close()
 
+    if timings:
+        print("Loader timings:")
+        for loader_name, elapsed in timings:
+            print(f"  {loader_name:<20} {elapsed:8.3f}s")
+    return loaded
 
 
-def load_regular_menus(db: Session):
+def iter_json_array(path, chunk_size: int = 1 << 16):
+    """Yield the elements of the JSON array of objects in `path` one by one, reading the file in chunks."""
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} does not contain a JSON array")
+        buffer = buffer[1:]
+        end_of_file = False
+        while True:
+            buffer = buffer.lstrip()
+            if buffer.startswith(","):
+                buffer = buffer[1:].lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                element, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if end_of_file:
+                    raise
+                chunk = f.read(chunk_size)
+                end_of_file = not chunk
+                buffer += chunk
+                continue
+            yield element
+            buffer = buffer[end:]
+
+
+def _batches(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _upsert_rows(db: Session, model, key_columns: list, rows: list, return_ids: bool = False):
+    """Write `rows` (dicts of column values) with executemany INSERTs, or UPDATEs for the rows whose `key_columns`
+    match an existing row. With `return_ids`, returns the ids of the rows in order.
+
+    Bulk statements skip ORM events, so rows must include every computed column.
+    """
+    keys = [tuple(row[column.key] for column in key_columns) for row in rows]
+
+    def ids_by_key(wanted: list) -> dict:
+        if len(key_columns) == 1:
+            condition = key_columns[0].in_([key for (key,) in wanted])
+        else:
+            condition = tuple_(*key_columns).in_(wanted)
+        return {tuple(found[:-1]): found[-1] for found in db.execute(select(*key_columns, model.id).where(condition))}
+
+    ids = ids_by_key(keys)
+    updates = [{"id": ids[key], **row} for key, row in zip(keys, rows) if key in ids]
+    if updates:
+        db.execute(update(model), updates)
+    new_rows = [row for key, row in zip(keys, rows) if key not in ids]
+    if new_rows:
+        # A Core INSERT of the table: the ORM bulk path would only add per-row bookkeeping
+        db.connection().execute(insert(model.__table__), new_rows)
+    if return_ids:
+        ids.update(ids_by_key([key for key in keys if key not in ids]))
+        return [ids[key] for key in keys]
+
+
+def _upsert_menu_items(db: Session, rows: list):
+    ids = _upsert_rows(db, MenuItem, [MenuItem.name, MenuItem.category], rows, return_ids=True)
+    link_ingredients_bulk(db, {item_id: row["ingredients"] for item_id, row in zip(ids, rows)})
+
 
-    path = Path(__file__).parent / "init_data" / "menu.json"
+def load_regular_menus(db: Session):
+    path = INIT_DATA_DIR / "menu.json"
     with open(path) as f:
         json_data = json.load(f)
 
-    availability_all_days = {
-        "available_monday": True,
-        "available_tuesday": True,
-        "available_wednesday": True,
-        "available_thursday": True,
-        "available_friday": True,
-        "available_saturday": True,
-        "available_sunday": True
-    }
+    availability_all_days = {f"available_{day}": True for day in DAYS}
 
     try:
-
-        for category, items in json_data.items():
-            for item in items:
-                # Create a MenuItem instance with data from JSON and set it to be available every day
-                menu_item = MenuItem(
-                    name=item["name"],
-                    price=item["price"],
-                    ingredients=", ".join(item["ingredients"]),
-                    category=category,
-                    labels=item["label"],
-                    **availability_all_days
-                )
-                # Add the menu item to the session
-                db.add(menu_item)
+        # Every item is available every day
+        rows = [
+            {
+                "name": item["name"],
+                "price": item["price"],
+                "ingredients": ", ".join(item["ingredients"]),
+                "category": category,
+                "labels": item["label"],
+                **availability_all_days,
+                "available_days": day_mask(DAYS),
+            }
+            for category, items in json_data.items()
+            for item in items
+        ]
+        _upsert_menu_items(db, rows)
 
         # Commit the session to save all the new records to the database
         db.commit()
@@ -63,40 +205,37 @@ def load_regular_menus(db: Session):
     except Exception as e:
         db.rollback()
         print(f"Error loading data: {e}")
+        return False
 
     finally:
         # Close the session
         db.close()
 
-    print("Menu items have been loaded successfully.")
-
+    print(f"Menu items have been loaded successfully ({len(rows)} rows).")
+    return True
 
 
 def load_specials(db: Session):
-    path = Path(__file__).parent / "init_data" / "specials.json"
+    path = INIT_DATA_DIR / "specials.json"
     with open(path) as f:
         json_data = json.load(f)
 
     try:
-        for day, items in json_data.items():
-            for item in items:
-                # Create a MenuItem instance with data from JSON
-                special_item = MenuItem(
-                    name=item["name"],
-                    price=item["price"],
-                    ingredients=", ".join(item["ingredients"]),
-                    category="Special",  # Use 'Special' as a category to distinguish from regular items
-                    labels=item.get("label", ""),
-                    available_monday=(day == "Monday"),
-                    available_tuesday=(day == "Tuesday"),
-                    available_wednesday=(day == "Wednesday"),
-                    available_thursday=(day == "Thursday"),
-                    available_friday=(day == "Friday"),
-                    available_saturday=(day == "Saturday"),
-                    available_sunday=(day == "Sunday")
-                )
-                # Add the special item to the session
-                db.add(special_item)
+        # Each special is available on one day
+        rows = [
+            {
+                "name": item["name"],
+                "price": item["price"],
+                "ingredients": ", ".join(item["ingredients"]),
+                "category": "Special",  # Use 'Special' as a category to distinguish from regular items
+                "labels": item.get("label", ""),
+                **{f"available_{name}": name == day.lower() for name in DAYS},
+                "available_days": day_mask([day.lower()]),
+            }
+            for day, items in json_data.items()
+            for item in items
+        ]
+        _upsert_menu_items(db, rows)
 
         # Commit the session to save all the new records to the database
         db.commit()
@@ -104,42 +243,46 @@ def load_specials(db: Session):
     except Exception as e:
         db.rollback()
         print(f"Error loading specials: {e}")
+        return False
 
     finally:
         # Close the session
         db.close()
 
-    print("Specials have been loaded successfully.")
-
+    print(f"Specials have been loaded successfully ({len(rows)} rows).")
+    return True
 
 
 def load_customers(db: Session):
-
-    path = Path(__file__).parent / "init_data" / "customers.json"
-    with open(path) as f:
-        json_data = json.load(f)
+    path = INIT_DATA_DIR / "customers.json"
+    count = 0
 
     try:
-        # Iterate over each customer in the JSON data
-        for customer in json_data:
-            # Flatten the nested address into individual fields
-            address = customer["address"]
-            customer_record = Customer(
-                firstname=customer["firstname"],
-                lastname=customer["lastname"],
-                email=customer["email"],
-                external_id=customer["id"],
-                card_digits=customer["card_digits"],
-                street=address["street"],
-                city=address["city"],
-                state=address["state"],
-                zip=address["zip"],
-                country=address["country"],
-                special=customer["special"].lower() == "true",  # Convert "true"/"false" string to Boolean
-                phone=customer["phone"]
-            )
-            # Add the customer record to the session
-            db.add(customer_record)
+        # Into an empty table, index the customers for search once at the end instead of row by row
+        first_load = db.query(Customer.id).first() is None
+        with search_index_rebuilt_after(db.connection(), "customers") if first_load else nullcontext():
+            # Parse the file one customer at a time and write them in batches: memory use does not grow with the file
+            for batch in _batches(iter_json_array(path), BATCH_SIZE):
+                rows = []
+                for customer in batch:
+                    # Flatten the nested address into individual fields
+                    address = customer["address"]
+                    rows.append({
+                        "firstname": customer["firstname"],
+                        "lastname": customer["lastname"],
+                        "email": customer["email"],
+                        "external_id": customer["id"],
+                        "card_digits": customer["card_digits"],
+                        "street": address["street"],
+                        "city": address["city"],
+                        "state": address["state"],
+                        "zip": address["zip"],
+                        "country": address["country"],
+                        "special": customer["special"].lower() == "true",  # "true"/"false" string to Boolean
+                        "phone": customer["phone"],
+                    })
+                _upsert_rows(db, Customer, [Customer.external_id], rows)
+                count += len(rows)
 
         # Commit the session to save all the new records to the database
         db.commit()
@@ -147,55 +290,69 @@ def load_customers(db: Session):
     except Exception as e:
         db.rollback()
         print(f"Error loading data: {e}")
+        return False
 
     finally:
         # Close the session
         db.close()
 
-    print("Customer data has been loaded successfully.")
-
+    print(f"Customer data has been loaded successfully ({count} rows).")
+    return True
 
 
 def load_opening_hours(db: Session):
-    path = Path(__file__).parent / "init_data" / "opening-hours.json"
+    path = INIT_DATA_DIR / "opening-hours.json"
     with open(path) as f:
         json_data = json.load(f)
 
     try:
-        for period, hours in json_data.items():
-            is_special = (period == "special")
-            for hour in hours:
-                opening_hour = OpeningHours(
-                    day=hour["day"],
-                    start=hour["start"],
-                    end=hour["end"],
-                    status=hour["status"],
-                    is_special=is_special
-                )
-                db.add(opening_hour)
+        db.execute(delete(OpeningHours))  # nothing refers to opening hours, so a reload replaces them all
+        rows = [
+            {
+                "day": hour["day"],
+                "start": hour["start"],
+                "end": hour["end"],
+                "status": hour["status"],
+                "is_special": period == "special",
+            }
+            for period, hours in json_data.items()
+            for hour in hours
+        ]
+        db.execute(insert(OpeningHours), rows)
         db.commit()
 
     except Exception as e:
         db.rollback()
         print(f"Error loading opening hours: {e}")
+        return False
 
     finally:
         # Close the session
         db.close()
 
-    print("Opening hours have been loaded successfully.")
+    print(f"Opening hours have been loaded successfully ({len(rows)} rows).")
+    return True
+
+
+# Ids of the demo orders, chosen so they will not be confused with customer ids
+DEMO_ORDER_IDS = range(8800, 8805)
 
 
 def create_orders(db: Session):
     try:
-        # Fetch all customers and menu items ordered by id
-        customers = db.query(Customer).order_by(Customer.id).all()
-        menu_items = db.query(MenuItem).order_by(MenuItem.id).all()
+        # A database seeded before datasets were tracked (see seed_datasets) already has them
+        if db.query(Order.id).filter(Order.id.in_(DEMO_ORDER_IDS)).first() is not None:
+            print("Demo orders already present.")
+            return True
+
+        # Fetch the first customers and menu items by id
+        customers = db.query(Customer.id).order_by(Customer.id).limit(10).all()
+        menu_items = db.query(MenuItem.id, MenuItem.name, MenuItem.price).order_by(MenuItem.id).limit(2).all()
 
         # Check if there are enough customers
         if len(customers) < 10 or len(menu_items) < 2:
             print("Not enough customers or menu items available. Ensure you have at least 10 customers and 2 menu items.")
-            return
+            return False
 
         # Select the 1st, 4th, 6th, 8th, and 10th customers
         selected_customers = [customers[0], customers[3], customers[5], customers[7], customers[9]]
@@ -211,47 +368,51 @@ def create_orders(db: Session):
             {"status": OrderStatus.PENDING, "time_offset": timedelta(hours=-1), "customer": selected_customers[4], "items": selected_menu_items},
         ]
 
-
-
-        for idx, order_info in enumerate(orders_info):
-            order_date = now + order_info["time_offset"]
-
-            # Create a new order
-            order = Order(
-                customer_id=order_info["customer"].id,
-                order_date=order_date,
-                total_amount=0.0,  # will be updated after adding order items
-                status=order_info["status"].value
-            )
-            # Set the first order's ID to a value which will not be confused with customer ID
-            if idx == 0:
-                order.id = 8800
-
-            db.add(order)
-            db.commit()  # Commit to generate order ID
-
+        order_rows, item_rows = [], []
+        for order_id, order_info in zip(DEMO_ORDER_IDS, orders_info):
             # Add 2 items to each order
             total_amount = 0.0
             for menu_item in order_info["items"]:
                 quantity = 1  # Fixed quantity to keep it deterministic
-                order_item = OrderItem(
-                    order_id=order.id,
-                    menu_item_id=menu_item.id,
-                    quantity=quantity,
-                    note=f"Fixed note for {menu_item.name}"
-                )
-                db.add(order_item)
+                item_rows.append({
+                    "order_id": order_id,
+                    "menu_item_id": menu_item.id,
+                    "quantity": quantity,
+                    "note": f"Fixed note for {menu_item.name}",
+                    "unit_price": menu_item.price,
+                })
                 total_amount += menu_item.price * quantity
-
-            # Update the total amount for the order
-            order.total_amount = total_amount
-            db.commit()
+            order_rows.append({
+                "id": order_id,
+                "customer_id": order_info["customer"].id,
+                "order_date": now + order_info["time_offset"],
+                "total_amount": total_amount,
+                "status": order_info["status"].value,
+            })
+
+        db.execute(insert(Order), order_rows)
+        db.execute(insert(OrderItem), item_rows)
+        apply_orders(db, [row["id"] for row in order_rows if counts_in_rollups(row["status"])])
+        db.commit()
 
         print("Orders have been created successfully.")
 
     except Exception as e:
         db.rollback()
         print(f"Error loading orders: {e}")
+        return False
 
     finally:
         db.close()
+
+    return True
+
+
+# Datasets seeded from init_data as (name, files, loaders), in load order. Demo orders come from no file, so they
+# are created once per database.
+SEED_DATASETS = [
+    ("menu", ["menu.json", "specials.json"], [load_regular_menus, load_specials]),
+    ("customers", ["customers.json"], [load_customers]),
+    ("opening_hours", ["opening-hours.json"], [load_opening_hours]),
+    ("orders", [], [create_orders]),
+]
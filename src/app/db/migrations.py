@@ -0,0 +1,84 @@
+"""Migrations for databases created by an earlier version of the app.
+
+`Base.metadata.create_all` adds new tables but does not change existing ones. `upgrade_schema` adds the columns and
+indexes missing from existing tables, then each data migration fills them, once per database; a database records
+the migrations it has had in `schema_migrations`.
+"""
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+
+from .database import Base
+from .ingredients import add_ingredient_words, link_ingredients_bulk
+from .models import DAYS, Ingredient, MenuItem, OrderItem, SchemaMigration, ingredient_words
+from .rollups import rebuild_rollups
+
+
+def upgrade_schema(connection):
+    """Add the model columns and indexes that existing tables lack. New columns need a server default or NULLs."""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                print(f"Added column {table.name}.{column.name}")
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def normalize_ingredients(db: Session):
+    """Fill the ingredient tables from the comma-separated `menu_items.ingredients` column."""
+    link_ingredients_bulk(db, dict(db.execute(select(MenuItem.id, MenuItem.ingredients)).all()))
+
+
+def fill_available_days(db: Session):
+    """Compute the `menu_items.available_days` bitmask from the available_<day> flags."""
+    mask = " + ".join(f"(CASE WHEN available_{day} THEN {1 << bit} ELSE 0 END)" for bit, day in enumerate(DAYS))
+    db.execute(text(f"UPDATE menu_items SET available_days = {mask}"))
+
+
+def build_rollups(db: Session):
+    """Record the prices of existing order items (as the current menu prices) and compute the rollups."""
+    price = select(MenuItem.price).where(MenuItem.id == OrderItem.menu_item_id).scalar_subquery()
+    db.execute(update(OrderItem).where(OrderItem.unit_price.is_(None)).values(unit_price=price))
+    rebuild_rollups(db)
+
+
+def index_ingredient_words(db: Session):
+    """Fill `ingredient_words` for the ingredients created before it existed."""
+    indexed = select(ingredient_words.c.ingredient_id)
+    unindexed = select(Ingredient.name, Ingredient.id).where(Ingredient.id.not_in(indexed))
+    add_ingredient_words(db, dict(db.execute(unindexed).all()))
+
+
+# Applied in order; never rename or remove an entry once released
+MIGRATIONS = [
+    ("0001_normalize_ingredients", normalize_ingredients),
+    ("0002_fill_available_days", fill_available_days),
+    ("0003_build_rollups", build_rollups),
+    ("0004_index_ingredient_words", index_ingredient_words),
+]
+
+
+def run_migrations(db: Session) -> list:
+    """Upgrade the schema, then apply the migrations this database has not had yet, each in its own transaction.
+
+    Returns the names of the migrations applied.
+    """
+    upgrade_schema(db.connection())
+    db.commit()
+    applied = {name for (name,) in db.query(SchemaMigration.name)}
+    newly_applied = []
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        migrate(db)
+        db.add(SchemaMigration(name=name))
+        db.commit()
+        print(f"Applied migration {name}")
+        newly_applied.append(name)
+    return newly_applied
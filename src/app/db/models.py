@@ -1,12 +1,40 @@
 from datetime import datetime
 from enum import Enum as PyEnum
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import (Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, String, Table, Text, event,
+                        insert_sentinel)
 from sqlalchemy.orm import relationship
 
+from . import search  # noqa: F401 creates the full-text indexes along with the tables
 from .database import Base
 
 
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def day_mask(days) -> int:
+    """Bitmask of `days` (names from DAYS): bit 0 is Monday, bit 6 is Sunday."""
+    return sum(1 << DAYS.index(day) for day in set(days))
+
+
+# Many-to-many link of menu items and their ingredients. The primary key serves "ingredients of an item", the index
+# "items with an ingredient", so include/exclude filters are index lookups.
+menu_item_ingredients = Table(
+    "menu_item_ingredients", Base.metadata,
+    Column("menu_item_id", Integer, ForeignKey("menu_items.id"), primary_key=True),
+    Column("ingredient_id", Integer, ForeignKey("ingredients.id"), primary_key=True),
+    Index("ix_menu_item_ingredients_ingredient_id_menu_item_id", "ingredient_id", "menu_item_id"),
+)
+
+# The words of each ingredient's name, singular (see ingredients.words_of), so filters match whole words of
+# names ("cheese" matches "parmesan cheese", "egg" does not match "eggplant") with a primary key lookup
+ingredient_words = Table(
+    "ingredient_words", Base.metadata,
+    Column("word", String, primary_key=True),
+    Column("ingredient_id", Integer, ForeignKey("ingredients.id"), primary_key=True),
+)
+
+
 class MenuItem(Base):
     __tablename__ = "menu_items"
 
@@ -23,8 +51,70 @@ class MenuItem(Base):
     available_friday = Column(Boolean, default=False)
     available_saturday = Column(Boolean, default=False)
     available_sunday = Column(Boolean, default=False)
+    # The available_<day> flags as one indexed bitmask (see day_mask), kept in sync on every flush
+    available_days = Column(Integer, nullable=False, default=0, server_default="0", index=True)
 
     order_items = relationship("OrderItem", back_populates="menu_item")  # One-to-many relationship
+    # Normalized form of `ingredients`, which stays the comma-separated text shown by the API (see db/ingredients.py)
+    ingredient_set = relationship("Ingredient", secondary=menu_item_ingredients, back_populates="menu_items")
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+@event.listens_for(MenuItem, "before_insert")
+@event.listens_for(MenuItem, "before_update")
+def _set_available_days(mapper, connection, target):
+    target.available_days = day_mask(day for day in DAYS if getattr(target, f"available_{day}"))
+
+
+class Ingredient(Base):
+    __tablename__ = "ingredients"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, unique=True, nullable=False)  # lowercase, eg. "parmesan cheese"
+
+    menu_items = relationship("MenuItem", secondary=menu_item_ingredients, back_populates="ingredient_set")
+    allergens = relationship("IngredientAllergen", cascade="all, delete-orphan")
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class IngredientAllergen(Base):
+    __tablename__ = "ingredient_allergens"
+
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id"), primary_key=True)
+    allergen = Column(String, primary_key=True)  # one of ingredients.ALLERGENS, eg. "dairy"
+
+    __table_args__ = (Index("ix_ingredient_allergens_allergen_ingredient_id", "allergen", "ingredient_id"),)
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class SchemaMigration(Base):
+    """Data migrations applied to this database (see db/migrations.py)."""
+    __tablename__ = "schema_migrations"
+
+    name = Column(String, primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class SeedState(Base):
+    """Checksum of the init_data files each dataset was last loaded from (see initial_data_loader.seed_datasets)."""
+    __tablename__ = "seed_state"
+
+    name = Column(String, primary_key=True)
+    checksum = Column(String, nullable=False)
+    loaded_at = Column(DateTime, default=datetime.utcnow)
 
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
@@ -71,10 +161,22 @@ class Order(Base):
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
     order_date = Column(DateTime, default=datetime.utcnow)
     total_amount = Column(Float, nullable=False)
+    status = Column(String, nullable=False, default=OrderStatus.PENDING.value, server_default=OrderStatus.PENDING.value)
+
+    # Lets bulk INSERT ... RETURNING match generated ids to rows, so many orders go in one statement on SQLite
+    _sentinel = insert_sentinel()
 
     customer = relationship("Customer", back_populates="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")  # One-to-many relationship
 
+    # Keyset pagination walks orders by (order_date, id), optionally for a single customer or status; the status
+    # index also answers the kitchen queue's "oldest orders in a status" on its own
+    __table_args__ = (
+        Index("ix_orders_order_date_id", "order_date", "id"),
+        Index("ix_orders_customer_id_order_date_id", "customer_id", "order_date", "id"),
+        Index("ix_orders_status_order_date_id", "status", "order_date", "id"),
+    )
+
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
@@ -84,10 +186,13 @@ class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     menu_item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     note = Column(Text, nullable=True)
+    unit_price = Column(Float, nullable=True)  # the menu item's price when ordered
+
+    _sentinel = insert_sentinel()  # see Order._sentinel
 
     order = relationship("Order", back_populates="items")
     menu_item = relationship("MenuItem", back_populates="order_items")
@@ -97,6 +202,60 @@ class OrderItem(Base):
             setattr(self, key, value)
 
 
+class DailyRevenue(Base):
+    """Orders and revenue per day of the non-cancelled orders, kept up to date by db/rollups.py."""
+    __tablename__ = "rollup_daily_revenue"
+
+    day = Column(Date, primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class MenuItemSales(Base):
+    """Quantity sold and revenue per menu item, over the non-cancelled orders (see db/rollups.py)."""
+    __tablename__ = "rollup_menu_item_sales"
+
+    menu_item_id = Column(Integer, ForeignKey("menu_items.id"), primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class CategorySales(Base):
+    """Quantity sold and revenue per menu category, over the non-cancelled orders (see db/rollups.py)."""
+    __tablename__ = "rollup_category_sales"
+
+    category = Column(String, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class IdempotencyKey(Base):
+    """The response to an order creation request, replayed to retries sending the same Idempotency-Key header."""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)  # of the request body, so a key cannot be reused for another order
+    response = Column(Text, nullable=False)  # JSON body
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)  # expired keys are purged by age
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
 class OpeningHours(Base):
     __tablename__ = "opening_hours"
 
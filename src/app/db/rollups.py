@@ -0,0 +1,119 @@
+"""Revenue and sales rollups, so analytics read a few precomputed rows instead of aggregating every order.
+
+`apply_orders` adds (or, with sign=-1, takes back) the totals of some orders to the rollup tables with an
+INSERT ... SELECT ... ON CONFLICT DO UPDATE per table and order, in the caller's transaction: the order handlers call
+it before committing, so rollups and orders change together. Cancelled orders are not counted. `rebuild_rollups`
+recomputes everything from orders / order_items in one pass, eg. after rows were changed behind the API's back.
+
+    python -m src.app.db.rollups
+"""
+import time
+from functools import lru_cache
+
+from sqlalchemy import Date, Integer, Numeric, bindparam, cast, delete, distinct, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import CategorySales, DailyRevenue, MenuItem, MenuItemSales, Order, OrderItem, OrderStatus
+
+
+def _order_day(dialect_name: str):
+    # SQLite has no DATE type: date() gives the 'YYYY-MM-DD' text the Date column stores
+    return func.date(Order.order_date) if dialect_name == "sqlite" else cast(Order.order_date, Date)
+
+
+def _rollup_selects(dialect_name: str, orders_filter, sign=1) -> dict:
+    """Per rollup model, a SELECT of its rows' values over the orders matching `orders_filter`, times `sign`."""
+    line_revenue = OrderItem.quantity * func.coalesce(OrderItem.unit_price, MenuItem.price, 0)
+    items = (
+        select()
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(MenuItem, MenuItem.id == OrderItem.menu_item_id)
+        .where(orders_filter)
+    )
+    category = func.coalesce(MenuItem.category, "")
+    return {
+        DailyRevenue: (
+            select(_order_day(dialect_name), sign * func.count(), _total(sign * func.sum(Order.total_amount)))
+            .where(orders_filter, Order.order_date.is_not(None))
+            .group_by(_order_day(dialect_name))
+        ),
+        MenuItemSales: items.add_columns(
+            OrderItem.menu_item_id, sign * func.count(distinct(OrderItem.order_id)),
+            sign * func.sum(OrderItem.quantity), _total(sign * func.sum(line_revenue)),
+        ).group_by(OrderItem.menu_item_id),
+        CategorySales: items.add_columns(
+            category, sign * func.sum(OrderItem.quantity), _total(sign * func.sum(line_revenue)),
+        ).group_by(category),
+    }
+
+
+def _total(value):
+    """Amounts are kept rounded to the cent, so float error does not build up over many increments."""
+    return func.round(value, 2) if isinstance(value.type, Numeric) else value
+
+
+def _columns(model) -> list:
+    return [column.name for column in model.__table__.columns]
+
+
+@lru_cache
+def _compiled_upserts(dialect) -> list:
+    """The upserts of `apply_orders` for one order, compiled once per dialect.
+
+    SQLAlchemy does not cache the compilation of dialect-specific INSERTs, and compiling these three takes far longer
+    than running them.
+    """
+    upsert = postgresql.insert if dialect.name == "postgresql" else sqlite.insert
+    orders_filter = Order.id == bindparam("order_id", type_=Integer)
+    compiled = []
+    for model, rows in _rollup_selects(dialect.name, orders_filter, bindparam("sign", type_=Integer)).items():
+        table = model.__table__
+        keys = [column.name for column in table.primary_key]
+        statement = upsert(table).from_select(_columns(model), rows)
+        totals = {
+            column.name: _total(column + statement.excluded[column.name])
+            for column in table.columns if column.name not in keys
+        }
+        compiled.append(statement.on_conflict_do_update(index_elements=keys, set_=totals).compile(dialect=dialect))
+    return compiled
+
+
+def apply_orders(db: Session, order_ids: list, sign: int = 1):
+    """Add the totals of the orders with `order_ids` to the rollups, or take them back with `sign=-1`.
+
+    Runs one executemany per rollup table. The caller decides whether an order counts (it is not cancelled) and
+    commits.
+    """
+    if not order_ids:
+        return
+    db.flush()  # the orders and items written in this transaction must be seen by the SELECTs
+    connection = db.connection()
+    for compiled in _compiled_upserts(connection.dialect):
+        rows = [{**compiled.params, "order_id": order_id, "sign": sign} for order_id in order_ids]
+        if compiled.positional:
+            rows = [tuple(row[name] for name in compiled.positiontup) for row in rows]
+        connection.exec_driver_sql(compiled.string, rows)
+
+
+def counts_in_rollups(status: str) -> bool:
+    return status != OrderStatus.CANCELLED.value
+
+
+def rebuild_rollups(db: Session):
+    """Recompute every rollup from the orders and their items. The caller commits."""
+    dialect_name = db.get_bind().dialect.name
+    for model, rows in _rollup_selects(dialect_name, Order.status != OrderStatus.CANCELLED.value).items():
+        db.execute(delete(model))
+        db.execute(insert(model).from_select(_columns(model), rows))
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    start = time.perf_counter()
+    with SessionLocal() as session:
+        rebuild_rollups(session)
+        session.commit()
+    print(f"Rollups rebuilt in {time.perf_counter() - start:.2f}s")
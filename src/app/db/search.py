@@ -0,0 +1,114 @@
+"""SQLite FTS5 full-text indexes over menu items and customers.
+
+Each index is an external-content FTS5 table (it stores only the index, the text stays in the source table) kept in
+sync by triggers, so every write path, including bulk inserts and raw SQL, updates it. The indexes are created with
+the tables by `Base.metadata.create_all` and filled from existing rows the first time they are created.
+Other databases have no FTS5; there `q=` searches fall back to ILIKE (see `routers/search.py`).
+"""
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, event, text
+
+from .database import Base
+
+
+class SearchIndex:
+    """FTS5 index `<source>_fts` over the text `columns` of the `source` table."""
+
+    def __init__(self, source: str, columns: tuple):
+        self.source = source
+        self.columns = columns
+        self.name = f"{source}_fts"
+
+    def ddl(self) -> list:
+        columns = ", ".join(self.columns)
+        new_values = ", ".join(f"new.{column}" for column in self.columns)
+        old_values = ", ".join(f"old.{column}" for column in self.columns)
+        delete_old = (f"INSERT INTO {self.name}({self.name}, rowid, {columns}) "
+                      f"VALUES ('delete', old.id, {old_values});")
+        insert_new = f"INSERT INTO {self.name}(rowid, {columns}) VALUES (new.id, {new_values});"
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.name} USING fts5({columns}, content='{self.source}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_ai AFTER INSERT ON {self.source} BEGIN {insert_new} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_ad AFTER DELETE ON {self.source} BEGIN {delete_old} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.name}_au AFTER UPDATE OF {columns} ON {self.source} "
+            f"BEGIN {delete_old} {insert_new} END",
+        ]
+
+
+SEARCH_INDEXES = {
+    "menu_items": SearchIndex("menu_items", ("name", "ingredients", "labels", "category")),
+    "customers": SearchIndex("customers", ("firstname", "lastname", "email", "phone")),
+}
+
+# Queryable shapes of the FTS tables, kept out of Base.metadata so create_all does not create them as plain tables.
+# `rank` is FTS5's bm25 relevance (lower is better) and the column named after the table is the MATCH target.
+search_metadata = MetaData()
+SEARCH_TABLES = {
+    source: Table(
+        index.name, search_metadata,
+        Column("rowid", Integer, primary_key=True),
+        Column("rank", Float),
+        Column(index.name, String),
+        *(Column(column, String) for column in index.columns),
+    )
+    for source, index in SEARCH_INDEXES.items()
+}
+
+
+def search_terms(q: str) -> list:
+    """The words of a search query; punctuation (including FTS5 operators) only separates words."""
+    return re.findall(r"\w+", q)
+
+
+def match_expression(terms: list) -> str:
+    """FTS5 query matching rows that contain every term as a prefix, eg. ["mar", "sim"] -> "mar"* "sim"*."""
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_search_indexes(target, connection, **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    for index in SEARCH_INDEXES.values():
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": index.name}
+        ).first()
+        for statement in index.ddl():
+            connection.exec_driver_sql(statement)
+        if not exists:  # index rows that were there before the index
+            connection.exec_driver_sql(f"INSERT INTO {index.name}({index.name}) VALUES ('rebuild')")
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def drop_search_indexes(target, connection, **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    for index in SEARCH_INDEXES.values():
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {index.name}")
+
+
+@contextmanager
+def search_index_rebuilt_after(connection, source: str):
+    """Suspend the index triggers of the `source` table, then rebuild its index in one pass.
+
+    Much faster than per-row trigger updates when loading many rows into an empty table. Dropping the triggers is
+    part of the caller's transaction, so on an error the caller's rollback restores them along with the table.
+    """
+    if connection.dialect.name != "sqlite":
+        yield
+        return
+    index = SEARCH_INDEXES[source]
+    if not connection.connection.dbapi_connection.in_transaction:
+        # pysqlite only opens a transaction before DML: DDL run first would be committed at once
+        connection.exec_driver_sql("BEGIN")
+    for trigger in ("ai", "ad", "au"):
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {index.name}_{trigger}")
+    try:
+        yield
+    finally:
+        for statement in index.ddl():
+            connection.exec_driver_sql(statement)
+    connection.exec_driver_sql(f"INSERT INTO {index.name}({index.name}) VALUES ('rebuild')")
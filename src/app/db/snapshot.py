@@ -0,0 +1,86 @@
+"""Prebuilt, seeded SQLite databases ("snapshots") for a fast cold start.
+
+`build_snapshot` runs the migrations and every loader into a new database file once, eg. while building the container
+image; with DB_SEED_MODE=snapshot the app starts by copying that file over its own database (`restore_snapshot`)
+instead of loading the init_data files, unless its database is already seeded (`is_seeded`).
+
+    python -m src.app.db.snapshot [path]
+"""
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.orm import sessionmaker
+
+from .database import Base, engine
+from .migrations import run_migrations
+from .models import SeedState
+
+DB_SNAPSHOT_PATH = Path(os.getenv("DB_SNAPSHOT_PATH", Path(__file__).parent / "snapshot.db"))
+
+
+def database_path(db_engine=engine) -> Path:
+    """File of a SQLite engine's database; snapshots only exist for file-based SQLite databases."""
+    if db_engine.dialect.name != "sqlite" or db_engine.url.database in (None, "", ":memory:"):
+        raise ValueError(f"Snapshots need a file-based SQLite database, not {db_engine.url!r}")
+    return Path(db_engine.url.database)
+
+
+def build_snapshot(path: Path = DB_SNAPSHOT_PATH) -> Path:
+    """Create the tables and load all datasets into a new database file at `path`, replacing any previous one.
+
+    The file is written next to `path` and renamed into place when complete, so a failed build leaves the previous
+    snapshot intact.
+    """
+    from .initial_data_loader import seed_datasets  # imported here: the loader imports this module
+
+    path = Path(path)
+    building = path.with_name(path.name + ".building")
+    building.unlink(missing_ok=True)
+    snapshot_engine = create_engine(f"sqlite:///{building}")
+    try:
+        Base.metadata.create_all(bind=snapshot_engine)
+        with sessionmaker(bind=snapshot_engine, autoflush=False)() as db:
+            run_migrations(db)
+            seed_datasets(db)
+        with snapshot_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            # Query planner statistics and a compact file, so every start from this snapshot gets them for free
+            connection.execute(text("ANALYZE"))
+            connection.execute(text("VACUUM"))
+    finally:
+        snapshot_engine.dispose()
+    os.replace(building, path)
+    return path
+
+
+def is_seeded(db_engine=engine) -> bool:
+    """Whether the engine's database already had datasets loaded, so it may hold data a snapshot would wipe out."""
+    if not inspect(db_engine).has_table(SeedState.__tablename__):
+        return False
+    with db_engine.connect() as connection:
+        return connection.execute(select(SeedState.name).limit(1)).first() is not None
+
+
+def restore_snapshot(snapshot: Path = DB_SNAPSHOT_PATH, db_engine=engine):
+    """Replace the engine's database file with a copy of `snapshot`.
+
+    The copy is renamed over the database, so the database file is never half-written. The engine's pooled
+    connections (still on the old file) are closed first, and a stale WAL of the old file is removed, as SQLite would
+    otherwise replay it into the new one.
+    """
+    target = database_path(db_engine)
+    copying = target.with_name(target.name + ".restoring")
+    shutil.copyfile(snapshot, copying)
+    db_engine.dispose()
+    for suffix in ("-wal", "-shm", "-journal"):
+        target.with_name(target.name + suffix).unlink(missing_ok=True)
+    os.replace(copying, target)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    built = build_snapshot(Path(sys.argv[1]) if len(sys.argv) > 1 else DB_SNAPSHOT_PATH)
+    print(f"Snapshot {built} built in {time.perf_counter() - start:.2f}s")
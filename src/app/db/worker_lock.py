@@ -0,0 +1,71 @@
+"""Startup coordination between the worker processes serving the same database (`uvicorn --workers N`, gunicorn).
+
+Two lock files sit next to the database: "<db>.startup", held exclusively by the worker starting up, so startups
+run one at a time; and "<db>.workers", which every started worker holds a shared lock on until it exits. A worker
+that can lock "<db>.workers" exclusively is the only one alive, ie. the first of a new launch: it loads the data,
+while workers started next to it (or restarted by the process manager) find the database in use and leave it alone.
+The OS drops the locks of a process that dies, so a crashed launch never blocks the next one.
+"""
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, one worker per database
+    fcntl = None
+
+from .database import engine
+
+
+def lock_path(db_engine=engine) -> Path:
+    """Base path of the lock files: next to a SQLite database file, else in the temp directory."""
+    database = db_engine.url.database
+    if db_engine.dialect.name == "sqlite" and database not in (None, "", ":memory:"):
+        return Path(database)
+    digest = hashlib.sha256(db_engine.url.render_as_string(hide_password=False).encode()).hexdigest()[:16]
+    return Path(tempfile.gettempdir()) / f"restaurant-db-{digest}"
+
+
+class WorkerLock:
+    """Decides which worker process loads the database; see the module docstring."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._workers = None  # our "<db>.workers" file, kept open (and locked) while the process runs
+
+    @contextmanager
+    def startup(self):
+        """Wait for the other workers' startups, then yield whether this worker is the first one alive.
+
+        The block runs while the other workers wait, so the first worker can load the database undisturbed.
+        """
+        if fcntl is None:
+            yield True
+            return
+        with open(self.path.with_name(self.path.name + ".startup"), "a") as startup:
+            fcntl.flock(startup, fcntl.LOCK_EX)
+            self.release()  # starting again in the same process: our own lock must not count
+            self._workers = open(self.path.with_name(self.path.name + ".workers"), "a")
+            try:
+                fcntl.flock(self._workers, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                first = True
+            except BlockingIOError:
+                first = False
+            try:
+                yield first
+            except BaseException:
+                self.release()  # let the next worker try again
+                raise
+            if self._workers is not None:  # unless released meanwhile, by a shutdown
+                fcntl.flock(self._workers, fcntl.LOCK_SH)  # from now on, one of the workers alive
+
+    def release(self):
+        """Stop counting as a running worker, eg. on shutdown."""
+        if self._workers is not None:
+            self._workers.close()
+            self._workers = None
+
+
+worker_lock = WorkerLock(lock_path())
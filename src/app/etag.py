@@ -0,0 +1,68 @@
+"""Strong ETags for catalog endpoints, so clients can revalidate with `If-None-Match` and get a 304.
+
+Opening hours derive theirs from per-table version counters instead of the response body: routers bump a table's
+version whenever they write to it, so checking `If-None-Match` needs neither a query nor serialization. Counters live
+in memory, so these ETags include an id of the running process and never match after a restart or across workers.
+
+Menu responses, which are cached, use `body_etag`: a digest of the cached body, computed once when it is loaded. It
+is the same in every worker for the same data and is only as old as the cached entry, so a write made through another
+worker changes it once the entry expires, like the body.
+"""
+import hashlib
+import os
+import threading
+import uuid
+
+from fastapi import Request, Response
+
+PROCESS_ID = uuid.uuid4().hex[:12]
+
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "0"))  # seconds clients may reuse a response without asking
+CATALOG_CACHE_CONTROL = f"public, max-age={CATALOG_MAX_AGE}, must-revalidate"
+
+
+class TableVersions:
+    """Version counter per table, bumped on every write through the routers."""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, table: str) -> int:
+        return self._versions.get(table, 0)
+
+    def bump(self, table: str):
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+
+table_versions = TableVersions()
+
+
+def make_etag(tables: list, *params) -> str:
+    """ETag for a response built from `tables` with the given request parameters."""
+    versions = ".".join(str(table_versions.get(table)) for table in tables)
+    digest = hashlib.blake2b(repr(params).encode(), digest_size=8).hexdigest()
+    return f'"{PROCESS_ID}-{versions}-{digest}"'
+
+
+def body_etag(body: bytes, headers: dict) -> str:
+    """ETag for a response with `body` and `headers`."""
+    digest = hashlib.blake2b(body, digest_size=8)
+    digest.update(repr(sorted(headers.items())).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def catalog_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+
+
+def not_modified(request: Request, etag: str):
+    """A 304 response if the client already has `etag`, else None."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=catalog_headers(etag))
+    return None
@@ -0,0 +1,124 @@
+"""Idempotency keys for order creation, so clients can retry a POST whose response they never got.
+
+The first request with a given `Idempotency-Key` header creates the order and stores its response in the
+idempotency_keys table, in the same transaction as the order; retries with the same key and body get that response
+back without anything being looked up or inserted again. Keys expire after `ttl` seconds; recently stored ones are
+also kept in memory, in front of the table.
+
+Duplicates arriving while the first request is still running: in one process, requests with the same key take turns
+(`lock`, or `async_lock` on the event loop), so the later ones find the stored response. Across worker processes both
+may insert an order, but only one transaction can store the key: the other fails on the primary key, is rolled back
+with its order, and answers with the response stored by the first.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from .cache import TTLCache
+from .db.models import IdempotencyKey
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def request_hash(payload) -> str:
+    """Fingerprint of a request body (a pydantic model), to tell a retry from another request reusing its key."""
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Stored responses by idempotency key, in the database with an in-memory front cache; see the module docstring."""
+
+    def __init__(self, ttl: float = 86400, cache_size: int = 1000, purge_interval: float = 60):
+        self.ttl = ttl
+        self.cache = TTLCache(max_size=cache_size, ttl=ttl)
+        self.purge_interval = purge_interval  # seconds between deletions of the expired keys
+        self._purged_at = None
+        self._guard = threading.Lock()
+        self._locks = {}  # key -> [lock, number of requests holding or waiting for it]
+        self._async_locks = {}
+        self.replayed = 0
+
+    def _enter(self, locks: dict, key: str, factory):
+        with self._guard:
+            entry = locks.get(key)
+            if entry is None:
+                entry = locks[key] = [factory(), 0]
+            entry[1] += 1
+        return entry
+
+    def _leave(self, locks: dict, key: str, entry: list):
+        with self._guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del locks[key]
+
+    @contextmanager
+    def lock(self, key: str):
+        """Let one thread at a time handle the requests with `key`."""
+        entry = self._enter(self._locks, key, threading.Lock)
+        try:
+            with entry[0]:
+                yield
+        finally:
+            self._leave(self._locks, key, entry)
+
+    @asynccontextmanager
+    async def async_lock(self, key: str):
+        """`lock` for handlers on the event loop, where waiting for a thread lock would block every other request."""
+        entry = self._enter(self._async_locks, key, asyncio.Lock)
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            self._leave(self._async_locks, key, entry)
+
+    def _oldest(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.ttl)
+
+    def get(self, db: Session, key: str) -> Optional[tuple]:
+        """The (request hash, response body) stored for `key`, or None if there is none or it expired."""
+        stored = self.cache.get(key)
+        if stored is None:
+            row = db.execute(
+                select(IdempotencyKey.request_hash, IdempotencyKey.response)
+                .where(IdempotencyKey.key == key, IdempotencyKey.created_at > self._oldest())
+            ).first()
+            stored = tuple(row) if row is not None else None
+        return stored
+
+    def add(self, db: Session, key: str, request_hash: str, response: str):
+        """Store the response to `key` in the caller's transaction; `remember` it once committed.
+
+        An expired entry of the same key is replaced, and every expired key is deleted now and then.
+        """
+        oldest = self._oldest()
+        now = time.monotonic()
+        if self._purged_at is None or now - self._purged_at >= self.purge_interval:
+            self._purged_at = now
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at <= oldest))
+        else:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.created_at <= oldest))
+        db.add(IdempotencyKey(key=key, request_hash=request_hash, response=response))
+
+    def remember(self, key: str, request_hash: str, response: str):
+        self.cache.set(key, (request_hash, response))
+
+    def replay(self, stored: tuple, request_hash: str) -> Response:
+        """The stored response, if it answers the same request; 422 for a key reused with another body."""
+        stored_hash, response = stored
+        if stored_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        with self._guard:
+            self.replayed += 1
+        return Response(content=response, media_type="application/json", headers={REPLAYED_HEADER: "true"})
+
+    def stats(self) -> dict:
+        return {"replayed": self.replayed, "in_flight": len(self._locks) + len(self._async_locks), **self.cache.stats()}
@@ -1,17 +1,104 @@
+import os
+import threading
+import traceback
+
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from .db.database import SessionLocal
+from .db.group_commit import GroupCommitWriter
 from .db.initial_data_loader import load_initial_data
-from .routers import customers, menu_items, opening_hours, orders
+from .db.worker_lock import worker_lock
+from .routers import events, export, health
+from .routers.health import readiness
+from .routers.menu_items import menu_cache, menu_index
+from .routers.opening_hours import opening_schedule
+from .routers.pagination import NEXT_CURSOR_HEADER
+
+# "sync" serves requests from Starlette's threadpool, "async" from the event loop with an async engine
+API_MODE = os.getenv("API_MODE", "sync")
+
+if API_MODE == "async":
+    from .routers.aio import analytics, customers, diagnostics, menu_items, opening_hours, orders
+elif API_MODE == "sync":
+    from .routers import analytics, customers, diagnostics, menu_items, opening_hours, orders
+else:
+    raise ValueError(f"Unknown API_MODE {API_MODE!r}, expected 'sync' or 'async'")
+
+# Group commit of order creations (see db/group_commit.py): concurrent orders share one transaction and fsync.
+# Only in sync mode: async handlers run on the event loop, which must not block waiting for the writer thread.
+ORDER_GROUP_COMMIT = os.getenv("ORDER_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+if ORDER_GROUP_COMMIT:
+    if API_MODE != "sync":
+        raise ValueError("ORDER_GROUP_COMMIT requires API_MODE=sync")
+    orders.order_writer = GroupCommitWriter(
+        SessionLocal, orders.insert_orders,
+        max_batch=int(os.getenv("ORDER_GROUP_COMMIT_MAX_BATCH", "100")),
+        max_wait=float(os.getenv("ORDER_GROUP_COMMIT_WAIT", "0.002")),  # seconds
+        timeout=float(os.getenv("ORDER_GROUP_COMMIT_TIMEOUT", "30")),  # seconds
+    )
+
+# Seconds clients are told to wait (Retry-After) when they call the API before startup has finished
+STARTUP_RETRY_AFTER = int(os.getenv("STARTUP_RETRY_AFTER", "2"))
 
 app = FastAPI()
 
 
+def warm_up():
+    """Load the initial data and reset the in-memory caches, then mark the app ready. Runs in its own thread."""
+    try:
+        load_initial_data()
+        menu_cache.clear()
+        menu_index.clear()
+        opening_schedule.clear()
+    except Exception as e:
+        traceback.print_exc()
+        readiness.mark_failed(f"loading initial data failed: {e}")
+    else:
+        readiness.mark_ready()
+
+
 @app.on_event("startup")
 async def startup_event():
-    await load_initial_data()
+    # Seeding is blocking database work: it runs beside the event loop, which meanwhile answers the health checks
+    # and turns other requests away (see reject_until_ready)
+    readiness.mark_not_ready("loading initial data")
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if ORDER_GROUP_COMMIT:
+        orders.order_writer.close()  # commits the orders still queued
+    worker_lock.release()
 
 
+class RejectUntilReady:
+    """Answer 503 with Retry-After until startup has finished, instead of serving from a half-loaded database.
+
+    A plain ASGI middleware: once the app is ready, requests (and streamed responses) pass straight through, without
+    the per-request wrapping of `@app.middleware("http")`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if readiness.ready or scope["type"] != "http" or scope["path"].startswith("/health/"):
+            await self.app(scope, receive, send)
+            return
+        response = JSONResponse(
+            status_code=503,
+            content={"detail": f"Service is starting: {readiness.detail}"},
+            headers={"Retry-After": str(STARTUP_RETRY_AFTER)},
+        )
+        await response(scope, receive, send)
+
+
+# Added before CORS, which therefore stays outermost and decorates these 503s too
+app.add_middleware(RejectUntilReady)
+
 origins = ["http://localhost:3000", "http://127.0.0.1:3000"]
 
 app.add_middleware(
@@ -20,10 +107,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
+# Order event streams serve both API modes; included before the orders router, whose /orders/{order_id} would
+# otherwise catch /orders/events
+app.include_router(events.router, prefix="/api", tags=["Orders"])
 app.include_router(customers.router, prefix="/api", tags=["Customers"])
 app.include_router(menu_items.router, prefix="/api")
 app.include_router(orders.router, prefix="/api", tags=["Orders"])
 app.include_router(opening_hours.router, prefix="/api", tags=["OpeningHours"])
+app.include_router(analytics.router, prefix="/api", tags=["Analytics"])
+app.include_router(diagnostics.router, prefix="/api", tags=["Diagnostics"])
+
+# Probes stay outside /api, where load balancers and orchestrators expect them
+app.include_router(health.router, tags=["Health"])
+
+# Exports stream from their own connection, so they are served by the same router in both modes
+app.include_router(export.router, prefix="/api", tags=["Export"])
@@ -0,0 +1,118 @@
+"""Typo-tolerant search over menu item names, ingredients and categories.
+
+Words are indexed by their character trigrams ("carbonara" -> " ca", "car", "arb", ...), so a misspelt word still
+shares most trigrams with the right one. A query word matches every indexed word whose trigram sets are similar
+enough (Jaccard similarity), and items are ranked by how well all query words match, name matches counting most.
+The index keeps a copy of each item, so searches need no database query.
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+FIELD_WEIGHTS = {"name": 1.0, "category": 0.6, "ingredients": 0.5}
+MIN_SIMILARITY = 0.3  # minimum trigram similarity of a query word and an indexed word
+
+
+def normalize(text: str) -> list:
+    """Lowercase words of `text` without accents, eg. "Tiramisù!" -> ["tiramisu"]."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MenuSearchIndex:
+    """In-memory trigram index of menu items, updated item by item as they are created or changed.
+
+    The index is per process; `stale(max_age)` tells when it should be rebuilt from the database to pick up
+    changes made through other workers (a max age of 0: never, once built).
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forget all items; the index is rebuilt on its next use."""
+        self._items = {}                        # item id -> item
+        self._item_words = {}                   # item id -> {word: weight}
+        self._word_items = defaultdict(dict)    # word -> {item id: weight}
+        self._word_trigrams = {}                # word -> its trigrams
+        self._postings = defaultdict(set)       # trigram -> words containing it
+        self.built_at = None
+
+    def stale(self, max_age: float) -> bool:
+        return self.built_at is None or 0 < max_age <= self._clock() - self.built_at
+
+    def rebuild(self, items):
+        with self._lock:
+            self.clear()
+            for item in items:
+                self._add(item)
+            self.built_at = self._clock()
+
+    def add(self, item):
+        """Index `item` (anything with id, name, ingredients and category), replacing its previous version."""
+        with self._lock:
+            self._add(item)
+
+    def _add(self, item):
+        self._remove(item.id)
+        words = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for word in normalize(getattr(item, field)):
+                words[word] = max(weight, words.get(word, 0))
+        self._items[item.id] = item
+        self._item_words[item.id] = words
+        for word, weight in words.items():
+            if word not in self._word_trigrams:
+                self._word_trigrams[word] = trigrams(word)
+                for trigram in self._word_trigrams[word]:
+                    self._postings[trigram].add(word)
+            self._word_items[word][item.id] = weight
+
+    def _remove(self, item_id: int):
+        for word in self._item_words.pop(item_id, {}):
+            del self._word_items[word][item_id]
+            if not self._word_items[word]:
+                del self._word_items[word]
+                for trigram in self._word_trigrams.pop(word):
+                    self._postings[trigram].discard(word)
+        self._items.pop(item_id, None)
+
+    def _similar_words(self, word: str) -> dict:
+        """Indexed words similar to `word`, with their similarity."""
+        query_trigrams = trigrams(word)
+        shared = defaultdict(int)
+        for trigram in query_trigrams:
+            for candidate in self._postings.get(trigram, ()):
+                shared[candidate] += 1
+        similar = {}
+        for candidate, count in shared.items():
+            similarity = count / (len(query_trigrams) + len(self._word_trigrams[candidate]) - count)
+            if similarity >= MIN_SIMILARITY:
+                similar[candidate] = similarity
+        return similar
+
+    def search(self, query: str, limit: int) -> list:
+        """Items best matching `query`, best first, as (item, score) pairs.
+
+        An item's score is the sum, over the query words, of its best weighted similarity to that word.
+        """
+        with self._lock:
+            scores = defaultdict(float)
+            for word in set(normalize(query)):
+                best = {}
+                for candidate, similarity in self._similar_words(word).items():
+                    for item_id, weight in self._word_items[candidate].items():
+                        best[item_id] = max(best.get(item_id, 0), similarity * weight)
+                for item_id, score in best.items():
+                    scores[item_id] += score
+            ranked = sorted(scores.items(), key=lambda entry: (-entry[1], entry[0]))[:limit]
+            return [(self._items[item_id], score) for item_id, score in ranked]
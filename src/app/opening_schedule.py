@@ -0,0 +1,98 @@
+"""Opening hours parsed into per-minute tables, so "are we open at ..." needs no query and no parsing.
+
+The week has 10080 minutes; for each kind of hours (normal and VIP) the schedule stores, per minute of the week,
+whether the restaurant is open and how many minutes remain until that changes. A status lookup is two array reads.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from .db.models import DAYS
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def parse_time(value: str) -> int:
+    """Minutes since midnight of an "H:MM" time, eg. "9:30" -> 570. "24:00" is the end of the day."""
+    hours, minutes = value.strip().split(":")
+    minute = int(hours) * 60 + int(minutes)
+    if not 0 <= minute <= MINUTES_PER_DAY or not 0 <= int(minutes) < 60:
+        raise ValueError(f"Invalid time {value!r}")
+    return minute
+
+
+def _minutes_until_change(open_minutes: bytes):
+    """Per minute of the week, minutes until the open/closed state changes; None if it never does."""
+    if len(set(open_minutes)) < 2:
+        return None
+    until = [0] * MINUTES_PER_WEEK
+    distance = 0
+    # Walk backwards through two weeks, so the week wraps around: on the second pass every distance is known
+    for position in range(2 * MINUTES_PER_WEEK - 1, -1, -1):
+        minute = position % MINUTES_PER_WEEK
+        following = (minute + 1) % MINUTES_PER_WEEK
+        distance = 1 if open_minutes[minute] != open_minutes[following] else distance + 1
+        until[minute] = distance
+    return tuple(until)
+
+
+class OpeningSchedule:
+    """Immutable schedule built from opening_hours rows (objects with day, start, end, status and is_special).
+
+    A row whose end is not after its start runs past midnight into the next day.
+    """
+
+    def __init__(self, rows):
+        self.rows = tuple(rows)
+        self._open = {}
+        self._until_change = {}
+        for special in (False, True):
+            open_minutes = bytearray(MINUTES_PER_WEEK)
+            for row in self.rows:
+                if row.is_special != special or row.status != "open" or not row.start or not row.end:
+                    continue
+                day_start = DAYS.index(row.day.lower()) * MINUTES_PER_DAY
+                start, end = parse_time(row.start), parse_time(row.end)
+                if end <= start:
+                    end += MINUTES_PER_DAY
+                for minute in range(day_start + start, day_start + end):
+                    open_minutes[minute % MINUTES_PER_WEEK] = 1
+            self._open[special] = bytes(open_minutes)
+            self._until_change[special] = _minutes_until_change(self._open[special])
+
+    def status(self, at: datetime, special: bool = False) -> dict:
+        """Whether the restaurant is open at `at` (local time) and when it next closes or opens."""
+        minute = at.weekday() * MINUTES_PER_DAY + at.hour * 60 + at.minute
+        is_open = bool(self._open[special][minute])
+        until_change = self._until_change[special]
+        change_at = None
+        if until_change is not None:
+            change_at = at.replace(second=0, microsecond=0) + timedelta(minutes=until_change[minute])
+        return {
+            "at": at,
+            "special": special,
+            "open": is_open,
+            "closes_at": change_at if is_open else None,
+            "next_open": None if is_open else change_at,
+        }
+
+
+class CurrentSchedule:
+    """The schedule of the opening_hours table, rebuilt when the table's version (see etag.py) changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._current = (None, None)  # (table version, schedule), replaced as a whole
+
+    def get(self, version: int, load_rows) -> OpeningSchedule:
+        built_for, schedule = self._current
+        if schedule is None or built_for != version:
+            with self._lock:
+                built_for, schedule = self._current
+                if schedule is None or built_for != version:
+                    schedule = OpeningSchedule(load_rows())
+                    self._current = (version, schedule)
+        return schedule
@@ -0,0 +1,117 @@
+"""In-process publish/subscribe of order status changes, pushed to clients as Server-Sent Events.
+
+Handlers publish after committing, from any thread; subscribers are asyncio tasks (the SSE streams) on the event
+loop. Each published event crosses to the loop once, and is then handed only to the subscriptions of its order, its
+customer and of all orders. Every subscription buffers at most `queue_size` events: a consumer that falls behind
+loses its oldest events and is told how many it missed, so it can refetch, instead of growing memory without bound
+or slowing down the publishers.
+"""
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+ALL_ORDERS = ("all",)
+
+
+class Subscription:
+    """The events of one subscriber, read with `await subscription.get()`."""
+
+    def __init__(self, broker, key: tuple, queue_size: int):
+        self.broker = broker
+        self.key = key
+        self.dropped = 0  # events lost since the last `get`, because the buffer was full
+        self._events = deque(maxlen=queue_size)
+        self._ready = asyncio.Event()
+
+    def put(self, event: dict):
+        """Buffer an event, dropping the oldest one when full. Called on the event loop."""
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+            self.broker.dropped += 1
+        self._events.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None):
+        """The next event, or None on timeout. A {"type": "lagged"} event reports the events dropped before it."""
+        if not self._events:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            return {"type": "lagged", "dropped": dropped}
+        return self._events.popleft()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class OrderEventBroker:
+    """Routes published order events to the subscriptions of the order, of its customer and of all orders."""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._loop = None
+        self._subscriptions = {}  # key -> set of subscriptions
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, order_id: Optional[int] = None, customer_id: Optional[int] = None) -> Subscription:
+        """Subscribe to the events of an order, of a customer's orders, or of all orders. Called on the event loop."""
+        if order_id is not None:
+            key = ("order", order_id)
+        elif customer_id is not None:
+            key = ("customer", customer_id)
+        else:
+            key = ALL_ORDERS
+        subscription = Subscription(self, key, self.queue_size)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscriptions.setdefault(key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.key]
+
+    def publish(self, order_id: int, customer_id: int, status: str, previous_status: Optional[str] = None):
+        """Announce an order's new status; safe to call from any thread. No-op while nobody subscribes."""
+        event = {
+            "type": "status", "order_id": order_id, "customer_id": customer_id, "status": status,
+            "previous_status": previous_status, "at": datetime.utcnow().isoformat(),
+        }
+        with self._lock:
+            self.published += 1
+            loop = self._loop if self._subscriptions else None
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, event)
+
+    def _deliver(self, event: dict):
+        with self._lock:
+            subscriptions = [
+                subscription
+                for key in (("order", event["order_id"]), ("customer", event["customer_id"]), ALL_ORDERS)
+                for subscription in self._subscriptions.get(key, ())
+            ]
+            self.delivered += len(subscriptions)
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscriptions": sum(len(subscribers) for subscribers in self._subscriptions.values()),
+                "published": self.published,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+            }
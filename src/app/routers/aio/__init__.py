@@ -0,0 +1,31 @@
+"""Async versions of the API routers, mounted instead of the sync ones when API_MODE=async.
+
+Each handler awaits the matching sync handler through `AsyncSession.run_sync`, so the query logic lives in one
+place while the database I/O goes through the async driver instead of occupying Starlette's threadpool.
+"""
+from functools import lru_cache
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@lru_cache
+def _adapter(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+async def run_handler(db: AsyncSession, handler, response_model, **kwargs):
+    """Run a sync handler on the session's sync facade.
+
+    The result is serialized inside `run_sync` as lazy-loaded attributes can only be loaded there.
+    Handlers that render their own `Response` (eg. from a cache) are passed through as is.
+    """
+
+    def call(session):
+        result = handler(db=session, **kwargs)
+        if isinstance(result, Response):
+            return result
+        return _adapter(response_model).validate_python(result, from_attributes=True)
+
+    return await db.run_sync(call)
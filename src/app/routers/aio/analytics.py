@@ -0,0 +1,39 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.async_database import get_async_db
+from .. import analytics
+from ..schemas import CategorySalesSchema, DailyRevenueSchema, MenuItemSalesSchema, SalesSortKey
+from . import run_handler
+
+router = APIRouter()
+
+
+@router.get("/analytics/revenue/daily", response_model=List[DailyRevenueSchema])
+async def get_daily_revenue(
+        db: AsyncSession = Depends(get_async_db),
+        date_from: Optional[date] = Query(None, description="First day, included"),
+        date_to: Optional[date] = Query(None, description="Last day, included")
+):
+    """Number of orders and revenue per day, cancelled orders excluded, oldest day first."""
+    return await run_handler(db, analytics.get_daily_revenue, List[DailyRevenueSchema], date_from=date_from,
+                             date_to=date_to)
+
+
+@router.get("/analytics/menu-items", response_model=List[MenuItemSalesSchema])
+async def get_menu_item_sales(
+        db: AsyncSession = Depends(get_async_db),
+        sort: SalesSortKey = Query(SalesSortKey.quantity, description="Rank by quantity sold or by revenue"),
+        limit: int = Query(10, ge=1, le=1000, description="Maximum number of menu items")
+):
+    """The best selling menu items, cancelled orders excluded."""
+    return await run_handler(db, analytics.get_menu_item_sales, List[MenuItemSalesSchema], sort=sort, limit=limit)
+
+
+@router.get("/analytics/categories", response_model=List[CategorySalesSchema])
+async def get_category_sales(db: AsyncSession = Depends(get_async_db)):
+    """Quantity sold and revenue per menu category, highest revenue first, cancelled orders excluded."""
+    return await run_handler(db, analytics.get_category_sales, List[CategorySalesSchema])
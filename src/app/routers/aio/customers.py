@@ -0,0 +1,47 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.async_database import get_async_db
+from .. import customers
+from ..pagination import CursorQuery, LimitQuery
+from ..schemas import CustomerCreate, CustomerInDB, CustomerUpdate
+from ..search import SearchQuery
+from . import run_handler
+
+router = APIRouter()
+
+
+@router.get("/customers", response_model=List[CustomerInDB])
+async def get_customers(
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+        firstname: Optional[str] = Query(None),
+        lastname: Optional[str] = Query(None),
+        email: Optional[str] = Query(None),
+        external_id: Optional[str] = Query(None),
+        phone: Optional[str] = Query(None),
+        q: Optional[str] = SearchQuery,
+        limit: int = LimitQuery,
+        cursor: Optional[str] = CursorQuery
+):
+    return await run_handler(db, customers.get_customers, List[CustomerInDB], firstname=firstname,
+                             lastname=lastname, email=email, external_id=external_id, phone=phone, q=q, limit=limit,
+                             cursor=cursor, response=response)
+
+
+@router.get("/customers/{customer_id}", response_model=CustomerInDB)
+async def get_customer_by_id(customer_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await run_handler(db, customers.get_customer_by_id, CustomerInDB, customer_id=customer_id)
+
+
+@router.post("/customers", response_model=CustomerInDB)
+async def create_customer(customer: CustomerCreate, db: AsyncSession = Depends(get_async_db)):
+    return await run_handler(db, customers.create_customer, CustomerInDB, customer=customer)
+
+
+@router.patch("/customers/{customer_id}", response_model=CustomerInDB)
+async def update_customer(customer_id: int, customer_update: CustomerUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await run_handler(db, customers.update_customer, CustomerInDB, customer_id=customer_id,
+                             customer_update=customer_update)
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.async_database import get_async_db
+from ...db.database import pool_statistics
+from ..events import order_events
+from ..menu_items import menu_cache
+from ..orders import idempotency_store
+
+router = APIRouter()
+
+
+@router.get("/diagnostics/pool")
+async def get_pool_statistics(db: AsyncSession = Depends(get_async_db)):
+    """Connection pool state (checked in/out, overflow) and checkout/wait counters."""
+    return pool_statistics(db.get_bind())
+
+
+@router.get("/diagnostics/cache")
+async def get_cache_statistics():
+    """Size and hit/miss/eviction counters of the menu cache."""
+    return menu_cache.stats()
+
+
+@router.get("/diagnostics/events")
+async def get_event_statistics():
+    """Open order event subscriptions and published/delivered/dropped event counters."""
+    return order_events.stats()
+
+
+@router.get("/diagnostics/idempotency")
+async def get_idempotency_statistics():
+    """Replayed responses, requests in flight per key, and the counters of the in-memory key cache."""
+    return idempotency_store.stats()
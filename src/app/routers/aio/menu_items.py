@@ -0,0 +1,65 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.async_database import get_async_db
+from ...db.ingredients import ALLERGENS
+from .. import menu_items
+from ..pagination import CursorQuery, LimitQuery
+from ..schemas import MenuItemCreate, MenuItemInDB, MenuItemUpdate
+from ..search import SearchQuery
+from . import run_handler
+
+router = APIRouter()
+
+
+@router.get("/menu-items", response_model=List[MenuItemInDB], tags=["Menu Items"])
+async def get_menu_items(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+        name: Optional[str] = Query(None),
+        category: Optional[str] = Query(None),
+        labels: Optional[str] = Query(None),
+        ingredients: Optional[str] = Query(None, description="Comma-separated ingredients the items must all contain"),
+        exclude_ingredients: Optional[str] = Query(None, description="Comma-separated ingredients to leave out"),
+        exclude_allergens: Optional[str] = Query(None, description=f"Comma-separated, any of {', '.join(ALLERGENS)}"),
+        q: Optional[str] = SearchQuery,
+        limit: int = LimitQuery,
+        cursor: Optional[str] = CursorQuery
+):
+    return await run_handler(db, menu_items.get_menu_items, List[MenuItemInDB], name=name, category=category,
+                             labels=labels, ingredients=ingredients, exclude_ingredients=exclude_ingredients,
+                             exclude_allergens=exclude_allergens, q=q, limit=limit,
+                             cursor=cursor, request=request, response=response)
+
+
+@router.get("/menu-items/search", response_model=List[MenuItemInDB], tags=["Menu Items"])
+async def search_menu_items(
+        db: AsyncSession = Depends(get_async_db),
+        q: str = Query(..., min_length=1, description="Words to look for in names, ingredients and categories"),
+        limit: int = Query(10, ge=1, le=100)
+):
+    return await run_handler(db, menu_items.search_menu_items, List[MenuItemInDB], q=q, limit=limit)
+
+
+@router.get("/menu-items/{item_id}", response_model=MenuItemInDB, tags=["Menu Items"])
+async def get_menu_item_by_id(request: Request, item_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await run_handler(db, menu_items.get_menu_item_by_id, MenuItemInDB, request=request, item_id=item_id)
+
+
+@router.get("/menu/{day}", response_model=List[MenuItemInDB], tags=["Menu by Day"])
+async def get_menu_by_day(request: Request, day: str, db: AsyncSession = Depends(get_async_db)):
+    return await run_handler(db, menu_items.get_menu_by_day, List[MenuItemInDB], request=request, day=day)
+
+
+@router.post("/menu-items", response_model=MenuItemInDB, tags=["Menu Items"])
+async def create_menu_item(menu_item: MenuItemCreate, db: AsyncSession = Depends(get_async_db)):
+    return await run_handler(db, menu_items.create_menu_item, MenuItemInDB, menu_item=menu_item)
+
+
+@router.patch("/menu-items/{item_id}", response_model=MenuItemInDB, tags=["Menu Items"])
+async def update_menu_item(item_id: int, menu_item_update: MenuItemUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await run_handler(db, menu_items.update_menu_item, MenuItemInDB, item_id=item_id,
+                             menu_item_update=menu_item_update)
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.async_database import get_async_db
+from .. import opening_hours
+from ..schemas import OpeningHoursSchema, OpeningStatus
+from . import run_handler
+
+router = APIRouter()
+
+
+@router.get("/opening-hours", response_model=List[OpeningHoursSchema])
+async def get_opening_hours_by_day(
+        request: Request,
+        response: Response,
+        day: Optional[str] = None,
+        special: Optional[bool] = False,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Get opening hours by day."""
+    return await run_handler(db, opening_hours.get_opening_hours_by_day, List[OpeningHoursSchema], request=request,
+                             response=response, day=day, special=special)
+
+
+@router.get("/opening-hours/status", response_model=OpeningStatus)
+async def get_opening_status(
+        db: AsyncSession = Depends(get_async_db),
+        at: Optional[datetime] = Query(None, description="Local time to check, default now"),
+        special: bool = Query(False, description="Use the VIP opening hours")
+):
+    """Whether the restaurant is open at `at` and, if so, when it closes, otherwise when it next opens."""
+    return await run_handler(db, opening_hours.get_opening_status, OpeningStatus, at=at, special=special)
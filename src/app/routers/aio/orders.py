@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db.async_database import get_async_db
+from .. import orders
+from ..pagination import MAX_PAGE_SIZE, CursorQuery, LimitQuery
+from ..schemas import OrderBatchResult, OrderCreate, OrderInDB, OrderStatus, OrderUpdate
+from . import run_handler
+
+router = APIRouter()
+
+
+@router.get("/orders", response_model=List[OrderInDB])
+async def get_orders(
+        response: Response,
+        db: AsyncSession = Depends(get_async_db),
+        customer_id: Optional[int] = Query(None),
+        status: Optional[OrderStatus] = Query(None),
+        date_from: Optional[datetime] = Query(None, description="Only orders placed at or after this time"),
+        date_to: Optional[datetime] = Query(None, description="Only orders placed before this time"),
+        limit: int = LimitQuery,
+        cursor: Optional[str] = CursorQuery
+):
+    """List orders oldest first, one page at a time (see the X-Next-Cursor response header)."""
+    return await run_handler(db, orders.get_orders, List[OrderInDB], customer_id=customer_id, status=status,
+                             date_from=date_from, date_to=date_to, limit=limit, cursor=cursor, response=response)
+
+
+@router.get("/orders/queue", response_model=List[OrderInDB])
+async def get_order_queue(
+        db: AsyncSession = Depends(get_async_db),
+        status: OrderStatus = Query(OrderStatus.pending),
+        limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of orders")
+):
+    """The kitchen's work queue: the oldest orders in `status`, oldest first."""
+    return await run_handler(db, orders.get_order_queue, List[OrderInDB], status=status, limit=limit)
+
+
+@router.post("/orders/queue/claim", response_model=List[OrderInDB])
+async def claim_orders(
+        db: AsyncSession = Depends(get_async_db),
+        status: OrderStatus = Query(OrderStatus.pending),
+        count: int = Query(1, ge=1, le=orders.MAX_CLAIM, description="Number of orders to claim")
+):
+    """Move the `count` oldest orders in `status` on to the next status and return them (see the sync handler)."""
+    return await run_handler(db, orders.claim_orders, List[OrderInDB], status=status, count=count)
+
+
+@router.get("/orders/{order_id}", response_model=OrderInDB)
+async def get_order_by_id(order_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await run_handler(db, orders.get_order_by_id, OrderInDB, order_id=order_id)
+
+
+@router.get("/orders_by_user/{user_id}", response_model=List[OrderInDB])
+async def get_orders_by_user_id(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Retrieve orders for a specific user by customer ID."""
+    return await run_handler(db, orders.get_orders_by_user_id, List[OrderInDB], user_id=user_id)
+
+
+@router.post("/orders", response_model=OrderInDB)
+async def create_order(
+        order_create: OrderCreate,
+        db: AsyncSession = Depends(get_async_db),
+        idempotency_key: Optional[str] = orders.IdempotencyKeyHeader
+):
+    if idempotency_key is None:
+        return await run_handler(db, orders.create_order, OrderInDB, order_create=order_create, idempotency_key=None)
+    # Duplicates wait here, on the event loop, so the sync handler's thread lock is never contended
+    async with orders.idempotency_store.async_lock(idempotency_key):
+        return await run_handler(
+            db, orders.create_order, OrderInDB, order_create=order_create, idempotency_key=idempotency_key
+        )
+
+
+@router.post("/orders/batch", response_model=List[OrderBatchResult])
+async def create_orders_batch(
+        order_creates: List[OrderCreate] = Body(..., max_length=orders.MAX_BATCH_SIZE),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Create many orders in one transaction, eg. when replaying orders queued during an outage."""
+    return await run_handler(db, orders.create_orders_batch, List[OrderBatchResult], order_creates=order_creates)
+
+
+@router.patch("/orders/{order_id}", response_model=OrderInDB)
+async def update_order(order_id: int, order_update: OrderUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await run_handler(db, orders.update_order, OrderInDB, order_id=order_id, order_update=order_update)
@@ -0,0 +1,53 @@
+"""Revenue and popularity figures, read from the rollup tables (see db/rollups.py) rather than from the orders."""
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..db.database import get_db
+from ..db.models import CategorySales, DailyRevenue, MenuItem, MenuItemSales
+from .schemas import CategorySalesSchema, DailyRevenueSchema, MenuItemSalesSchema, SalesSortKey
+
+router = APIRouter()
+
+
+@router.get("/analytics/revenue/daily", response_model=List[DailyRevenueSchema])
+def get_daily_revenue(
+        db: Session = Depends(get_db),
+        date_from: Optional[date] = Query(None, description="First day, included"),
+        date_to: Optional[date] = Query(None, description="Last day, included")
+):
+    """Number of orders and revenue per day, cancelled orders excluded, oldest day first."""
+    query = db.query(DailyRevenue).filter(DailyRevenue.orders > 0)
+    if date_from:
+        query = query.filter(DailyRevenue.day >= date_from)
+    if date_to:
+        query = query.filter(DailyRevenue.day <= date_to)
+    return query.order_by(DailyRevenue.day).all()
+
+
+@router.get("/analytics/menu-items", response_model=List[MenuItemSalesSchema])
+def get_menu_item_sales(
+        db: Session = Depends(get_db),
+        sort: SalesSortKey = Query(SalesSortKey.quantity, description="Rank by quantity sold or by revenue"),
+        limit: int = Query(10, ge=1, le=1000, description="Maximum number of menu items")
+):
+    """The best selling menu items, cancelled orders excluded."""
+    ranking = getattr(MenuItemSales, sort.value)
+    return (
+        db.query(MenuItemSales.menu_item_id, MenuItem.name, MenuItemSales.orders, MenuItemSales.quantity,
+                 MenuItemSales.revenue)
+        .outerjoin(MenuItem, MenuItem.id == MenuItemSales.menu_item_id)
+        .filter(MenuItemSales.quantity > 0)
+        .order_by(ranking.desc(), MenuItemSales.menu_item_id)
+        .limit(limit)
+        .all()
+    )
+
+
+@router.get("/analytics/categories", response_model=List[CategorySalesSchema])
+def get_category_sales(db: Session = Depends(get_db)):
+    """Quantity sold and revenue per menu category, highest revenue first, cancelled orders excluded."""
+    query = db.query(CategorySales).filter(CategorySales.quantity > 0)
+    return query.order_by(CategorySales.revenue.desc(), CategorySales.category).all()
@@ -1,23 +1,29 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 
 from ..db.database import get_db
 from ..db.models import Customer
+from .pagination import CursorQuery, LimitQuery, paginate
 from .schemas import CustomerCreate, CustomerInDB, CustomerUpdate
+from .search import SearchQuery, search_page
 
 router = APIRouter()
 
 
 @router.get("/customers", response_model=List[CustomerInDB])
 def get_customers(
+        response: Response,
         db: Session = Depends(get_db),
         firstname: Optional[str] = Query(None),
         lastname: Optional[str] = Query(None),
         email: Optional[str] = Query(None),
         external_id: Optional[str] = Query(None),
-        phone: Optional[str] = Query(None)
+        phone: Optional[str] = Query(None),
+        q: Optional[str] = SearchQuery,
+        limit: int = LimitQuery,
+        cursor: Optional[str] = CursorQuery
 ):
     query = db.query(Customer)
     if firstname:
@@ -30,7 +36,9 @@ def get_customers(
         query = query.filter(Customer.external_id == external_id)
     if phone:
         query = query.filter(Customer.phone.ilike(f"%{phone}%"))
-    return query.all()
+    if q:
+        return search_page(query, Customer, q, limit, cursor, response)
+    return paginate(query, [Customer.id], limit, cursor, response)
 
 
 @router.get("/customers/{customer_id}", response_model=CustomerInDB)
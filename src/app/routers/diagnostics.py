@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ..db.database import get_db, pool_statistics
+from . import orders
+from .events import order_events
+from .menu_items import menu_cache
+from .orders import idempotency_store
+
+router = APIRouter()
+
+
+@router.get("/diagnostics/pool")
+def get_pool_statistics(db: Session = Depends(get_db)):
+    """Connection pool state (checked in/out, overflow) and checkout/wait counters."""
+    return pool_statistics(db.get_bind())
+
+
+@router.get("/diagnostics/cache")
+def get_cache_statistics():
+    """Size and hit/miss/eviction counters of the menu cache."""
+    return menu_cache.stats()
+
+
+@router.get("/diagnostics/events")
+def get_event_statistics():
+    """Open order event subscriptions and published/delivered/dropped event counters."""
+    return order_events.stats()
+
+
+@router.get("/diagnostics/idempotency")
+def get_idempotency_statistics():
+    """Replayed responses, requests in flight per key, and the counters of the in-memory key cache."""
+    return idempotency_store.stats()
+
+
+@router.get("/diagnostics/group-commit")
+def get_group_commit_statistics():
+    """Batches and writes of the order group commit writer, when ORDER_GROUP_COMMIT is enabled."""
+    if orders.order_writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **orders.order_writer.stats()}
@@ -0,0 +1,57 @@
+"""Server-Sent Events streams of order status changes, so clients tracking orders need not poll them.
+
+Subscribe first, then read the order once: every change committed after the stream's first line (`retry:`) was sent
+is pushed. The streams are served on the event loop and never touch the database, so the same router serves both API
+modes.
+"""
+import json
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+
+from ..order_events import OrderEventBroker
+
+router = APIRouter()
+
+order_events = OrderEventBroker(queue_size=int(os.getenv("ORDER_EVENTS_QUEUE_SIZE", "100")))
+
+# Seconds between keep-alive comments on an idle stream, which also reveal disconnected clients
+HEARTBEAT_INTERVAL = float(os.getenv("ORDER_EVENTS_HEARTBEAT", "15"))
+
+
+async def _event_stream(filters: dict):
+    # Subscribed here rather than in the handler, so a response that is never sent cannot leak its subscription
+    subscription = order_events.subscribe(**filters)
+    try:
+        yield "retry: 3000\n\n"  # reconnect after 3 seconds when the connection drops
+        while True:
+            event = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        subscription.close()
+
+
+def _stream_response(**filters) -> StreamingResponse:
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # no proxy buffering of the stream
+    return StreamingResponse(_event_stream(filters), media_type="text/event-stream", headers=headers)
+
+
+@router.get("/orders/events")
+async def stream_order_events(customer_id: Optional[int] = Query(None, description="Only this customer's orders")):
+    """Status changes of all orders, or of one customer's orders, as Server-Sent Events.
+
+    `status` events carry the order id, customer id, new and previous status; a `lagged` event tells a client that
+    fell too far behind how many events it missed.
+    """
+    return _stream_response(customer_id=customer_id)
+
+
+@router.get("/orders/{order_id}/events")
+async def stream_order_status(order_id: int):
+    """Status changes of one order, as Server-Sent Events (see /orders/events)."""
+    return _stream_response(order_id=order_id)
@@ -0,0 +1,136 @@
+"""Streaming exports of whole tables for reporting jobs.
+
+Rows are read with `yield_per` and written out batch by batch, so memory use stays flat however large the table is.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from itertools import groupby
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..db.database import get_db
+from ..db.models import Customer, Order, OrderItem
+
+router = APIRouter()
+
+BATCH_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {ExportFormat.ndjson: "application/x-ndjson", ExportFormat.csv: "text/csv"}
+
+CUSTOMER_COLUMNS = [
+    Customer.id, Customer.firstname, Customer.lastname, Customer.email, Customer.phone, Customer.special,
+    Customer.card_digits, Customer.external_id, Customer.street, Customer.city, Customer.state, Customer.zip,
+    Customer.country,
+]
+ORDER_COLUMNS = [Order.id, Order.customer_id, Order.order_date, Order.status, Order.total_amount]
+ORDER_ITEM_COLUMNS = [OrderItem.id, OrderItem.menu_item_id, OrderItem.quantity, OrderItem.note]
+
+
+def _stream_rows(db_engine, statement):
+    """Yield result rows in batches from a connection owned by the generator.
+
+    The request's session is closed before a streaming body is sent, so the export cannot use it.
+    """
+    with db_engine.connect() as connection:
+        result = connection.execution_options(yield_per=BATCH_SIZE).execute(statement)
+        yield from result.mappings()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _ndjson_lines(records):
+    batch = []
+    for record in records:
+        batch.append(json.dumps(record, default=_json_default))
+        if len(batch) == BATCH_SIZE:
+            yield ("\n".join(batch) + "\n").encode()
+            batch = []
+    if batch:
+        yield ("\n".join(batch) + "\n").encode()
+
+
+def _csv_lines(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+        if count % BATCH_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def _orders_with_items(rows, order_keys, item_labels):
+    """Fold joined order/item rows (sorted by order id) into one dict per order with its items nested."""
+    for _, group in groupby(rows, key=lambda row: row["id"]):
+        group = list(group)
+        items = [
+            {column.key: row[label] for column, label in zip(ORDER_ITEM_COLUMNS, item_labels)}
+            for row in group
+            if row["item_id"] is not None  # orders without items still get a row from the outer join
+        ]
+        yield {**{key: group[0][key] for key in order_keys}, "items": items}
+
+
+def _export_response(chunks, export_format: ExportFormat, name: str) -> StreamingResponse:
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'}
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[export_format], headers=headers)
+
+
+@router.get("/export/customers")
+def export_customers(
+        db: Session = Depends(get_db),
+        export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format")
+):
+    """Stream every customer as NDJSON (one object per line) or CSV."""
+    rows = _stream_rows(db.get_bind(), select(*CUSTOMER_COLUMNS).order_by(Customer.id))
+    if export_format == ExportFormat.csv:
+        header = [column.key for column in CUSTOMER_COLUMNS]
+        chunks = _csv_lines(header, ([row[key] for key in header] for row in rows))
+    else:
+        chunks = _ndjson_lines(dict(row) for row in rows)
+    return _export_response(chunks, export_format, "customers")
+
+
+@router.get("/export/orders")
+def export_orders(
+        db: Session = Depends(get_db),
+        export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format")
+):
+    """Stream every order with its items.
+
+    NDJSON has one order per line with its items nested; CSV has one line per order item.
+    """
+    item_labels = [f"item_{column.key}" for column in ORDER_ITEM_COLUMNS]
+    statement = (
+        select(*ORDER_COLUMNS, *(column.label(label) for column, label in zip(ORDER_ITEM_COLUMNS, item_labels)))
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .order_by(Order.id, OrderItem.id)
+    )
+    rows = _stream_rows(db.get_bind(), statement)
+    order_keys = [column.key for column in ORDER_COLUMNS]
+
+    if export_format == ExportFormat.csv:
+        header = order_keys + item_labels
+        chunks = _csv_lines(header, ([row[key] for key in header] for row in rows))
+    else:
+        chunks = _ndjson_lines(_orders_with_items(rows, order_keys, item_labels))
+    return _export_response(chunks, export_format, "orders")
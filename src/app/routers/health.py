@@ -0,0 +1,70 @@
+import threading
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Response, status
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..db.database import get_db
+
+router = APIRouter()
+
+
+class Readiness:
+    """Whether startup (database seeding or snapshot restore) has finished, so the app can serve traffic."""
+
+    def __init__(self):
+        self._ready = threading.Event()
+        self.failed = False
+        self.detail = "starting"
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def mark_ready(self, detail: str = "ready"):
+        self.failed = False
+        self.detail = detail
+        self._ready.set()
+
+    def mark_not_ready(self, detail: str):
+        self._ready.clear()
+        self.failed = False
+        self.detail = detail
+
+    def mark_failed(self, detail: str):
+        """Startup failed: the app will never become ready, so it reports itself as not live either."""
+        self._ready.clear()
+        self.failed = True
+        self.detail = detail
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until ready or `timeout` seconds have passed; returns whether the app is ready."""
+        return self._ready.wait(timeout)
+
+
+readiness = Readiness()
+
+
+@router.get("/health/live")
+async def get_liveness(response: Response):
+    """200 while the event loop answers, including during startup; 503 once startup has failed, so that orchestrators
+    restart the process. Never touches the database or the threadpool."""
+    if readiness.failed:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "failed", "detail": readiness.detail}
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+def get_readiness(response: Response, db: Session = Depends(get_db)):
+    """200 once startup has finished and the database answers, 503 otherwise; for load balancer readiness probes."""
+    if readiness.ready:
+        try:
+            db.execute(text("SELECT 1"))
+        except Exception as e:
+            response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            return {"status": "unavailable", "detail": f"database: {e}"}
+        return {"status": "ready", "detail": readiness.detail}
+    response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "failed" if readiness.failed else "starting", "detail": readiness.detail}
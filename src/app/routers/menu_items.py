@@ -1,66 +1,188 @@
+import os
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
+from ..cache import TTLCache
 from ..db.database import get_db
-from ..db.models import MenuItem
+from ..db.ingredients import (ALLERGENS, items_with_all_ingredients, items_with_any_allergen,
+                              items_with_any_ingredient, link_ingredients, parse_ingredients)
+from ..db.models import DAYS, MenuItem, day_mask
+from ..etag import body_etag, catalog_headers, not_modified, table_versions
+from ..menu_search import MenuSearchIndex
+from .pagination import NEXT_CURSOR_HEADER, CursorQuery, LimitQuery, paginate
 from .schemas import MenuItemCreate, MenuItemInDB, MenuItemUpdate
+from .search import SearchQuery, search_page
 
 router = APIRouter()
 
+# Menu data rarely changes, so reads are served from rendered JSON kept in memory.
+# Keys are ("items", <filters and page>), ("item", id) and ("day", day mask); writes below drop the affected entries.
+# The cache is per process: with several workers, a write is only seen by the others once their entries expire.
+# The same goes for ETags, which are digests of the cached bodies (see etag.py).
+menu_cache = TTLCache(
+    max_size=int(os.getenv("MENU_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("MENU_CACHE_TTL", "300")),  # seconds, 0 disables the cache
+)
+
+# Typo-tolerant search index (see menu_search.py), kept up to date by the writes below and rebuilt from the database
+# when older than MENU_INDEX_MAX_AGE seconds, to pick up writes made through other workers; 0 never rebuilds it
+MENU_INDEX_MAX_AGE = float(os.getenv("MENU_INDEX_MAX_AGE", "300"))
+menu_index = MenuSearchIndex()
+
+# For every combination of days, the availability masks of the items available on at least one of them,
+# so "any of Fri/Sat/Sun" is a single indexed IN lookup on available_days
+ALL_DAYS = day_mask(DAYS)
+MASKS_MATCHING = {days: [mask for mask in range(1, ALL_DAYS + 1) if mask & days] for days in range(1, ALL_DAYS + 1)}
+
+_menu_item_adapter = TypeAdapter(MenuItemInDB)
+_menu_items_adapter = TypeAdapter(List[MenuItemInDB])
+
+
+def _cached_json(request: Request, key, load) -> Response:
+    """Serve `key` from the menu cache, calling `load()` for its (JSON body, headers) on a miss.
+
+    Clients that already have the body get a 304, without a database query while it is cached.
+    A response loaded while a write went through is not cached: it may predate the write, whose invalidation has
+    already run, and would then be served as current until the entry expires.
+    """
+    version = table_versions.get("menu_items")
+    entry = menu_cache.get(key)
+    if entry is None:
+        body, headers = load()
+        entry = body, headers, body_etag(body, headers)
+        if table_versions.get("menu_items") == version:
+            menu_cache.set(key, entry)
+    body, headers, etag = entry
+    response = not_modified(request, etag)
+    if response:
+        return response
+    return Response(content=body, media_type="application/json", headers={**headers, **catalog_headers(etag)})
+
+
+def _render(adapter: TypeAdapter, value) -> bytes:
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def _parse_days(days: str) -> int:
+    """Day mask of a comma-separated list of day names or their first three letters, eg. "fri,sat,sun"."""
+    mask = 0
+    for day in days.lower().split(","):
+        day = day.strip()
+        matches = [name for name in DAYS if name == day or name[:3] == day]
+        if not matches:
+            raise HTTPException(status_code=400, detail="Invalid day")
+        mask |= day_mask(matches)
+    return mask
+
+
+def _menu_item_changed(menu_item: MenuItem, days: int):
+    """Bump the menu items version (see `_cached_json`), drop the cached entries a change to a menu item can affect
+    (all lists, the item itself and every day combination including a day it is or was available on)
+    and reindex the item for search.
+    """
+    item_id = menu_item.id
+    table_versions.bump("menu_items")
+    menu_index.add(_menu_item_adapter.validate_python(menu_item, from_attributes=True))
+    menu_cache.invalidate(
+        lambda key: key[0] == "items" or key == ("item", item_id) or (key[0] == "day" and key[1] & days)
+    )
+
 
 @router.get("/menu-items", response_model=List[MenuItemInDB], tags=["Menu Items"])
 def get_menu_items(
+        request: Request,
+        response: Response,
         db: Session = Depends(get_db),
         name: Optional[str] = Query(None),
         category: Optional[str] = Query(None),
         labels: Optional[str] = Query(None),
-        ingredients: Optional[str] = Query(None)
+        ingredients: Optional[str] = Query(None, description="Comma-separated ingredients the items must all contain"),
+        exclude_ingredients: Optional[str] = Query(None, description="Comma-separated ingredients to leave out"),
+        exclude_allergens: Optional[str] = Query(None, description=f"Comma-separated, any of {', '.join(ALLERGENS)}"),
+        q: Optional[str] = SearchQuery,
+        limit: int = LimitQuery,
+        cursor: Optional[str] = CursorQuery
+):
+    excluded_allergens = parse_ingredients(exclude_allergens)
+    unknown = [allergen for allergen in excluded_allergens if allergen not in ALLERGENS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown allergens: {', '.join(unknown)}")
+
+    def load():
+        query = db.query(MenuItem)
+        if name:
+            query = query.filter(MenuItem.name.ilike(f"%{name}%"))
+        if category:
+            query = query.filter(MenuItem.category.ilike(f"%{category}%"))
+        if labels:
+            query = query.filter(MenuItem.labels.ilike(f"%{labels}%"))
+        if ingredients:
+            query = query.filter(MenuItem.id.in_(items_with_all_ingredients(parse_ingredients(ingredients))))
+        if exclude_ingredients:
+            query = query.filter(MenuItem.id.not_in(items_with_any_ingredient(parse_ingredients(exclude_ingredients))))
+        if excluded_allergens:
+            query = query.filter(MenuItem.id.not_in(items_with_any_allergen(excluded_allergens)))
+        if q:
+            rows = search_page(query, MenuItem, q, limit, cursor, response)
+        else:
+            rows = paginate(query, [MenuItem.id], limit, cursor, response)
+        headers = {key: value for key, value in response.headers.items() if key.lower() == NEXT_CURSOR_HEADER.lower()}
+        return _render(_menu_items_adapter, rows), headers
+
+    key = ("items", name, category, labels, ingredients, exclude_ingredients, exclude_allergens, q, limit, cursor)
+    return _cached_json(request, key, load)
+
+
+# Declared before /menu-items/{item_id}, which would otherwise match "search" as an id
+@router.get("/menu-items/search", response_model=List[MenuItemInDB], tags=["Menu Items"])
+def search_menu_items(
+        db: Session = Depends(get_db),
+        q: str = Query(..., min_length=1, description="Words to look for in names, ingredients and categories"),
+        limit: int = Query(10, ge=1, le=100)
 ):
-    query = db.query(MenuItem)
-    if name:
-        query = query.filter(MenuItem.name.ilike(f"%{name}%"))
-    if category:
-        query = query.filter(MenuItem.category.ilike(f"%{category}%"))
-    if labels:
-        query = query.filter(MenuItem.labels.ilike(f"%{labels}%"))
-    if ingredients:
-        query = query.filter(MenuItem.ingredients.ilike(f"%{ingredients}%"))
-    return query.all()
+    """Typo-tolerant menu search: misspelt words ("carbonera") still find their dish, best match first."""
+    if menu_index.stale(MENU_INDEX_MAX_AGE):
+        items = db.query(MenuItem).all()
+        menu_index.rebuild(_menu_item_adapter.validate_python(item, from_attributes=True) for item in items)
+    return [item for item, _ in menu_index.search(q, limit)]
 
 
 @router.get("/menu-items/{item_id}", response_model=MenuItemInDB, tags=["Menu Items"])
-def get_menu_item_by_id(item_id: int, db: Session = Depends(get_db)):
-    menu_item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
-    if not menu_item:
-        raise HTTPException(status_code=404, detail="Menu item not found")
-    return menu_item
+def get_menu_item_by_id(request: Request, item_id: int, db: Session = Depends(get_db)):
+    def load():
+        menu_item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
+        if not menu_item:
+            raise HTTPException(status_code=404, detail="Menu item not found")
+        return _render(_menu_item_adapter, menu_item), {}
+
+    return _cached_json(request, ("item", item_id), load)
 
 
 @router.get("/menu/{day}", response_model=List[MenuItemInDB], tags=["Menu by Day"])
-def get_menu_by_day(day: str, db: Session = Depends(get_db)):
-    day_map = {
-        "monday": MenuItem.available_monday,
-        "tuesday": MenuItem.available_tuesday,
-        "wednesday": MenuItem.available_wednesday,
-        "thursday": MenuItem.available_thursday,
-        "friday": MenuItem.available_friday,
-        "saturday": MenuItem.available_saturday,
-        "sunday": MenuItem.available_sunday
-    }
-    if day.lower() not in day_map:
-        raise HTTPException(status_code=400, detail="Invalid day")
-
-    return db.query(MenuItem).filter(day_map[day.lower()] == True).all()
+def get_menu_by_day(request: Request, day: str, db: Session = Depends(get_db)):
+    """Menu items available on `day`, or on any of several comma-separated days (eg. /menu/fri,sat,sun)."""
+    days = _parse_days(day)
+
+    def load():
+        menu_items = (
+            db.query(MenuItem).filter(MenuItem.available_days.in_(MASKS_MATCHING[days])).order_by(MenuItem.id).all()
+        )
+        return _render(_menu_items_adapter, menu_items), {}
+
+    return _cached_json(request, ("day", days), load)
 
 
 @router.post("/menu-items", response_model=MenuItemInDB, tags=["Menu Items"])
 def create_menu_item(menu_item: MenuItemCreate, db: Session = Depends(get_db)):
     db_menu_item = MenuItem(**menu_item.dict())
     db.add(db_menu_item)
+    link_ingredients(db, db_menu_item)
     db.commit()
     db.refresh(db_menu_item)
+    _menu_item_changed(db_menu_item, db_menu_item.available_days)
     return db_menu_item
 
 
@@ -70,11 +192,15 @@ def update_menu_item(item_id: int, menu_item_update: MenuItemUpdate, db: Session
     if not db_menu_item:
         raise HTTPException(status_code=404, detail="Menu item not found")
 
+    # The item leaves the menus of the days it was available on and joins those it becomes available on
+    affected_days = db_menu_item.available_days
     update_data = menu_item_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_menu_item, key, value)
+    if "ingredients" in update_data:
+        link_ingredients(db, db_menu_item)
 
     db.commit()
     db.refresh(db_menu_item)
+    _menu_item_changed(db_menu_item, affected_days | db_menu_item.available_days)
     return db_menu_item
-
@@ -1,25 +1,58 @@
+from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from ..db.database import get_db
 from ..db.models import OpeningHours
-from .schemas import OpeningHoursSchema
+from ..etag import catalog_headers, make_etag, not_modified, table_versions
+from ..opening_schedule import CurrentSchedule, OpeningSchedule
+from .schemas import OpeningHoursSchema, OpeningStatus
 
 router = APIRouter()
 
+# Opening hours are read from memory; the schedule is rebuilt when the "opening_hours" table version is bumped
+opening_schedule = CurrentSchedule()
+
+
+def _schedule(db: Session) -> OpeningSchedule:
+    def load_rows():
+        rows = db.query(OpeningHours).order_by(OpeningHours.id).all()
+        return [OpeningHoursSchema.model_validate(row) for row in rows]
+
+    return opening_schedule.get(table_versions.get("opening_hours"), load_rows)
+
 
 @router.get("/opening-hours", response_model=List[OpeningHoursSchema])
-def get_opening_hours_by_day(day: Optional[str] = None, special: Optional[bool] = False, db: Session = Depends(get_db)):
+def get_opening_hours_by_day(
+        request: Request,
+        response: Response,
+        day: Optional[str] = None,
+        special: Optional[bool] = False,
+        db: Session = Depends(get_db)
+):
     """Get opening hours by day."""
-    query = db.query(OpeningHours)
-    if day:
-        query = query.filter(OpeningHours.day == day.title())
-    if special:
-        query = query.filter(OpeningHours.is_special == True)
-    opening_hours = query.all()
+    etag = make_etag(["opening_hours"], day, special)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    response.headers.update(catalog_headers(etag))
+
+    opening_hours = [
+        row for row in _schedule(db).rows
+        if (not day or row.day == day.title()) and (not special or row.is_special)
+    ]
     if not opening_hours:
         raise HTTPException(status_code=404, detail="No opening hours found based on the filter criteria")
     return opening_hours
 
+
+@router.get("/opening-hours/status", response_model=OpeningStatus)
+def get_opening_status(
+        db: Session = Depends(get_db),
+        at: Optional[datetime] = Query(None, description="Local time to check, default now"),
+        special: bool = Query(False, description="Use the VIP opening hours")
+):
+    """Whether the restaurant is open at `at` and, if so, when it closes, otherwise when it next opens."""
+    return _schedule(db).status(at or datetime.now(), special)
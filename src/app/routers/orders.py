@@ -1,23 +1,126 @@
-from typing import List
+import os
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import Callable, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from ..db.database import get_db
-from ..db.models import Customer, MenuItem, Order, OrderItem, OrderStatus
-from .schemas import OrderCreate, OrderInDB, OrderItemCreate, OrderItemInDB, OrderUpdate
+from ..db.group_commit import GroupCommitWriter
+from ..db.models import Customer, MenuItem, Order, OrderItem
+from ..db.rollups import apply_orders, counts_in_rollups
+from ..idempotency import IdempotencyStore, request_hash
+from .events import order_events
+from .pagination import MAX_PAGE_SIZE, CursorQuery, LimitQuery, paginate
+from .schemas import OrderBatchResult, OrderCreate, OrderInDB, OrderItemCreate, OrderItemInDB, OrderStatus, OrderUpdate
 
 router = APIRouter()
 
+# Responses to order creations, replayed to retries with the same Idempotency-Key header (see idempotency.py)
+idempotency_store = IdempotencyStore(
+    ttl=float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400")),  # seconds a key is remembered
+    cache_size=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1000")),  # recent keys also kept in memory
+)
+IdempotencyKeyHeader = Header(
+    None, alias="Idempotency-Key", max_length=255,
+    description="Unique per order: a retry with the same key gets the first response instead of a second order",
+)
+
+# Set by main.py with ORDER_GROUP_COMMIT: order creations are then committed in batches (see db/group_commit.py)
+order_writer: Optional[GroupCommitWriter] = None
+
 
 @router.get("/orders", response_model=List[OrderInDB])
-def get_orders(db: Session = Depends(get_db)):
-    return db.query(Order).all()
+def get_orders(
+        response: Response,
+        db: Session = Depends(get_db),
+        customer_id: Optional[int] = Query(None),
+        status: Optional[OrderStatus] = Query(None),
+        date_from: Optional[datetime] = Query(None, description="Only orders placed at or after this time"),
+        date_to: Optional[datetime] = Query(None, description="Only orders placed before this time"),
+        limit: int = LimitQuery,
+        cursor: Optional[str] = CursorQuery
+):
+    """List orders oldest first, one page at a time (see the X-Next-Cursor response header)."""
+    # Load the items of all orders in one extra query instead of one query per order during serialization
+    query = db.query(Order).options(selectinload(Order.items))
+    if customer_id is not None:
+        query = query.filter(Order.customer_id == customer_id)
+    if status is not None:
+        query = query.filter(Order.status == status.value)
+    if date_from:
+        query = query.filter(Order.order_date >= date_from)
+    if date_to:
+        query = query.filter(Order.order_date < date_to)
+    return paginate(query, [Order.order_date, Order.id], limit, cursor, response)
+
+
+# The status the kitchen queue moves claimed orders to, by their current status
+NEXT_STATUS = {
+    OrderStatus.pending: OrderStatus.in_progress,
+    OrderStatus.in_progress: OrderStatus.dispatched,
+    OrderStatus.dispatched: OrderStatus.delivered,
+}
+MAX_CLAIM = 100
+
+
+def queue_ids(status: OrderStatus, limit: int):
+    """Ids of the `limit` oldest orders in `status`, read from the (status, order_date, id) index alone."""
+    return select(Order.id).where(Order.status == status.value).order_by(Order.order_date, Order.id).limit(limit)
+
+
+def _orders_by_ids(db: Session, order_ids: list) -> list:
+    """The orders with `order_ids` and their items, oldest first."""
+    if not order_ids:
+        return []
+    query = db.query(Order).options(selectinload(Order.items)).filter(Order.id.in_(order_ids))
+    return query.order_by(Order.order_date, Order.id).all()
+
+
+@router.get("/orders/queue", response_model=List[OrderInDB])
+def get_order_queue(
+        db: Session = Depends(get_db),
+        status: OrderStatus = Query(OrderStatus.pending),
+        limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of orders")
+):
+    """The kitchen's work queue: the oldest orders in `status`, oldest first."""
+    return _orders_by_ids(db, db.scalars(queue_ids(status, limit)).all())
+
+
+@router.post("/orders/queue/claim", response_model=List[OrderInDB])
+def claim_orders(
+        db: Session = Depends(get_db),
+        status: OrderStatus = Query(OrderStatus.pending),
+        count: int = Query(1, ge=1, le=MAX_CLAIM, description="Number of orders to claim")
+):
+    """Move the `count` oldest orders in `status` on to the next status (pending -> in_progress -> dispatched ->
+    delivered) and return them.
+
+    The orders are picked and updated by a single UPDATE ... RETURNING, so terminals claiming at the same time never
+    get the same order; fewer than `count` orders are returned when the queue runs short.
+    """
+    if status not in NEXT_STATUS:
+        raise HTTPException(status_code=400, detail=f"Orders in status {status.value!r} cannot be claimed")
+    claimed = db.scalars(
+        update(Order)
+        .where(Order.id.in_(queue_ids(status, count)), Order.status == status.value)
+        .values(status=NEXT_STATUS[status].value)
+        .returning(Order.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    claimed_orders = _orders_by_ids(db, claimed)
+    for order in claimed_orders:
+        order_events.publish(order.id, order.customer_id, order.status, previous_status=status.value)
+    return claimed_orders
 
 
 @router.get("/orders/{order_id}", response_model=OrderInDB)
 def get_order_by_id(order_id: int, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = db.query(Order).options(joinedload(Order.items)).filter(Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
@@ -26,45 +129,163 @@ def get_order_by_id(order_id: int, db: Session = Depends(get_db)):
 @router.get("/orders_by_user/{user_id}", response_model=List[OrderInDB])
 def get_orders_by_user_id(user_id: int, db: Session = Depends(get_db)):
     """Retrieve orders for a specific user by customer ID."""
-    orders = db.query(Order).filter(Order.customer_id == user_id).all()
+    orders = db.query(Order).options(selectinload(Order.items)).filter(Order.customer_id == user_id).all()
     if not orders:
         raise HTTPException(status_code=404, detail="No orders found for this user")
     return orders
 
 
-@router.post("/orders", response_model=OrderInDB)
-def create_order(order_create: OrderCreate, db: Session = Depends(get_db)):
-    db_customer = db.query(Customer).filter(Customer.id == order_create.customer_id).first()
-    if not db_customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
-
-    order_items = []
-    total_amount = 0
-    for item in order_create.items:
-        db_menu_item = db.query(MenuItem).filter(MenuItem.id == item.menu_item_id).first()
-        if not db_menu_item:
-            raise HTTPException(status_code=404, detail=f"Menu item with id {item.menu_item_id} not found")
-
-        order_item = OrderItem(
-            menu_item_id=item.menu_item_id,
-            quantity=item.quantity,
-            note=item.note,
-            menu_item=db_menu_item
-        )
-        order_items.append(order_item)
-        total_amount += db_menu_item.price * item.quantity
-
-    db_order = Order(
-        customer_id=order_create.customer_id,
-        total_amount=total_amount,
-        items=order_items,
-        status=OrderStatus.PENDING  # default status
-    )
-
-    db.add(db_order)
+MAX_BATCH_SIZE = 10_000
+
+
+def _menu_item_prices(db: Session, menu_item_ids: set) -> dict:
+    """Map menu item id to its current price, for the ids that exist."""
+    if not menu_item_ids:
+        return {}
+    return dict(db.query(MenuItem.id, MenuItem.price).filter(MenuItem.id.in_(menu_item_ids)).all())
+
+
+def _missing_menu_items_message(missing: list) -> str:
+    if len(missing) == 1:
+        return f"Menu item with id {missing[0]} not found"
+    return f"Menu items with ids {', '.join(map(str, missing))} not found"
+
+
+def insert_orders(
+        db: Session, order_creates: List[OrderCreate], keep_order_dates: bool = False, keep_statuses: bool = False,
+        before_commit: Optional[Callable[[List[OrderBatchResult]], None]] = None
+) -> List[OrderBatchResult]:
+    """Validate and insert orders with set-based queries, committing them all in one transaction.
+
+    Customers and menu items of every order are resolved with one query each, and the orders and their items are
+    inserted with one executemany each. Invalid orders are reported in the results and skipped.
+    With `keep_order_dates` an `order_date` given in the payload is kept (eg. orders replayed after an outage), and
+    with `keep_statuses` its `status`; new orders otherwise start pending, so that they go through the kitchen queue.
+    `before_commit(results)` is called when some orders were inserted, to write more in the same transaction.
+    """
+    customer_ids = {order.customer_id for order in order_creates}
+    existing_customers = {row.id for row in db.query(Customer.id).filter(Customer.id.in_(customer_ids))}
+    prices = _menu_item_prices(db, {item.menu_item_id for order in order_creates for item in order.items})
+
+    results = [None] * len(order_creates)
+    accepted = []
+    now = datetime.utcnow()
+    for index, order in enumerate(order_creates):
+        if order.customer_id not in existing_customers:
+            results[index] = OrderBatchResult(index=index, status_code=404, detail="Customer not found")
+            continue
+        missing = sorted({item.menu_item_id for item in order.items} - prices.keys())
+        if missing:
+            detail = _missing_menu_items_message(missing)
+            results[index] = OrderBatchResult(index=index, status_code=404, detail=detail)
+            continue
+        accepted.append((index, order, {
+            "customer_id": order.customer_id,
+            "order_date": order.order_date if keep_order_dates and order.order_date else now,
+            "total_amount": sum(prices[item.menu_item_id] * item.quantity for item in order.items),
+            "status": order.status.value if keep_statuses else OrderStatus.pending.value,
+        }))
+
+    if not accepted:
+        return results
+
+    order_ids = db.scalars(
+        insert(Order).returning(Order.id, sort_by_parameter_order=True), [row for _, _, row in accepted]
+    ).all()
+    item_rows = [
+        {"order_id": order_id, "menu_item_id": item.menu_item_id, "quantity": item.quantity, "note": item.note,
+         "unit_price": prices[item.menu_item_id]}
+        for order_id, (_, order, _) in zip(order_ids, accepted)
+        for item in order.items
+    ]
+    item_ids = []
+    if item_rows:
+        item_ids = db.scalars(insert(OrderItem).returning(OrderItem.id, sort_by_parameter_order=True), item_rows).all()
+    apply_orders(db, [
+        order_id for order_id, (_, _, row) in zip(order_ids, accepted) if counts_in_rollups(row["status"])
+    ])
+
+    item_ids = iter(item_ids)
+    for order_id, (index, order, row) in zip(order_ids, accepted):
+        items = [OrderItemInDB(id=next(item_ids), **item.model_dump()) for item in order.items]
+        created = OrderInDB(id=order_id, items=items, **row)
+        results[index] = OrderBatchResult(index=index, status_code=200, order=created)
+    if before_commit is not None:
+        before_commit(results)
     db.commit()
-    db.refresh(db_order)
-    return db_order
+
+    for index, _, _ in accepted:
+        created = results[index].order
+        order_events.publish(created.id, created.customer_id, created.status.value)
+    return results
+
+
+def _create_order(db: Session, order_create: OrderCreate, before_commit=None) -> OrderInDB:
+    """Insert one order, through the group commit writer when there is one. `before_commit(db, result)` is called
+    with the session writing the order, before it commits."""
+    if order_writer is not None:
+        # Give the request's pooled connection back first: the writer needs one from the same pool to commit
+        db.close()
+        try:
+            result = order_writer.submit(order_create, before_commit).result(timeout=order_writer.timeout)
+        except FutureTimeoutError:
+            # The order may still be committed later: clients retry with the same Idempotency-Key
+            raise HTTPException(status_code=503, detail="Order writer is overloaded, retry later")
+    else:
+        def before_commit_one(results: List[OrderBatchResult]):
+            before_commit(db, results[0])
+
+        (result,) = insert_orders(db, [order_create], before_commit=before_commit_one if before_commit else None)
+    if result.order is None:
+        raise HTTPException(status_code=result.status_code, detail=result.detail)
+    return result.order
+
+
+@router.post("/orders", response_model=OrderInDB)
+def create_order(
+        order_create: OrderCreate,
+        db: Session = Depends(get_db),
+        idempotency_key: Optional[str] = IdempotencyKeyHeader
+):
+    """Create an order. Retries with the same Idempotency-Key header get the first response back, marked with an
+    Idempotent-Replayed header, instead of creating the order again; reusing a key for another order is a 422."""
+    if idempotency_key is None:
+        return _create_order(db, order_create)
+
+    fingerprint = request_hash(order_create)
+
+    def store_response(writer_db: Session, result: OrderBatchResult):
+        if result.order is not None:
+            idempotency_store.add(writer_db, idempotency_key, fingerprint, result.order.model_dump_json())
+
+    with idempotency_store.lock(idempotency_key):
+        stored = idempotency_store.get(db, idempotency_key)
+        if stored is None:
+            try:
+                created = _create_order(db, order_create, before_commit=store_response)
+            except IntegrityError:
+                # Another worker process stored the key first: its order stands, ours was rolled back
+                db.rollback()
+                stored = idempotency_store.get(db, idempotency_key)
+                if stored is None:
+                    raise
+            else:
+                idempotency_store.remember(idempotency_key, fingerprint, created.model_dump_json())
+                return created
+        return idempotency_store.replay(stored, fingerprint)
+
+
+@router.post("/orders/batch", response_model=List[OrderBatchResult])
+def create_orders_batch(
+        order_creates: List[OrderCreate] = Body(..., max_length=MAX_BATCH_SIZE),
+        db: Session = Depends(get_db)
+):
+    """Create many orders in one transaction, eg. when replaying orders queued during an outage.
+
+    Each order gets its own result, in the order submitted: invalid orders are rejected without affecting the others.
+    The `order_date` and `status` given in the payload are kept.
+    """
+    return insert_orders(db, order_creates, keep_order_dates=True, keep_statuses=True)
 
 
 @router.patch("/orders/{order_id}", response_model=OrderInDB)
@@ -73,10 +294,17 @@ def update_order(order_id: int, order_update: OrderUpdate, db: Session = Depends
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
 
-    update_data = order_update.dict(exclude_unset=True)
+    # mode="json" gives the status as the string stored in the column
+    update_data = order_update.model_dump(exclude_unset=True, exclude_none=True, mode="json")
+    previous_status = db_order.status
     for key, value in update_data.items():
         setattr(db_order, key, value)
 
+    # Cancelling an order takes it out of the rollups, un-cancelling puts it back
+    if counts_in_rollups(db_order.status) != counts_in_rollups(previous_status):
+        apply_orders(db, [db_order.id], sign=1 if counts_in_rollups(db_order.status) else -1)
     db.commit()
     db.refresh(db_order)
+    if db_order.status != previous_status:
+        order_events.publish(db_order.id, db_order.customer_id, db_order.status, previous_status=previous_status)
     return db_order
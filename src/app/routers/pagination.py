@@ -0,0 +1,56 @@
+"""Keyset (cursor) pagination shared by the list endpoints.
+
+A page is fetched with `WHERE (sort columns) > (last row's values) ORDER BY sort columns LIMIT n`, which an index
+on the sort columns answers without scanning the rows of earlier pages. The cursor for the next page is returned
+in the `X-Next-Cursor` response header, so list responses keep their shape (a plain JSON list).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import DateTime, tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+LimitQuery = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of results")
+CursorQuery = Query(None, description=f"Cursor from the {NEXT_CURSOR_HEADER} header of the previous page")
+
+
+def encode_cursor(values: list) -> str:
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str, columns: list) -> list:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise ValueError("cursor does not match the sort columns")
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+            for column, value in zip(columns, payload)
+        ]
+    except (ValueError, TypeError) as e:  # ValueError includes JSON and base64 decoding errors
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+def paginate(query, columns: list, limit: int, cursor: Optional[str], response: Response, values=None) -> list:
+    """Return one page of `query` ordered by `columns`, setting the next page's cursor on the response.
+
+    `values(row)` gives a row's values of `columns`; by default they are read from its attributes.
+    """
+    if cursor:
+        query = query.filter(tuple_(*columns) > tuple_(*decode_cursor(cursor, columns)))
+
+    # Fetch one extra row to find out whether there is a next page
+    rows = query.order_by(*columns).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        last_values = values(last) if values else [getattr(last, column.key) for column in columns]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last_values)
+    return rows
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 from typing import List, Optional
 
@@ -92,6 +92,7 @@ class CustomerInDB(CustomerBase):
 class OrderStatus(str, Enum):
     pending = "pending"
     in_progress = "in_progress"
+    dispatched = "dispatched"
     delivered = "delivered"
     cancelled = "cancelled"
 
@@ -134,6 +135,14 @@ class OrderInDB(OrderBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class OrderBatchResult(BaseModel):
+    """Outcome of one order of a batch: the created order, or the error that rejected it."""
+    index: int  # position of the order in the submitted batch
+    status_code: int
+    order: Optional[OrderInDB] = None
+    detail: Optional[str] = None
+
+
 class OpeningHoursSchema(BaseModel):
     id: int
     day: str
@@ -144,3 +153,42 @@ class OpeningHoursSchema(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+
+
+class OpeningStatus(BaseModel):
+    at: datetime
+    special: bool
+    open: bool
+    closes_at: Optional[datetime] = None  # set when open
+    next_open: Optional[datetime] = None  # set when closed, None if the restaurant never opens
+
+
+class DailyRevenueSchema(BaseModel):
+    day: date
+    orders: int
+    revenue: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SalesSortKey(str, Enum):
+    quantity = "quantity"
+    revenue = "revenue"
+
+
+class MenuItemSalesSchema(BaseModel):
+    menu_item_id: int
+    name: Optional[str] = None
+    orders: int
+    quantity: int
+    revenue: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CategorySalesSchema(BaseModel):
+    category: str
+    quantity: int
+    revenue: float
+
+    model_config = ConfigDict(from_attributes=True)
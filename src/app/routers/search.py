@@ -0,0 +1,37 @@
+"""`q=` full-text search for the list endpoints, backed by the FTS5 indexes in `db/search.py`.
+
+Results come best match first; pages continue with a keyset cursor on (rank, id) like the other lists.
+"""
+from typing import Optional
+
+from fastapi import Query, Response
+from sqlalchemy import or_
+
+from ..db.search import SEARCH_INDEXES, SEARCH_TABLES, match_expression, search_terms
+from .pagination import paginate
+
+SearchQuery = Query(None, description="Words to search for, matched as prefixes; results are ordered by relevance")
+
+
+def search_page(query, model, q: str, limit: int, cursor: Optional[str], response: Response) -> list:
+    """One page of the rows of `query` (on `model`) that contain every word of `q`, best matches first."""
+    terms = search_terms(q)
+    if not terms:
+        return []
+
+    if query.session.get_bind().dialect.name != "sqlite":
+        # No FTS5: every word must appear somewhere in the indexed columns, results in id order
+        columns = [getattr(model, column) for column in SEARCH_INDEXES[model.__tablename__].columns]
+        for term in terms:
+            query = query.filter(or_(*(column.ilike(f"%{term}%") for column in columns)))
+        return paginate(query, [model.id], limit, cursor, response)
+
+    fts = SEARCH_TABLES[model.__tablename__]
+    query = (
+        query.join(fts, fts.c.rowid == model.id)
+        .filter(fts.c[fts.name].op("MATCH")(match_expression(terms)))
+        .add_columns(fts.c.rank)
+    )
+    rows = paginate(query, [fts.c.rank, model.id], limit, cursor, response,
+                    values=lambda row: [row.rank, row[0].id])
+    return [row[0] for row in rows]
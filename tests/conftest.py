@@ -1,16 +1,20 @@
 """Conftest is automatically discovered by Pytest, usefulf for sharing fixtures."""
 import tempfile
 import os
+from contextlib import contextmanager
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
 from src.app.db.database import Base, get_db
 from src.app.db.initial_data_loader import load_customers, load_regular_menus
 from src.app.db.models import Customer, MenuItem, Order, OrderItem  # noqa: imported to create tables
 from src.app.main import app
+from src.app.routers.health import readiness
+from src.app.routers.menu_items import menu_cache, menu_index
+from src.app.routers.opening_hours import opening_schedule
 
 # In-memory SQLite for testing
 # BUT note that it may be better to use a temporary file-based database instead due to risks of in-memory databases.
@@ -72,12 +76,34 @@ def client(db_session):
 
     load_customers(db_session)
     load_regular_menus(db_session)
+    # The in-memory caches and indexes are shared by every app and database in the test session
+    menu_cache.clear()
+    menu_index.clear()
+    opening_schedule.clear()
 
     # Use dependency override to replace the database session with our test session
     app.dependency_overrides[get_db] = override_get_db
 
     with TestClient(app) as test_client:
+        # Startup loads the initial data in a background thread; tests start once it is done
+        assert readiness.wait(timeout=60), readiness.detail
         yield test_client
 
     # Clean up the overrides after tests
     app.dependency_overrides.clear()
+
+
+@contextmanager
+def count_queries(db_session):
+    """Count the SQL statements executed on the test engine inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -1,12 +1,16 @@
 import json
+import shutil
 from pathlib import Path
 from unittest.mock import mock_open, patch
 
 import pytest
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
 
-from src.app.db.initial_data_loader import load_customers, load_regular_menus
-from src.app.db.models import Customer, MenuItem
+from src.app.db import initial_data_loader
+from src.app.db.database import Base
+from src.app.db.initial_data_loader import iter_json_array, load_customers, load_regular_menus, seed_datasets
+from src.app.db.models import Customer, MenuItem, Order, SeedState
 
 # Mock data similar to what you'd have in your JSON files
 mock_menu_data = {
@@ -88,3 +92,89 @@ def test_load_customers(db_session: Session, mock_customers_json):
     assert len(customers) == len(mock_customers_data)  # Adjust based on the mock data
     assert customers[0].firstname == "Dastardly"
     assert customers[0].email == "dick@dastardly.com"
+
+
+def test_failed_customer_load_keeps_the_search_index_triggers(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(bind=engine)
+    upsert_rows = initial_data_loader._upsert_rows
+
+    def upsert_then_fail(*args, **kwargs):
+        upsert_rows(*args, **kwargs)
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(initial_data_loader, "_upsert_rows", upsert_then_fail)
+    with patch("builtins.open", mock_open(read_data=json.dumps(mock_customers_data))):
+        assert load_customers(sessionmaker(bind=engine)()) is False
+
+    with engine.connect() as connection:
+        triggers = connection.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'customers'")
+        ).scalars().all()
+        assert sorted(triggers) == ["customers_fts_ad", "customers_fts_ai", "customers_fts_au"]
+        assert connection.execute(text("SELECT count(*) FROM customers")).scalar() == 0
+
+    # Customers written later are still indexed
+    with sessionmaker(bind=engine)() as db:
+        customer = mock_customers_data[0]
+        db.add(Customer(
+            firstname="Penelope", lastname="Pitstop", email="penelope@pitstop.com", external_id="#3434",
+            card_digits="3434", **customer["address"],
+        ))
+        db.commit()
+        found = db.execute(text("SELECT rowid FROM customers_fts WHERE customers_fts MATCH 'pitstop'")).all()
+        assert len(found) == 1
+    engine.dispose()
+
+
+def test_seed_datasets_reloads_only_changed_files(tmp_path, monkeypatch):
+    init_data = tmp_path / "init_data"
+    shutil.copytree(initial_data_loader.INIT_DATA_DIR, init_data)
+    monkeypatch.setattr(initial_data_loader, "INIT_DATA_DIR", init_data)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    assert seed_datasets(Session()) == ["menu", "customers", "opening_hours", "orders"]
+    assert seed_datasets(Session()) == []
+
+    # Change one price in the menu: only the menu is reloaded, in place
+    menu = json.loads((init_data / "menu.json").read_text())
+    menu["pasta"][0]["price"] = 99.0
+    (init_data / "menu.json").write_text(json.dumps(menu))
+    with Session() as db:
+        counts = (db.query(MenuItem).count(), db.query(Customer).count(), db.query(Order).count())
+
+    assert seed_datasets(Session()) == ["menu"]
+    with Session() as db:
+        assert (db.query(MenuItem).count(), db.query(Customer).count(), db.query(Order).count()) == counts
+        assert db.query(MenuItem).filter(MenuItem.name == menu["pasta"][0]["name"]).one().price == 99.0
+
+
+def test_seed_datasets_adopts_a_database_seeded_before_tracking(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    seed_datasets(Session())
+    with Session() as db:
+        db.query(SeedState).delete()  # as in a database seeded before seed_state existed
+        db.commit()
+        orders = db.query(Order).count()
+
+    assert seed_datasets(Session()) == ["menu", "customers", "opening_hours", "orders"]
+    with Session() as db:
+        assert db.query(Order).count() == orders
+    assert seed_datasets(Session()) == []
+
+
+def test_iter_json_array_matches_json_load(tmp_path):
+    path = tmp_path / "customers.json"
+    path.write_text(json.dumps(mock_customers_data, indent=2))
+    assert list(iter_json_array(path, chunk_size=7)) == mock_customers_data
+
+    path.write_text(" [ ] ")
+    assert list(iter_json_array(path)) == []
+    path.write_text('{"not": "an array"}')
+    with pytest.raises(ValueError):
+        list(iter_json_array(path))
@@ -0,0 +1,96 @@
+import os
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db import database
+from src.app.db.database import Base, create_db_engine, get_db, pool_statistics
+from src.app.main import app
+from src.app.routers.health import readiness
+
+# `make load-test` runs the full 10k requests; the default keeps the regular test run quick
+LOAD_TEST_REQUESTS = int(os.getenv("LOAD_TEST_REQUESTS", "1000"))
+
+
+@pytest.fixture
+def pooled_engine(monkeypatch):
+    """A small file-based pool wired into the real `get_db` dependency (no overrides)."""
+    temp_db_file = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    engine = create_db_engine(f"sqlite:///{temp_db_file.name}", pool_size=2, max_overflow=0, pool_timeout=1)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine, autocommit=False, autoflush=False))
+    readiness.mark_ready()  # the tests below skip startup, which would otherwise mark the app ready
+
+    yield engine
+
+    engine.dispose()
+    temp_db_file.close()
+    os.unlink(temp_db_file.name)
+
+
+def test_get_db_closes_session(pooled_engine):
+    dependency = get_db()
+    db = next(dependency)
+    db.connection()  # force a checkout
+    assert pooled_engine.pool.checkedout() == 1
+
+    with pytest.raises(StopIteration):
+        next(dependency)
+    assert pooled_engine.pool.checkedout() == 0
+
+
+def test_connection_count_stays_flat_under_load(pooled_engine):
+    # No `with` block: startup events (data loading) are not needed here
+    client = TestClient(app)
+    checkouts_before = pool_statistics(pooled_engine)["checkouts"]
+
+    for _ in range(LOAD_TEST_REQUESTS):
+        response = client.get("/api/customers")
+        assert response.status_code == 200
+
+    statistics = pool_statistics(pooled_engine)
+    assert statistics["checked_out"] == 0
+    assert statistics["connects"] <= 2  # never more connections than the pool holds
+    assert statistics["checkouts"] - checkouts_before == LOAD_TEST_REQUESTS
+    assert statistics["checkins"] == statistics["checkouts"]
+    assert statistics["timeouts"] == 0
+
+
+def test_pool_statistics_endpoint(pooled_engine):
+    client = TestClient(app)
+    response = client.get("/api/diagnostics/pool")
+    assert response.status_code == 200
+    statistics = response.json()
+    assert statistics["pool"] == "InstrumentedQueuePool"
+    assert statistics["size"] == 2
+    assert statistics["checkouts"] >= 1
+
+
+@pytest.mark.parametrize("profile, journal_mode, synchronous", [
+    ("default", "delete", 2),      # FULL
+    ("performance", "wal", 1),     # NORMAL
+])
+def test_sqlite_profile_pragmas(tmp_path, profile, journal_mode, synchronous):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'profile.db'}", profile=profile)
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == journal_mode
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == synchronous
+    engine.dispose()
+
+
+def test_performance_profile_applies_to_every_connection(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'profile.db'}", profile="performance")
+    connections = [engine.connect() for _ in range(3)]
+    for connection in connections:
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        assert connection.exec_driver_sql("PRAGMA temp_store").scalar() == 2  # MEMORY
+    for connection in connections:
+        connection.close()
+    engine.dispose()
+
+
+def test_unknown_profile_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        create_db_engine(f"sqlite:///{tmp_path / 'profile.db'}", profile="turbo")
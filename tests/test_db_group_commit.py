@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.group_commit import GroupCommitWriter
+from src.app.db.initial_data_loader import load_customers, load_regular_menus
+from src.app.db.models import Order
+from src.app.routers.orders import insert_orders
+from src.app.routers.schemas import OrderCreate
+
+
+@pytest.fixture(scope="module")
+def session_factory(temp_db, db_session):
+    load_customers(db_session)
+    load_regular_menus(db_session)
+    test_engine, _ = temp_db
+    return sessionmaker(bind=test_engine, autoflush=False)
+
+
+def test_concurrent_orders_share_commits(session_factory, db_session):
+    writer = GroupCommitWriter(session_factory, insert_orders, max_batch=10, max_wait=0.05)
+    orders = [OrderCreate(customer_id=n % 5 + 1, items=[{"menu_item_id": 1, "quantity": n + 1}]) for n in range(20)]
+    orders[7] = OrderCreate(customer_id=99999, items=[{"menu_item_id": 1, "quantity": 1}])
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(lambda order: writer.submit(order).result(timeout=10), orders))
+    writer.close()
+
+    # Every caller gets the result of its own order; the invalid one only fails itself
+    assert results[7].status_code == 404
+    created = [result.order for index, result in enumerate(results) if index != 7]
+    assert [order.items[0].quantity for order in created] == [n + 1 for n in range(20) if n != 7]
+    assert db_session.query(Order).filter(Order.id.in_([order.id for order in created])).count() == 19
+    stats = writer.stats()
+    assert stats["writes"] == 20
+    assert stats["batches"] < 20
+    assert stats["largest_batch"] <= 10
+
+
+def test_failed_batch_is_retried_one_write_at_a_time(session_factory):
+    batches = []
+    release = threading.Event()
+
+    def write_batch(db, items, before_commit=None):
+        release.wait(timeout=10)  # so that every write is queued before the first batch is taken
+        batches.append(list(items))
+        if "bad" in items:
+            raise ValueError("bad write")
+        return [item.upper() for item in items]
+
+    writer = GroupCommitWriter(session_factory, write_batch, max_wait=0.05)
+    futures = [writer.submit(item) for item in ("a", "bad", "c")]
+    release.set()
+    assert [future.exception(timeout=10) is None for future in futures] == [True, False, True]
+    assert (futures[0].result(), futures[2].result()) == ("A", "C")
+    assert batches == [["a", "bad", "c"], ["a"], ["bad"], ["c"]]
+    writer.close()
+
+
+def test_before_commit_runs_in_the_writer_transaction(session_factory):
+    seen = []
+    writer = GroupCommitWriter(session_factory, insert_orders, max_wait=0)
+    order = OrderCreate(customer_id=1, items=[{"menu_item_id": 2, "quantity": 1}])
+    result = writer.submit(order, lambda db, result: seen.append((db.in_transaction(), result.order.id))).result(10)
+    writer.close()
+    assert seen == [(True, result.order.id)]
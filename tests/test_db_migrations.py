@@ -0,0 +1,122 @@
+from datetime import date
+
+from sqlalchemy import create_engine, insert, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.database import Base
+from src.app.db.ingredients import allergens_of, items_with_all_ingredients, parse_ingredients, words_of
+from src.app.db.migrations import MIGRATIONS, run_migrations
+from src.app.db.models import (CategorySales, DailyRevenue, Ingredient, MenuItem, MenuItemSales, Order,
+                               ingredient_words)
+
+
+def test_parse_ingredients():
+    assert parse_ingredients(" Spaghetti,  parmesan   cheese,,spaghetti ") == ["spaghetti", "parmesan cheese"]
+    assert parse_ingredients(None) == []
+
+
+def test_allergens_match_whole_words():
+    assert allergens_of("eggs") == {"eggs"}
+    assert allergens_of("eggplant") == set()
+    assert allergens_of("Ricotta Cheese") == {"dairy"}
+    assert allergens_of("ladyfingers") == {"eggs", "gluten"}
+
+
+def test_words_of_ingredient_names():
+    assert words_of("Cherry Tomatoes") == ["cherry", "tomato"]
+    assert words_of("anchovies, peaches, eggs") == ["anchovy", "peach", "egg"]
+    assert words_of("eggplant") == ["eggplant"]
+    assert words_of("swiss cheese, bass") == ["swiss", "cheese", "bass"]
+
+
+def test_normalize_ingredients_migration(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    # Rows written by a version of the app that only had the comma-separated column
+    with engine.begin() as connection:
+        connection.execute(insert(MenuItem), [
+            {"name": "Carbonara", "price": 12.0, "ingredients": "spaghetti, eggs, bacon", "category": "pasta"},
+            {"name": "Parmigiana", "price": 11.0, "ingredients": "eggplant, eggs, Parmesan Cheese", "category": "main"},
+        ])
+
+    Session = sessionmaker(bind=engine, autoflush=False)  # like SessionLocal
+    with Session() as db:
+        assert run_migrations(db) == [name for name, _ in MIGRATIONS]
+        assert run_migrations(db) == []  # applied once only
+
+        carbonara = db.query(MenuItem).filter(MenuItem.name == "Carbonara").one()
+        assert [ingredient.name for ingredient in carbonara.ingredient_set] == ["spaghetti", "eggs", "bacon"]
+        assert db.query(Ingredient).count() == 5  # eggs is shared
+        parmesan = db.query(Ingredient).filter(Ingredient.name == "parmesan cheese").one()
+        assert [allergen.allergen for allergen in parmesan.allergens] == ["dairy"]
+
+
+def test_ingredient_words_migration(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    # Ingredients linked before their words were indexed
+    with sessionmaker(bind=engine, autoflush=False)() as db:
+        run_migrations(db)
+        db.execute(text("DELETE FROM schema_migrations WHERE name = '0004_index_ingredient_words'"))
+        db.add(MenuItem(name="Caprese", price=8.0, ingredients="mozzarella cheese, tomatoes", category="starter",
+                        ingredient_set=[Ingredient(name="mozzarella cheese"), Ingredient(name="tomatoes")]))
+        db.commit()
+
+        run_migrations(db)
+        assert db.query(ingredient_words).count() == 3
+        caprese = db.query(MenuItem.id).filter(MenuItem.id.in_(items_with_all_ingredients(["cheese", "tomato"])))
+        assert caprese.count() == 1
+
+
+def test_upgrade_adds_missing_columns_and_fills_available_days(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    # A menu_items table from before the available_days column
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_menu_items_available_days"))
+        connection.execute(text("ALTER TABLE menu_items DROP COLUMN available_days"))
+        connection.execute(text(
+            "INSERT INTO menu_items (name, price, ingredients, category, available_monday, available_sunday) "
+            "VALUES ('Cassata', 6.0, 'ricotta', 'dessert', 1, 1)"
+        ))
+
+    with sessionmaker(bind=engine, autoflush=False)() as db:
+        run_migrations(db)
+        assert db.query(MenuItem).one().available_days == 0b1000001
+    assert "ix_menu_items_available_days" in [index["name"] for index in inspect(engine).get_indexes("menu_items")]
+
+
+def test_upgrade_adds_order_status(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    # An orders table from before the status column
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_orders_status_order_date_id"))
+        connection.execute(text("ALTER TABLE orders DROP COLUMN status"))
+        connection.execute(text("INSERT INTO orders (customer_id, total_amount) VALUES (1, 9.5)"))
+
+    with sessionmaker(bind=engine, autoflush=False)() as db:
+        run_migrations(db)
+        assert db.query(Order.status).scalar() == "pending"
+    assert "ix_orders_status_order_date_id" in [index["name"] for index in inspect(engine).get_indexes("orders")]
+
+
+def test_rollups_migration_counts_existing_orders(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    # Orders from before the rollups: items without their price
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO menu_items (name, price, ingredients, category) "
+                                "VALUES ('Cassata', 6.0, 'ricotta', 'dessert')"))
+        connection.execute(text("INSERT INTO orders (id, customer_id, order_date, total_amount, status) VALUES "
+                                "(1, 1, '2024-06-04 12:00:00', 12.0, 'delivered'), "
+                                "(2, 1, '2024-06-04 13:00:00', 6.0, 'cancelled')"))
+        connection.execute(text("INSERT INTO order_items (order_id, menu_item_id, quantity) "
+                                "VALUES (1, 1, 2), (2, 1, 1)"))
+
+    with sessionmaker(bind=engine, autoflush=False)() as db:
+        run_migrations(db)
+        assert [(day.day, day.orders, day.revenue) for day in db.query(DailyRevenue)] == [(date(2024, 6, 4), 1, 12.0)]
+        sales = db.query(MenuItemSales).one()
+        assert (sales.orders, sales.quantity, sales.revenue) == (1, 2, 12.0)
+        assert db.query(CategorySales).one().category == "dessert"
@@ -0,0 +1,47 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db import initial_data_loader
+from src.app.db.initial_data_loader import _load_initial_data, seed_datasets
+from src.app.db.models import Customer, MenuItem, Order
+from src.app.db.snapshot import build_snapshot, is_seeded, restore_snapshot
+
+
+def test_restored_snapshot_needs_no_loading(tmp_path):
+    snapshot = build_snapshot(tmp_path / "snapshot.db")
+    assert not (tmp_path / "snapshot.db.building").exists()
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'pos.db'}")
+    with engine.connect() as connection:  # an old database, with a connection in the pool
+        connection.execute(text("CREATE TABLE leftover (id INTEGER)"))
+        connection.commit()
+
+    restore_snapshot(snapshot, engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        assert db.query(MenuItem).count() > 0
+        assert db.query(Customer).count() >= 10
+        assert db.query(Order).count() == 5
+        assert db.execute(text("SELECT count(*) FROM sqlite_master WHERE name = 'leftover'")).scalar() == 0
+    assert seed_datasets(Session()) == []  # every dataset is already in the snapshot
+
+
+def test_snapshot_mode_keeps_a_seeded_database(tmp_path, monkeypatch):
+    snapshot = build_snapshot(tmp_path / "snapshot.db")
+    engine = create_engine(f"sqlite:///{tmp_path / 'pos.db'}")
+    Session = sessionmaker(bind=engine, autoflush=False)
+    monkeypatch.setattr(initial_data_loader, "DB_SNAPSHOT_PATH", snapshot)
+    monkeypatch.setattr(initial_data_loader, "restore_snapshot", lambda path: restore_snapshot(path, engine))
+    monkeypatch.setattr(initial_data_loader, "is_seeded", lambda: is_seeded(engine))
+    monkeypatch.setattr(initial_data_loader, "init_db", lambda: None)  # the snapshot has the tables and migrations
+    monkeypatch.setattr(initial_data_loader, "SessionLocal", Session)
+
+    _load_initial_data("snapshot")  # first start, on an empty database
+    with Session() as db:
+        assert db.query(Order).count() == 5
+        db.add(Order(customer_id=1, total_amount=9.5))
+        db.commit()
+
+    _load_initial_data("snapshot")  # restart
+    with Session() as db:
+        assert db.query(Order).count() == 6
@@ -0,0 +1,32 @@
+import pytest
+
+from src.app.db.worker_lock import WorkerLock
+
+
+def test_only_the_first_worker_alive_loads(tmp_path):
+    first, second = WorkerLock(tmp_path / "pos.db"), WorkerLock(tmp_path / "pos.db")
+
+    with first.startup() as is_first:
+        assert is_first
+    with second.startup() as is_first:
+        assert not is_first  # started beside `first`
+    with first.startup() as is_first:
+        assert not is_first  # restarted while `second` still runs
+
+    first.release()
+    second.release()
+    with second.startup() as is_first:
+        assert is_first  # a new launch
+    second.release()
+
+
+def test_failed_startup_lets_the_next_worker_load(tmp_path):
+    first, second = WorkerLock(tmp_path / "pos.db"), WorkerLock(tmp_path / "pos.db")
+
+    with pytest.raises(RuntimeError):
+        with first.startup() as is_first:
+            assert is_first
+            raise RuntimeError("seeding failed")
+    with second.startup() as is_first:
+        assert is_first
+    second.release()
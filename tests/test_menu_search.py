@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+from src.app.menu_search import MenuSearchIndex, normalize
+
+
+def item(item_id, name, ingredients="", category=""):
+    return SimpleNamespace(id=item_id, name=name, ingredients=ingredients, category=category)
+
+
+def build_index():
+    index = MenuSearchIndex()
+    index.rebuild([
+        item(1, "Spaghetti Carbonara", "spaghetti, eggs, guanciale, pecorino", "Pasta"),
+        item(2, "Spaghetti Bolognese", "spaghetti, beef, tomato", "Pasta"),
+        item(3, "Tiramisù", "mascarpone, coffee, cocoa", "Dessert"),
+        item(4, "Margherita", "tomato, mozzarella, basil", "Pizza"),
+    ])
+    return index
+
+
+def names(results):
+    return [result.name for result, _ in results]
+
+
+def test_normalize_strips_accents_and_punctuation():
+    assert normalize("Tiramisù, all'Arrabbiata!") == ["tiramisu", "all", "arrabbiata"]
+
+
+def test_misspelt_words_find_their_item():
+    index = build_index()
+    assert names(index.search("carbonera", 10)) == ["Spaghetti Carbonara"]
+    assert names(index.search("tiramisu", 10)) == ["Tiramisù"]
+    assert names(index.search("margarita", 10)) == ["Margherita"]
+    assert index.search("xyzzy", 10) == []
+
+
+def test_name_matches_rank_above_ingredient_matches():
+    index = build_index()
+    index.add(item(5, "Tomato Soup", "tomato, cream", "Soup"))
+    assert names(index.search("tomato", 10))[0] == "Tomato Soup"
+    assert names(index.search("spaghetti bolognese", 1)) == ["Spaghetti Bolognese"]
+
+
+def test_add_replaces_the_previous_version_of_an_item():
+    index = build_index()
+    index.add(item(4, "Marinara", "tomato, garlic, oregano", "Pizza"))
+    assert index.search("margherita", 10) == []
+    assert names(index.search("marinara", 10)) == ["Marinara"]
+    assert "margherita" not in index._word_items  # words no item uses any more are dropped
+
+
+def test_stale_after_max_age():
+    now = [0.0]
+    index = MenuSearchIndex(clock=lambda: now[0])
+    assert index.stale(60)
+    index.rebuild([])
+    now[0] = 59.0
+    assert not index.stale(60)
+    now[0] = 60.0
+    assert index.stale(60)
+    assert not index.stale(0)  # never rebuilt once built
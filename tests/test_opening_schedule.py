@@ -0,0 +1,68 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.app.opening_schedule import CurrentSchedule, OpeningSchedule, parse_time
+
+
+def hours(day, start, end, status="open", is_special=False):
+    return SimpleNamespace(day=day, start=start, end=end, status=status, is_special=is_special)
+
+
+WEEK = [hours("Monday", "", "", status="closed")] + [
+    hours(day, "9:00", "21:00") for day in ("Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+] + [hours("Saturday", "8:00", "2:00", is_special=True)]  # VIP hours run past midnight
+
+
+def test_parse_time():
+    assert parse_time("9:00") == 540
+    assert parse_time("21:30") == 1290
+    assert parse_time("24:00") == 1440
+    with pytest.raises(ValueError):
+        parse_time("9:75")
+
+
+def test_open_and_closing_time():
+    schedule = OpeningSchedule(WEEK)
+    status = schedule.status(datetime(2024, 6, 4, 12, 30, 15))  # a Tuesday
+    assert status["open"] is True
+    assert status["closes_at"] == datetime(2024, 6, 4, 21, 0)
+    assert status["next_open"] is None
+
+
+def test_closed_day_gives_next_opening():
+    schedule = OpeningSchedule(WEEK)
+    status = schedule.status(datetime(2024, 6, 3, 10, 0))  # Monday, closed all day
+    assert status["open"] is False
+    assert status["next_open"] == datetime(2024, 6, 4, 9, 0)
+
+    # After closing on Sunday the next opening is Tuesday, across the end of the week
+    assert schedule.status(datetime(2024, 6, 9, 21, 0))["next_open"] == datetime(2024, 6, 11, 9, 0)
+
+
+def test_special_hours_past_midnight():
+    schedule = OpeningSchedule(WEEK)
+    status = schedule.status(datetime(2024, 6, 9, 1, 0), special=True)  # Sunday 1am, Saturday's VIP hours
+    assert status["open"] is True
+    assert status["closes_at"] == datetime(2024, 6, 9, 2, 0)
+    assert schedule.status(datetime(2024, 6, 9, 1, 0))["open"] is False  # normal hours
+
+
+def test_never_open():
+    status = OpeningSchedule([hours("Monday", "", "", status="closed")]).status(datetime(2024, 6, 3, 10, 0))
+    assert status["open"] is False
+    assert status["next_open"] is None
+
+
+def test_current_schedule_rebuilds_on_new_version():
+    current = CurrentSchedule()
+    loads = []
+
+    def load_rows():
+        loads.append(1)
+        return WEEK
+
+    assert current.get(0, load_rows) is current.get(0, load_rows)
+    current.get(1, load_rows)
+    assert len(loads) == 2
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+from src.app.order_events import OrderEventBroker
+
+
+def test_events_reach_the_order_customer_and_all_subscriptions():
+    async def scenario():
+        broker = OrderEventBroker()
+        by_order, by_customer = broker.subscribe(order_id=1), broker.subscribe(customer_id=7)
+        everything, other_order = broker.subscribe(), broker.subscribe(order_id=2)
+
+        # Handlers publish from the threadpool
+        publisher = threading.Thread(target=broker.publish, args=(1, 7, "in_progress"),
+                                     kwargs={"previous_status": "pending"})
+        publisher.start()
+        publisher.join()
+
+        events = [await subscription.get(timeout=1) for subscription in (by_order, by_customer, everything)]
+        assert all(event["order_id"] == 1 and event["status"] == "in_progress" for event in events)
+        assert events[0]["previous_status"] == "pending"
+        assert await other_order.get(timeout=0.01) is None
+
+        for subscription in (by_order, by_customer, everything, other_order):
+            subscription.close()
+        assert broker.stats() == {"subscriptions": 0, "published": 1, "delivered": 3, "dropped": 0}
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_loses_oldest_events_and_is_told():
+    async def scenario():
+        broker = OrderEventBroker(queue_size=3)
+        subscription = broker.subscribe(order_id=1)
+        for status in ("pending", "in_progress", "dispatched", "delivered", "cancelled"):
+            broker.publish(1, 7, status)
+        await asyncio.sleep(0)  # let the loop run the deliveries
+
+        assert await subscription.get(timeout=1) == {"type": "lagged", "dropped": 2}
+        statuses = [(await subscription.get(timeout=1))["status"] for _ in range(3)]
+        assert statuses == ["dispatched", "delivered", "cancelled"]
+        assert broker.stats()["dropped"] == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,68 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app.db.rollups import rebuild_rollups
+
+
+def place_order(client: TestClient, items: list) -> dict:
+    order_items = [{"menu_item_id": item_id, "quantity": quantity} for item_id, quantity in items]
+    response = client.post("/api/orders", json={"customer_id": 1, "items": order_items})
+    assert response.status_code == 200
+    return response.json()
+
+
+def analytics(client: TestClient) -> tuple:
+    return tuple(client.get(url).json() for url in (
+        "/api/analytics/revenue/daily", "/api/analytics/menu-items", "/api/analytics/categories"
+    ))
+
+
+def test_rollups_follow_orders_and_cancellations(client: TestClient):
+    prices = {item_id: client.get(f"/api/menu-items/{item_id}").json()["price"] for item_id in (1, 2)}
+    first = place_order(client, [(1, 2), (2, 1)])
+    second = place_order(client, [(1, 1)])
+
+    (today,) = client.get("/api/analytics/revenue/daily").json()
+    assert today["day"] == date.today().isoformat()  # orders are dated in UTC; fine unless run around midnight
+    assert today["orders"] == 2
+    assert today["revenue"] == pytest.approx(first["total_amount"] + second["total_amount"])
+
+    top = client.get("/api/analytics/menu-items").json()
+    assert [(item["menu_item_id"], item["orders"], item["quantity"]) for item in top] == [(1, 2, 3), (2, 1, 1)]
+    assert top[0]["revenue"] == pytest.approx(3 * prices[1])
+    assert top[0]["name"]
+    assert sum(category["quantity"] for category in client.get("/api/analytics/categories").json()) == 4
+
+    # Cancelling takes the order out of every rollup, un-cancelling puts it back
+    before = analytics(client)
+    client.patch(f"/api/orders/{second['id']}", json={"status": "cancelled"})
+    (today,) = client.get("/api/analytics/revenue/daily").json()
+    assert (today["orders"], today["revenue"]) == (1, pytest.approx(first["total_amount"]))
+    assert client.get("/api/analytics/menu-items").json()[0]["quantity"] == 2
+
+    client.patch(f"/api/orders/{second['id']}", json={"status": "pending"})
+    assert analytics(client) == before
+
+
+def test_rebuild_matches_incremental_rollups(client: TestClient, db_session):
+    place_order(client, [(2, 3)])
+    cancelled = place_order(client, [(1, 5)])
+    client.patch(f"/api/orders/{cancelled['id']}", json={"status": "cancelled"})
+    incremental = analytics(client)
+
+    rebuild_rollups(db_session)
+    db_session.commit()
+    rebuilt = analytics(client)
+    assert rebuilt[1:] == incremental[1:]
+    assert rebuilt[0][0]["orders"] == incremental[0][0]["orders"]
+    assert rebuilt[0][0]["revenue"] == pytest.approx(incremental[0][0]["revenue"])
+
+
+def test_menu_item_ranking_by_revenue(client: TestClient):
+    ranked = client.get("/api/analytics/menu-items", params={"sort": "revenue", "limit": 1}).json()
+    assert len(ranked) == 1
+    everything = client.get("/api/analytics/menu-items", params={"sort": "revenue"}).json()
+    assert ranked[0] == everything[0]
+    assert [item["revenue"] for item in everything] == sorted((item["revenue"] for item in everything), reverse=True)
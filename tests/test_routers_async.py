@@ -0,0 +1,110 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.async_database import get_async_db
+from src.app.db.database import Base
+from src.app.db.initial_data_loader import load_customers, load_regular_menus
+from src.app.routers.aio import customers, menu_items, opening_hours, orders
+from src.app.routers.menu_items import menu_cache, menu_index
+from src.app.routers.opening_hours import opening_schedule
+
+
+@pytest.fixture(scope="module")
+def async_client(tmp_path_factory):
+    """The async routers on their own app, backed by a temporary aiosqlite database."""
+    db_file = tmp_path_factory.mktemp("async") / "async.db"
+
+    # Seed with the sync loaders, then serve through the async engine
+    sync_engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=sync_engine)
+    session = sessionmaker(bind=sync_engine)()
+    load_customers(session)
+    load_regular_menus(session)
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+    TestAsyncSessionLocal = async_sessionmaker(bind=async_engine)
+
+    async def override_get_async_db():
+        async with TestAsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+    for module in (customers, menu_items, orders, opening_hours):
+        app.include_router(module.router, prefix="/api")
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    menu_cache.clear()  # shared with the sync routers, which the async ones delegate to
+    menu_index.clear()
+    opening_schedule.clear()
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_get_customers(async_client: TestClient):
+    response = async_client.get("/api/customers", params={"lastname": "simpson"})
+    assert response.status_code == 200
+    assert response.json()[0]["firstname"] == "Bart"
+
+
+def test_get_customer_not_found(async_client: TestClient):
+    response = async_client.get("/api/customers/99999")
+    assert response.status_code == 404
+
+
+def test_get_menu_by_day(async_client: TestClient):
+    response = async_client.get("/api/menu/monday")
+    assert response.status_code == 200
+    assert len(response.json()) > 0
+
+    assert async_client.get("/api/menu/someday").status_code == 400
+
+
+def test_create_and_update_menu_item(async_client: TestClient):
+    new_item = {"name": "Affogato", "price": 5.5, "ingredients": "espresso, gelato", "category": "Dessert"}
+    response = async_client.post("/api/menu-items", json=new_item)
+    assert response.status_code == 200
+    item_id = response.json()["id"]
+
+    response = async_client.patch(f"/api/menu-items/{item_id}", json={"price": 6.0})
+    assert response.status_code == 200
+    assert response.json()["price"] == 6.0
+
+    response = async_client.get("/api/menu-items/search", params={"q": "afogato"})
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == item_id
+
+
+def test_create_order_and_read_back_items(async_client: TestClient):
+    order = {"customer_id": 1, "items": [{"menu_item_id": 1, "quantity": 2}, {"menu_item_id": 2, "quantity": 1}]}
+    response = async_client.post("/api/orders", json=order)
+    assert response.status_code == 200
+    created = response.json()
+    assert len(created["items"]) == 2
+
+    # Items are a lazy relationship: reading them back must not fail outside the greenlet
+    response = async_client.get(f"/api/orders/{created['id']}")
+    assert response.status_code == 200
+    assert response.json()["total_amount"] == created["total_amount"]
+
+    response = async_client.get("/api/orders_by_user/1")
+    assert response.status_code == 200
+    assert len(response.json()) >= 1
+
+
+def test_concurrent_duplicates_create_one_order(async_client: TestClient):
+    # The requests run side by side on the client's event loop, where duplicates wait on an asyncio lock
+    order = {"customer_id": 2, "items": [{"menu_item_id": 1, "quantity": 1}]}
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda _: async_client.post("/api/orders", json=order, headers=headers), range(4)))
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert sum("Idempotent-Replayed" in response.headers for response in responses) == 3
@@ -63,3 +63,47 @@ def test_update_customer(client: TestClient):
     customer_from_db = response.json()
     assert customer_from_db["email"] == "bart_updated@simpson.com"
     assert customer_from_db["special"] is False
+
+
+def test_get_customers_paginated(client: TestClient):
+    all_ids = [customer["id"] for customer in client.get("/api/customers").json()]
+
+    response = client.get("/api/customers", params={"limit": 3})
+    assert response.status_code == 200
+    assert [customer["id"] for customer in response.json()] == all_ids[:3]
+
+    response = client.get("/api/customers", params={"limit": 3, "cursor": response.headers["X-Next-Cursor"]})
+    assert [customer["id"] for customer in response.json()] == all_ids[3:6]
+
+    response = client.get("/api/customers", params={"limit": len(all_ids)})
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_search_customers_by_prefix(client: TestClient):
+    response = client.get("/api/customers", params={"q": "simp mar"})
+    assert response.status_code == 200
+    assert [customer["firstname"] for customer in response.json()] == ["Margie"]
+
+    # FTS5 syntax is searched for literally instead of raising an error
+    assert client.get("/api/customers", params={"q": '"OR (*'}).status_code == 200
+    assert client.get("/api/customers", params={"q": "-"}).json() == []
+
+
+def test_search_customers_follows_updates(client: TestClient):
+    customer_id = client.get("/api/customers", params={"q": "homer"}).json()[0]["id"]
+    client.patch(f"/api/customers/{customer_id}", json={"firstname": "Homero"})
+    assert client.get("/api/customers", params={"q": "homer"}).json()[0]["firstname"] == "Homero"
+    assert client.get("/api/customers", params={"q": "homero"}).json()[0]["id"] == customer_id
+    client.patch(f"/api/customers/{customer_id}", json={"firstname": "Max"})
+    assert client.get("/api/customers", params={"q": "homero"}).json() == []
+
+
+def test_search_customers_paginated(client: TestClient):
+    all_ids = [customer["id"] for customer in client.get("/api/customers", params={"q": "simpson"}).json()]
+    assert len(all_ids) > 2
+
+    response = client.get("/api/customers", params={"q": "simpson", "limit": 2})
+    assert [customer["id"] for customer in response.json()] == all_ids[:2]
+    response = client.get("/api/customers",
+                          params={"q": "simpson", "limit": 2, "cursor": response.headers["X-Next-Cursor"]})
+    assert [customer["id"] for customer in response.json()] == all_ids[2:4]
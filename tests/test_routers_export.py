@@ -0,0 +1,118 @@
+import asyncio
+import csv
+import gc
+import io
+import json
+import os
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.database import Base
+from src.app.db.models import Customer
+from src.app.routers.export import ExportFormat, export_customers
+
+# `make load-test` exports 1M rows; the default keeps the regular test run quick
+EXPORT_TEST_ROWS = int(os.getenv("EXPORT_TEST_ROWS", "20000"))
+RSS_BUDGET_MB = 64
+
+
+def test_export_customers_ndjson(client: TestClient):
+    customers = client.get("/api/customers").json()
+    response = client.get("/api/export/customers")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert exported == customers
+
+
+def test_export_customers_csv(client: TestClient):
+    response = client.get("/api/export/customers", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == len(client.get("/api/customers").json())
+    assert rows[0]["email"] == client.get("/api/customers/1").json()["email"]
+
+
+def test_export_orders(client: TestClient):
+    order = {"customer_id": 1, "items": [{"menu_item_id": 1, "quantity": 2}, {"menu_item_id": 3, "quantity": 1}]}
+    created = client.post("/api/orders", json=order).json()
+
+    exported = [json.loads(line) for line in client.get("/api/export/orders").text.splitlines()]
+    order_line = next(line for line in exported if line["id"] == created["id"])
+    assert order_line["total_amount"] == created["total_amount"]
+    assert order_line["status"] == created["status"] == "pending"
+    assert [item["menu_item_id"] for item in order_line["items"]] == [1, 3]
+
+    rows = list(csv.DictReader(io.StringIO(client.get("/api/export/orders", params={"format": "csv"}).text)))
+    order_rows = [row for row in rows if row["id"] == str(created["id"])]
+    assert [row["item_menu_item_id"] for row in order_rows] == ["1", "3"]
+    assert {row["status"] for row in order_rows} == {"pending"}
+
+
+def current_rss_mb() -> float:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    raise RuntimeError("VmRSS not found")
+
+
+@pytest.fixture
+def large_customers_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    Base.metadata.create_all(bind=engine)
+    chunk = 10_000
+    with engine.begin() as connection:
+        for start in range(0, EXPORT_TEST_ROWS, chunk):
+            connection.execute(insert(Customer), [
+                {"firstname": f"First{n}", "lastname": f"Last{n}", "email": f"customer{n}@example.com",
+                 "external_id": f"#{n}", "card_digits": f"{n % 10000:04d}", "street": f"{n} Main St",
+                 "city": "Springfield", "state": "IL", "zip": "62701", "country": "USA", "phone": f"555-{n:07d}"}
+                for n in range(start, min(start + chunk, EXPORT_TEST_ROWS))
+            ])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.mark.skipif(not Path("/proc/self/status").exists(), reason="RSS is read from /proc")
+@pytest.mark.parametrize("export_format", [ExportFormat.ndjson, ExportFormat.csv])
+def test_export_memory_stays_bounded(large_customers_db, export_format):
+    db = large_customers_db()
+    response = export_customers(db=db, export_format=export_format)
+    db.close()  # like the request's session, closed before the body is streamed
+
+    gc.collect()
+    baseline = current_rss_mb()
+    peak = baseline
+    done = threading.Event()
+
+    def sample_rss():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, current_rss_mb())
+            done.wait(0.01)
+
+    async def consume():
+        lines = 0
+        async for chunk in response.body_iterator:
+            lines += chunk.count(b"\n")
+        return lines
+
+    sampler = threading.Thread(target=sample_rss)
+    sampler.start()
+    try:
+        lines = asyncio.run(consume())
+    finally:
+        done.set()
+        sampler.join()
+
+    header_lines = 1 if export_format == ExportFormat.csv else 0
+    assert lines == EXPORT_TEST_ROWS + header_lines
+    assert peak - baseline < RSS_BUDGET_MB
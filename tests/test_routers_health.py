@@ -0,0 +1,41 @@
+from fastapi.testclient import TestClient
+
+from src.app.routers.health import readiness
+
+
+def test_ready_after_startup(client: TestClient):
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert client.get("/health/live").json() == {"status": "alive"}
+
+
+def test_requests_rejected_while_starting(client: TestClient):
+    readiness.mark_not_ready("loading initial data")
+    try:
+        ready = client.get("/health/ready")
+        live = client.get("/health/live")
+        menu = client.get("/api/menu-items", headers={"Origin": "http://localhost:3000"})
+    finally:
+        readiness.mark_ready()
+    assert ready.status_code == 503
+    assert ready.json() == {"status": "starting", "detail": "loading initial data"}
+    assert live.status_code == 200
+    assert menu.status_code == 503
+    assert menu.headers["Retry-After"] == "2"
+    assert menu.json() == {"detail": "Service is starting: loading initial data"}
+    assert menu.headers["Access-Control-Allow-Origin"] == "http://localhost:3000"  # CORS still applies
+
+    assert client.get("/api/menu-items").status_code == 200
+
+
+def test_not_live_after_failed_startup(client: TestClient):
+    readiness.mark_failed("loading initial data failed: disk full")
+    try:
+        live = client.get("/health/live")
+        ready = client.get("/health/ready")
+    finally:
+        readiness.mark_ready()
+    assert live.status_code == 503
+    assert ready.status_code == 503
+    assert ready.json()["status"] == "failed"
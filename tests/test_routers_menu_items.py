@@ -0,0 +1,297 @@
+from fastapi.testclient import TestClient
+
+from src.app.cache import TTLCache
+from src.app.db.models import MenuItem, OpeningHours
+from src.app.etag import TableVersions
+from src.app.routers import menu_items
+from src.app.routers.menu_items import menu_cache
+
+from .conftest import count_queries
+
+NEW_ITEM = {
+    "name": "Panna Cotta",
+    "price": 6.5,
+    "ingredients": "cream, sugar, vanilla",
+    "category": "Dessert",
+    "available_friday": True,
+}
+
+
+def test_get_menu_items(client: TestClient):
+    response = client.get("/api/menu-items", params={"name": "carbonara"})
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Spaghetti Carbonara"
+
+
+def test_repeated_reads_are_served_from_cache(client: TestClient, db_session):
+    for url in ("/api/menu-items", "/api/menu-items/1", "/api/menu/tuesday"):
+        first = client.get(url)
+        with count_queries(db_session) as statements:
+            second = client.get(url)
+        assert second.status_code == 200
+        assert second.json() == first.json()
+        assert statements == []
+
+
+def test_pagination_header_is_cached(client: TestClient):
+    first = client.get("/api/menu-items", params={"limit": 2})
+    second = client.get("/api/menu-items", params={"limit": 2})
+    assert second.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+
+
+def test_create_menu_item_invalidates_lists_and_its_days(client: TestClient, db_session):
+    client.get("/api/menu-items")
+    client.get("/api/menu/friday")
+    client.get("/api/menu/saturday")
+
+    created = client.post("/api/menu-items", json=NEW_ITEM).json()
+
+    assert created["id"] in [item["id"] for item in client.get("/api/menu-items", params={"limit": 1000}).json()]
+    assert created["id"] in [item["id"] for item in client.get("/api/menu/friday").json()]
+    with count_queries(db_session) as statements:
+        client.get("/api/menu/saturday")  # not affected: still cached
+    assert statements == []
+
+
+def test_update_menu_item_invalidates_item_and_affected_days(client: TestClient, db_session):
+    item_id = client.post("/api/menu-items", json={**NEW_ITEM, "name": "Zabaglione"}).json()["id"]
+    client.get(f"/api/menu-items/{item_id}")
+    client.get("/api/menu/friday")
+    client.get("/api/menu/sunday")
+    client.get("/api/menu/monday")
+
+    # Moves from Friday to Sunday: both days change, Monday does not
+    client.patch(f"/api/menu-items/{item_id}", json={"price": 7.0, "available_friday": False, "available_sunday": True})
+
+    assert client.get(f"/api/menu-items/{item_id}").json()["price"] == 7.0
+    assert item_id not in [item["id"] for item in client.get("/api/menu/friday").json()]
+    assert item_id in [item["id"] for item in client.get("/api/menu/sunday").json()]
+    with count_queries(db_session) as statements:
+        client.get("/api/menu/monday")
+    assert statements == []
+
+
+def test_read_racing_a_write_is_not_cached(client: TestClient, db_session, monkeypatch):
+    item_id = client.post("/api/menu-items", json={**NEW_ITEM, "name": "Tiramisu"}).json()["id"]
+    menu_cache.clear()
+    render = menu_items._render
+
+    def render_then_write(adapter, value):
+        # An update commits after the read has loaded the item, but before its response is cached
+        body = render(adapter, value)
+        item = db_session.get(MenuItem, item_id)
+        item.price = 9.5
+        db_session.commit()
+        menu_items._menu_item_changed(item, item.available_days)
+        return body
+
+    monkeypatch.setattr(menu_items, "_render", render_then_write)
+    stale = client.get(f"/api/menu-items/{item_id}")
+    monkeypatch.setattr(menu_items, "_render", render)
+    assert stale.json()["price"] == NEW_ITEM["price"]
+
+    response = client.get(f"/api/menu-items/{item_id}", headers={"If-None-Match": stale.headers["ETag"]})
+    assert response.status_code == 200
+    assert response.json()["price"] == 9.5
+
+
+def test_missing_menu_item_is_not_cached(client: TestClient):
+    assert client.get("/api/menu-items/99999").status_code == 404
+    assert ("item", 99999) not in menu_cache._entries
+
+
+def test_cache_statistics_endpoint(client: TestClient):
+    client.get("/api/menu/wednesday")
+    client.get("/api/menu/wednesday")
+    statistics = client.get("/api/diagnostics/cache").json()
+    assert statistics["hits"] >= 1
+    assert statistics["misses"] >= 1
+    assert statistics["size"] >= 1
+
+
+def test_menu_responses_carry_etag_and_cache_control(client: TestClient):
+    response = client.get("/api/menu/tuesday")
+    assert response.headers["ETag"].startswith('"')
+    assert "must-revalidate" in response.headers["Cache-Control"]
+
+
+def test_conditional_get_returns_304_without_queries(client: TestClient, db_session):
+    etag = client.get("/api/menu/thursday").headers["ETag"]
+
+    with count_queries(db_session) as statements:
+        response = client.get("/api/menu/thursday", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert statements == []
+
+    menu_cache.clear()  # eg. expired, or another worker: the data is unchanged, so is the ETag
+    assert client.get("/api/menu/thursday", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_etag_follows_writes_made_through_another_worker(client: TestClient, monkeypatch):
+    now = [0.0]
+    workers = [(TTLCache(max_size=256, ttl=300, clock=lambda: now[0]), TableVersions()) for _ in range(2)]
+
+    def use_worker(number):
+        cache, versions = workers[number]
+        monkeypatch.setattr(menu_items, "menu_cache", cache)
+        monkeypatch.setattr(menu_items, "table_versions", versions)
+
+    use_worker(0)
+    item_id = client.post("/api/menu-items", json={**NEW_ITEM, "name": "Sfogliatella"}).json()["id"]
+    etag = client.get(f"/api/menu-items/{item_id}").headers["ETag"]
+
+    use_worker(1)
+    assert client.get(f"/api/menu-items/{item_id}", headers={"If-None-Match": etag}).status_code == 304
+    client.patch(f"/api/menu-items/{item_id}", json={"price": 8.0})
+
+    # The first worker knows nothing of the write: it answers as its cache would, until the entry expires
+    use_worker(0)
+    assert client.get(f"/api/menu-items/{item_id}", headers={"If-None-Match": etag}).status_code == 304
+    now[0] += 301
+    response = client.get(f"/api/menu-items/{item_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["price"] == 8.0
+
+
+def test_etag_changes_after_menu_item_write(client: TestClient):
+    etag = client.get("/api/menu-items").headers["ETag"]
+    item_id = client.post("/api/menu-items", json={**NEW_ITEM, "name": "Cannoli"}).json()["id"]
+    response = client.get("/api/menu-items", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    etag = client.get(f"/api/menu-items/{item_id}").headers["ETag"]
+    client.patch(f"/api/menu-items/{item_id}", json={"price": 4.0})
+    response = client.get(f"/api/menu-items/{item_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["price"] == 4.0
+
+
+def test_opening_hours_conditional_get(client: TestClient, db_session):
+    db_session.add_all([
+        OpeningHours(day="Monday", start="9:00", end="17:00", status="open", is_special=False),
+        OpeningHours(day="Tuesday", start="9:00", end="17:00", status="open", is_special=False),
+    ])
+    db_session.commit()
+
+    response = client.get("/api/opening-hours", params={"day": "monday"})
+    etag = response.headers["ETag"]
+    assert client.get("/api/opening-hours", params={"day": "monday"},
+                      headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/opening-hours", params={"day": "tuesday"},
+                      headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_search_menu_items_ranks_best_match_first(client: TestClient):
+    client.post("/api/menu-items", json={**NEW_ITEM, "name": "Truffle Truffle Risotto", "ingredients": "truffle"})
+    client.post("/api/menu-items", json={**NEW_ITEM, "name": "Mushroom Soup", "ingredients": "mushroom, truffle oil"})
+
+    names = [item["name"] for item in client.get("/api/menu-items", params={"q": "truf"}).json()]
+    assert names[0] == "Truffle Truffle Risotto"
+    assert "Mushroom Soup" in names
+    assert client.get("/api/menu-items", params={"q": "truf soup"}).json()[0]["name"] == "Mushroom Soup"
+
+
+def test_fuzzy_search_endpoint(client: TestClient, db_session):
+    response = client.get("/api/menu-items/search", params={"q": "carbonera"})
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Spaghetti Carbonara"
+
+    # New and renamed items are searchable right away, without rebuilding the index
+    item_id = client.post("/api/menu-items", json={**NEW_ITEM, "name": "Zuppa Inglese"}).json()["id"]
+    assert client.get("/api/menu-items/search", params={"q": "zupa"}).json()[0]["id"] == item_id
+    client.patch(f"/api/menu-items/{item_id}", json={"name": "Zeppole"})
+    with count_queries(db_session) as statements:
+        assert client.get("/api/menu-items/search", params={"q": "zepole"}).json()[0]["id"] == item_id
+    assert statements == []
+    assert client.get("/api/menu-items/search", params={"q": "zuppa"}).json() == []
+
+
+def test_search_index_does_not_follow_the_cache_ttl(client: TestClient, db_session, monkeypatch):
+    monkeypatch.setattr(menu_cache, "ttl", 0)  # menu cache disabled
+    client.get("/api/menu-items/search", params={"q": "carbonera"})
+    with count_queries(db_session) as statements:
+        assert client.get("/api/menu-items/search", params={"q": "carbonera"}).status_code == 200
+    assert statements == []
+
+
+def test_fuzzy_search_requires_a_query(client: TestClient):
+    assert client.get("/api/menu-items/search").status_code == 422
+    assert client.get("/api/menu-items/search", params={"q": "pizza", "limit": 0}).status_code == 422
+
+
+def test_filter_by_whole_ingredient_names(client: TestClient):
+    with_eggs = [item["name"] for item in client.get("/api/menu-items", params={"ingredients": "eggs"}).json()]
+    assert "Spaghetti Carbonara" in with_eggs
+    assert "Lasagna" not in with_eggs  # has eggplant, not eggs
+
+    both = client.get("/api/menu-items", params={"ingredients": "spaghetti, Eggs"}).json()
+    assert [item["name"] for item in both] == ["Spaghetti Carbonara"]
+
+
+def test_filter_by_words_of_ingredient_names(client: TestClient):
+    def ids(**params):
+        return [item["id"] for item in client.get("/api/menu-items", params={**params, "limit": 1000}).json()]
+
+    items = client.get("/api/menu-items", params={"limit": 1000}).json()
+    names = {item["id"]: item["name"] for item in items}
+
+    with_cheese = ids(ingredients="cheese")
+    assert with_cheese == [item["id"] for item in items if "cheese" in item["ingredients"]]
+    assert {"Margherita", "Spaghetti Carbonara"} <= {names[item_id] for item_id in with_cheese}  # mozzarella, parmesan
+    assert ids(ingredients="tomato") == [item["id"] for item in items if "tomato" in item["ingredients"]]
+    assert [names[item_id] for item_id in ids(ingredients="egg")] == ["Spaghetti Carbonara"]  # not eggplant
+
+    without_cheese = ids(exclude_ingredients="cheese")
+    assert without_cheese == [item["id"] for item in items if "cheese" not in item["ingredients"]]
+
+
+def test_exclude_ingredients_and_allergens(client: TestClient):
+    names = [item["name"] for item in client.get("/api/menu-items", params={"limit": 1000}).json()]
+    no_bacon = [item["name"] for item in client.get("/api/menu-items",
+                                                    params={"exclude_ingredients": "bacon", "limit": 1000}).json()]
+    assert "Spaghetti Carbonara" in names and "Spaghetti Carbonara" not in no_bacon
+    assert "Spaghetti Bolognese" in no_bacon
+
+    no_dairy_no_gluten = [item["name"] for item in client.get(
+        "/api/menu-items", params={"exclude_allergens": "dairy,gluten", "limit": 1000}).json()]
+    assert "Margherita" not in no_dairy_no_gluten  # mozzarella cheese
+    assert "Spaghetti Bolognese" not in no_dairy_no_gluten  # spaghetti
+    assert "Coke" in no_dairy_no_gluten
+
+    response = client.get("/api/menu-items", params={"exclude_allergens": "dairy,kryptonite"})
+    assert response.status_code == 400
+
+
+def test_ingredient_filters_follow_updates(client: TestClient):
+    item_id = client.post("/api/menu-items", json={**NEW_ITEM, "name": "Affogato",
+                                                   "ingredients": "espresso, gelato"}).json()["id"]
+    with_gelato = client.get("/api/menu-items", params={"ingredients": "gelato"}).json()
+    assert item_id in [item["id"] for item in with_gelato]
+
+    client.patch(f"/api/menu-items/{item_id}", json={"ingredients": "espresso, sorbet"})
+    with_gelato = client.get("/api/menu-items", params={"ingredients": "gelato"}).json()
+    assert item_id not in [item["id"] for item in with_gelato]
+    no_dairy = client.get("/api/menu-items", params={"exclude_allergens": "dairy", "limit": 1000}).json()
+    assert item_id in [item["id"] for item in no_dairy]
+
+
+def test_menu_for_any_of_several_days(client: TestClient):
+    item_id = client.post("/api/menu-items", json={**NEW_ITEM, "name": "Sfogliatella", "available_friday": False,
+                                                   "available_sunday": True}).json()["id"]
+
+    weekend = client.get("/api/menu/fri,sat,sun")
+    assert weekend.status_code == 200
+    ids = [item["id"] for item in weekend.json()]
+    assert item_id in ids
+    assert ids == sorted(ids)
+    assert ids == [item["id"] for item in client.get("/api/menu/Friday,saturday,SUNDAY").json()]
+    assert item_id not in [item["id"] for item in client.get("/api/menu/fri,sat").json()]
+    assert client.get("/api/menu/fri,someday").status_code == 400
+
+    # Moving the item to Saturday updates every cached combination including Saturday or Sunday
+    client.patch(f"/api/menu-items/{item_id}", json={"available_sunday": False, "available_saturday": True})
+    assert item_id in [item["id"] for item in client.get("/api/menu/fri,sat").json()]
+    assert item_id not in [item["id"] for item in client.get("/api/menu/sun").json()]
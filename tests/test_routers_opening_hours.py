@@ -0,0 +1,45 @@
+from fastapi.testclient import TestClient
+
+from src.app.db.models import OpeningHours
+from src.app.routers.opening_hours import opening_schedule
+
+from .conftest import count_queries
+
+
+def add_opening_hours(db_session):
+    db_session.add_all([
+        OpeningHours(day="Monday", start="", end="", status="closed", is_special=False),
+        OpeningHours(day="Tuesday", start="9:00", end="21:00", status="open", is_special=False),
+        OpeningHours(day="Tuesday", start="8:00", end="22:00", status="open", is_special=True),
+    ])
+    db_session.commit()
+    opening_schedule.clear()  # rows written behind the API's back
+
+
+def test_opening_status(client: TestClient, db_session):
+    add_opening_hours(db_session)
+
+    response = client.get("/api/opening-hours/status", params={"at": "2024-06-04T20:00:00"})  # a Tuesday
+    assert response.status_code == 200
+    assert response.json() == {"at": "2024-06-04T20:00:00", "special": False, "open": True,
+                               "closes_at": "2024-06-04T21:00:00", "next_open": None}
+
+    status = client.get("/api/opening-hours/status", params={"at": "2024-06-04T21:30:00"}).json()
+    assert status["open"] is False
+    assert status["next_open"] == "2024-06-11T09:00:00"
+
+    status = client.get("/api/opening-hours/status", params={"at": "2024-06-04T21:30:00", "special": True}).json()
+    assert status["open"] is True
+    assert status["closes_at"] == "2024-06-04T22:00:00"
+
+    assert client.get("/api/opening-hours/status").status_code == 200  # defaults to now
+
+
+def test_opening_hours_are_served_from_memory(client: TestClient, db_session):
+    client.get("/api/opening-hours")
+    with count_queries(db_session) as statements:
+        response = client.get("/api/opening-hours", params={"day": "tuesday", "special": True})
+        client.get("/api/opening-hours/status", params={"at": "2024-06-03T10:00:00"})
+    assert statements == []
+    assert [(row["day"], row["start"]) for row in response.json()] == [("Tuesday", "8:00")]
+    assert client.get("/api/opening-hours", params={"day": "someday"}).status_code == 404
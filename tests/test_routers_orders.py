@@ -0,0 +1,449 @@
+import asyncio
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app.db.database import get_db
+from src.app.db.group_commit import GroupCommitWriter
+from src.app.main import app
+from src.app.routers.events import order_events, stream_order_status
+from src.app.routers import orders
+from src.app.routers.orders import idempotency_store
+
+from .conftest import count_queries
+
+
+def create_orders(client: TestClient, count: int, customer_id: int = 1):
+    for _ in range(count):
+        order = {"customer_id": customer_id, "items": [{"menu_item_id": 1, "quantity": 1},
+                                                       {"menu_item_id": 2, "quantity": 2}]}
+        response = client.post("/api/orders", json=order)
+        assert response.status_code == 200
+
+
+def test_create_order(client: TestClient):
+    order = {"customer_id": 2, "items": [{"menu_item_id": 1, "quantity": 2, "note": "No cheese"}]}
+    response = client.post("/api/orders", json=order)
+    assert response.status_code == 200
+    created = response.json()
+    assert created["customer_id"] == 2
+    assert created["items"][0]["note"] == "No cheese"
+
+    response = client.get(f"/api/orders/{created['id']}")
+    assert response.status_code == 200
+    assert response.json()["items"] == created["items"]
+
+
+def test_list_orders_issues_constant_number_of_queries(client: TestClient, db_session):
+    create_orders(client, 3)
+    with count_queries(db_session) as few_orders_queries:
+        response = client.get("/api/orders")
+    assert response.status_code == 200
+    few_orders = len(response.json())
+
+    create_orders(client, 10)
+    with count_queries(db_session) as many_orders_queries:
+        response = client.get("/api/orders")
+    assert len(response.json()) == few_orders + 10
+
+    assert len(many_orders_queries) == len(few_orders_queries) == 2  # orders, then all their items
+
+
+def test_orders_by_user_issues_constant_number_of_queries(client: TestClient, db_session):
+    create_orders(client, 5, customer_id=3)
+    with count_queries(db_session) as statements:
+        response = client.get("/api/orders_by_user/3")
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+    assert all(len(order["items"]) == 2 for order in response.json())
+    assert len(statements) == 2
+
+
+def test_get_order_by_id_issues_single_query(client: TestClient, db_session):
+    create_orders(client, 1, customer_id=4)
+    order_id = client.get("/api/orders_by_user/4").json()[0]["id"]
+    with count_queries(db_session) as statements:
+        response = client.get(f"/api/orders/{order_id}")
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
+    assert len(statements) == 1
+
+
+def fetch_all_pages(client: TestClient, url: str, **params):
+    pages, cursor = [], None
+    while True:
+        response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+def test_orders_keyset_pagination(client: TestClient):
+    create_orders(client, 5, customer_id=5)
+    all_orders = client.get("/api/orders", params={"limit": 1000}).json()
+
+    pages = fetch_all_pages(client, "/api/orders", limit=4)
+    assert all(len(page) <= 4 for page in pages)
+    paged_ids = [order["id"] for page in pages for order in page]
+    assert paged_ids == [order["id"] for order in all_orders]  # no duplicates, no gaps, same order
+
+    keys = [(order["order_date"], order["id"]) for order in all_orders]
+    assert keys == sorted(keys)
+
+
+def test_orders_filter_by_customer_and_date_window(client: TestClient):
+    create_orders(client, 3, customer_id=6)
+    orders = client.get("/api/orders", params={"customer_id": 6}).json()
+    assert len(orders) == 3
+    assert all(order["customer_id"] == 6 for order in orders)
+
+    pages = fetch_all_pages(client, "/api/orders", customer_id=6, limit=2)
+    assert [len(page) for page in pages] == [2, 1]
+
+    first, last = orders[0]["order_date"], orders[-1]["order_date"]
+    window = client.get("/api/orders", params={"customer_id": 6, "date_from": first, "date_to": last}).json()
+    assert [order["id"] for order in window] == [order["id"] for order in orders[:-1]]
+
+
+def test_orders_pagination_rejects_bad_parameters(client: TestClient):
+    assert client.get("/api/orders", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/orders", params={"limit": 0}).status_code == 422
+    assert client.get("/api/orders", params={"limit": 100_000}).status_code == 422
+
+
+def test_orders_page_query_uses_keyset_index(db_session):
+    plan = db_session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN SELECT id FROM orders WHERE (order_date, id) > (?, ?) ORDER BY order_date, id LIMIT 10",
+        ("2024-01-01 00:00:00", 1),
+    ).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_orders_order_date_id" in details
+    assert "TEMP B-TREE" not in details  # no sort step: rows come out of the index in page order
+
+
+def test_create_order_statement_count_does_not_grow_with_line_items(client: TestClient, db_session):
+    def place_order(line_items: int):
+        order = {"customer_id": 7, "items": [{"menu_item_id": n % 5 + 1, "quantity": 1} for n in range(line_items)]}
+        with count_queries(db_session) as statements:
+            response = client.post("/api/orders", json=order)
+        assert response.status_code == 200
+        assert len(response.json()["items"]) == line_items
+        return [statement for statement in statements if statement.lstrip().upper().startswith("SELECT")]
+
+    assert len(place_order(2)) == len(place_order(20))
+
+
+def test_create_order_total_amount(client: TestClient):
+    prices = {item_id: client.get(f"/api/menu-items/{item_id}").json()["price"] for item_id in (1, 2)}
+    order = {"customer_id": 1, "items": [{"menu_item_id": 1, "quantity": 3}, {"menu_item_id": 2, "quantity": 1},
+                                         {"menu_item_id": 1, "quantity": 1}]}
+    response = client.post("/api/orders", json=order)
+    assert response.status_code == 200
+    assert response.json()["total_amount"] == pytest.approx(prices[1] * 4 + prices[2])
+
+
+def test_create_order_reports_all_missing_menu_items(client: TestClient):
+    order = {"customer_id": 1, "items": [{"menu_item_id": 1, "quantity": 1}, {"menu_item_id": 9998, "quantity": 1},
+                                         {"menu_item_id": 9999, "quantity": 1}]}
+    response = client.post("/api/orders", json=order)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Menu items with ids 9998, 9999 not found"
+
+    order["items"] = [{"menu_item_id": 9999, "quantity": 1}]
+    assert client.post("/api/orders", json=order).json()["detail"] == "Menu item with id 9999 not found"
+
+
+def test_create_orders_batch(client: TestClient):
+    batch = [
+        {"customer_id": 8, "items": [{"menu_item_id": 1, "quantity": 2}]},
+        {"customer_id": 99999, "items": [{"menu_item_id": 1, "quantity": 1}]},
+        {"customer_id": 8, "items": [{"menu_item_id": 9999, "quantity": 1}]},
+        {"customer_id": 8, "order_date": "2024-03-01T12:30:00", "items": [{"menu_item_id": 2, "quantity": 1},
+                                                                          {"menu_item_id": 3, "quantity": 1}]},
+    ]
+    response = client.post("/api/orders/batch", json=batch)
+    assert response.status_code == 200
+    results = response.json()
+
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["status_code"] for result in results] == [200, 404, 404, 200]
+    assert results[1]["detail"] == "Customer not found"
+    assert results[2]["detail"] == "Menu item with id 9999 not found"
+    assert results[3]["order"]["order_date"] == "2024-03-01T12:30:00"  # replayed orders keep their time
+
+    for result in (results[0], results[3]):
+        stored = client.get(f"/api/orders/{result['order']['id']}").json()
+        assert stored == result["order"]
+
+
+def test_create_orders_batch_statement_count_is_constant(client: TestClient, db_session):
+    def submit(count: int):
+        batch = [{"customer_id": n % 10 + 1, "items": [{"menu_item_id": 1, "quantity": 1},
+                                                      {"menu_item_id": 2, "quantity": 1}]} for n in range(count)]
+        with count_queries(db_session) as statements:
+            response = client.post("/api/orders/batch", json=batch)
+        assert all(result["status_code"] == 200 for result in response.json())
+        return statements
+
+    # insertmanyvalues may split very large batches, but a batch of 50 is a single INSERT per table
+    assert len(submit(1)) == len(submit(50))
+
+
+def test_create_orders_batch_size_is_capped(client: TestClient):
+    batch = [{"customer_id": 1, "items": []}] * 10_001
+    assert client.post("/api/orders/batch", json=batch).status_code == 422
+
+
+def claim_all(client: TestClient, status: str = "pending") -> list:
+    claimed = []
+    while batch := client.post("/api/orders/queue/claim", params={"status": status, "count": 100}).json():
+        claimed += batch
+    return claimed
+
+
+def test_order_status_is_stored_and_filtered(client: TestClient):
+    create_orders(client, 1, customer_id=8)
+    order = client.get("/api/orders", params={"customer_id": 8}).json()[0]
+    assert order["status"] == "pending"
+
+    response = client.patch(f"/api/orders/{order['id']}", json={"status": "dispatched"})
+    assert response.status_code == 200
+    assert client.get(f"/api/orders/{order['id']}").json()["status"] == "dispatched"
+
+    dispatched = client.get("/api/orders", params={"status": "dispatched", "limit": 1000}).json()
+    assert order["id"] in [other["id"] for other in dispatched]
+    assert all(other["status"] == "dispatched" for other in dispatched)
+
+
+def test_new_orders_start_pending(client: TestClient):
+    order = {"customer_id": 8, "status": "delivered", "items": [{"menu_item_id": 1, "quantity": 1}]}
+    created = client.post("/api/orders", json=order).json()
+    assert created["status"] == "pending"
+    assert client.get(f"/api/orders/{created['id']}").json()["status"] == "pending"
+
+    # Orders replayed in a batch keep the status they reached meanwhile
+    (result,) = client.post("/api/orders/batch", json=[order]).json()
+    assert result["order"]["status"] == "delivered"
+
+
+def test_order_queue_claims_oldest_first(client: TestClient):
+    claim_all(client)  # empty the queue of the orders other tests left pending
+    create_orders(client, 3, customer_id=9)
+    pending = client.get("/api/orders", params={"customer_id": 9, "status": "pending"}).json()
+
+    queue = client.get("/api/orders/queue", params={"limit": 2}).json()
+    assert [order["id"] for order in queue] == [order["id"] for order in pending[:2]]
+
+    claimed = client.post("/api/orders/queue/claim", params={"count": 2}).json()
+    assert [order["id"] for order in claimed] == [order["id"] for order in pending[:2]]
+    assert all(order["status"] == "in_progress" and len(order["items"]) == 2 for order in claimed)
+
+    # Claimed orders leave the queue: the next claim gets the remaining order only
+    assert [order["id"] for order in claim_all(client)] == [pending[2]["id"]]
+    assert client.get("/api/orders/queue").json() == []
+
+    in_progress = client.get("/api/orders/queue", params={"status": "in_progress", "limit": 1000}).json()
+    assert {order["id"] for order in pending} <= {order["id"] for order in in_progress}
+
+    response = client.post("/api/orders/queue/claim", params={"status": "delivered"})
+    assert response.status_code == 400
+
+
+def test_order_queue_query_reads_index_only(db_session):
+    plan = db_session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN SELECT id FROM orders WHERE status = ? ORDER BY order_date, id LIMIT 10", ("pending",)
+    ).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "COVERING INDEX ix_orders_status_order_date_id" in details
+    assert "TEMP B-TREE" not in details
+
+
+def test_order_status_changes_are_pushed(client: TestClient):
+    create_orders(client, 1, customer_id=10)
+    order = client.get("/api/orders", params={"customer_id": 10}).json()[-1]
+
+    # The test client waits for a response to end, so the endless stream is read from the endpoint directly
+    async def receive_update():
+        response = await stream_order_status(order["id"])
+        assert response.media_type == "text/event-stream"
+        chunks = response.body_iterator
+        assert (await anext(chunks)).startswith("retry:")
+        await asyncio.to_thread(client.patch, f"/api/orders/{order['id']}", json={"status": "cancelled"})
+        chunk = await asyncio.wait_for(anext(chunks), timeout=5)
+        await chunks.aclose()
+        return chunk
+
+    event_line, data_line = asyncio.run(receive_update()).strip().splitlines()
+    assert event_line == "event: status"
+    event = json.loads(data_line[len("data: "):])
+    assert (event["order_id"], event["customer_id"]) == (order["id"], 10)
+    assert (event["previous_status"], event["status"]) == ("pending", "cancelled")
+
+
+def test_order_stream_never_sent_leaves_no_subscription():
+    async def abandon_stream():
+        response = await stream_order_status(1)
+        await response.body_iterator.aclose()  # eg. the client disconnected before the response started
+
+    subscriptions = order_events.stats()["subscriptions"]
+    asyncio.run(abandon_stream())
+    assert order_events.stats()["subscriptions"] == subscriptions
+
+
+def order_count(client: TestClient, customer_id: int) -> int:
+    return len(client.get("/api/orders", params={"customer_id": customer_id, "limit": 100}).json())
+
+
+def test_create_order_with_idempotency_key_is_replayed(client: TestClient, db_session):
+    order = {"customer_id": 11, "items": [{"menu_item_id": 1, "quantity": 1}]}
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    orders_before = order_count(client, 11)
+    first = client.post("/api/orders", json=order, headers=headers)
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+
+    # Recent keys are answered from memory, without a single statement
+    with count_queries(db_session) as statements:
+        retry = client.post("/api/orders", json=order, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert statements == []
+
+    idempotency_store.cache.clear()
+    with count_queries(db_session) as statements:
+        retry = client.post("/api/orders", json=order, headers=headers)
+    assert retry.json() == first.json()
+    assert len(statements) == 1 and "idempotency_keys" in statements[0]
+    assert order_count(client, 11) == orders_before + 1
+
+    # The same key for another order is a client error, not a replay of the first one
+    other = {"customer_id": 11, "items": [{"menu_item_id": 2, "quantity": 1}]}
+    response = client.post("/api/orders", json=other, headers=headers)
+    assert response.status_code == 422
+    assert order_count(client, 11) == orders_before + 1
+
+
+def test_create_order_failure_is_not_stored(client: TestClient):
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    order = {"customer_id": 11, "items": [{"menu_item_id": 9999, "quantity": 1}]}
+    assert client.post("/api/orders", json=order, headers=headers).status_code == 404
+    order["items"] = [{"menu_item_id": 1, "quantity": 1}]
+    assert client.post("/api/orders", json=order, headers=headers).status_code == 200
+
+
+def test_concurrent_duplicates_create_one_order(client: TestClient, temp_db):
+    _, TestSessionLocal = temp_db
+
+    def session_per_request():  # the shared test session cannot be used by several threads at once
+        with TestSessionLocal() as session:
+            yield session
+
+    order = {"customer_id": 11, "items": [{"menu_item_id": 1, "quantity": 2}]}
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    orders_before = order_count(client, 11)
+    shared_session = app.dependency_overrides[get_db]
+    app.dependency_overrides[get_db] = session_per_request
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            responses = list(pool.map(lambda _: client.post("/api/orders", json=order, headers=headers), range(8)))
+    finally:
+        app.dependency_overrides[get_db] = shared_session
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert sum("Idempotent-Replayed" in response.headers for response in responses) == 7
+    assert order_count(client, 11) == orders_before + 1
+
+
+def test_duplicate_stored_by_another_worker_is_replayed(client: TestClient, monkeypatch):
+    order = {"customer_id": 11, "items": [{"menu_item_id": 1, "quantity": 1}]}
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    orders_before = order_count(client, 11)
+    first = client.post("/api/orders", json=order, headers=headers).json()
+
+    # As if another process had stored the key between our lookup and our commit: our order is rolled back
+    lookups = []
+    get = idempotency_store.get
+
+    def get_after_first_lookup(db, key):
+        lookups.append(key)
+        return get(db, key) if len(lookups) > 1 else None
+
+    monkeypatch.setattr(idempotency_store, "get", get_after_first_lookup)
+    idempotency_store.cache.clear()
+    retry = client.post("/api/orders", json=order, headers=headers)
+    assert retry.status_code == 200
+    assert retry.json() == first
+    assert len(lookups) == 2
+    assert order_count(client, 11) == orders_before + 1
+
+
+def test_expired_idempotency_key_creates_a_new_order(client: TestClient, monkeypatch):
+    order = {"customer_id": 11, "items": [{"menu_item_id": 1, "quantity": 1}]}
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    orders_before = order_count(client, 11)
+    first = client.post("/api/orders", json=order, headers=headers).json()
+
+    monkeypatch.setattr(idempotency_store, "ttl", 0)
+    idempotency_store.cache.clear()
+    second = client.post("/api/orders", json=order, headers=headers)
+    assert second.status_code == 200
+    assert second.json()["id"] != first["id"]
+    assert order_count(client, 11) == orders_before + 2
+
+
+def test_create_order_with_group_commit(client: TestClient, temp_db, monkeypatch):
+    _, TestSessionLocal = temp_db
+    writer = GroupCommitWriter(TestSessionLocal, orders.insert_orders, max_wait=0.01)
+    monkeypatch.setattr(orders, "order_writer", writer)
+
+    order = {"customer_id": 11, "items": [{"menu_item_id": 2, "quantity": 3}]}
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    created = client.post("/api/orders", json=order, headers=headers)
+    assert created.status_code == 200
+    assert client.get(f"/api/orders/{created.json()['id']}").json() == created.json()
+    retry = client.post("/api/orders", json=order, headers=headers)
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == created.json()
+
+    order["customer_id"] = 99999
+    assert client.post("/api/orders", json=order).status_code == 404
+    assert client.get("/api/diagnostics/group-commit").json()["writes"] == 2
+    writer.close()
+
+
+def test_group_commit_with_a_small_pool(client: TestClient, temp_db, monkeypatch):
+    # Request threads waiting for the writer must not hold the connections the writer needs
+    test_engine, _ = temp_db
+    small_pool = create_engine(
+        test_engine.url, pool_size=2, max_overflow=0, pool_timeout=3, connect_args={"check_same_thread": False}
+    )
+    SmallPoolSession = sessionmaker(bind=small_pool, autoflush=False)
+    writer = GroupCommitWriter(SmallPoolSession, orders.insert_orders, max_wait=0.01, timeout=10)
+    monkeypatch.setattr(orders, "order_writer", writer)
+
+    def session_per_request():
+        with SmallPoolSession() as session:
+            yield session
+
+    def post(n: int):
+        order = {"customer_id": n % 10 + 1, "items": [{"menu_item_id": 1, "quantity": 1}]}
+        return client.post("/api/orders", json=order, headers={"Idempotency-Key": str(uuid.uuid4())})
+
+    shared_session = app.dependency_overrides[get_db]
+    app.dependency_overrides[get_db] = session_per_request
+    try:
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            responses = list(pool.map(post, range(12)))
+    finally:
+        app.dependency_overrides[get_db] = shared_session
+        writer.close()
+        small_pool.dispose()
+    assert [response.status_code for response in responses] == [200] * 12